@@ -1,27 +1,242 @@
+"""Gemini client.
+
+One pooled httpx.AsyncClient runs on a background event loop, so keep-alive connections
+are reused across requests and callers on any thread can submit without owning a loop.
+Responses are cached (LRU + TTL) by a hash of the normalized prompt, and concurrent
+identical prompts share one in-flight request. Callers wait at most `budget_s`; past that
+they get their fallback text while the request keeps running and fills the cache.
+gemini_stream() yields the text chunk by chunk from streamGenerateContent (SSE).
+
+Env: GEMINI_API_KEY, GEMINI_MODEL, GEMINI_BASE_URL (point it at a local stub server for
+testing), GEMINI_TIMEOUT_S, GEMINI_BUDGET_S, GEMINI_CACHE_SIZE, GEMINI_CACHE_TTL_S.
+"""
+
+import asyncio
+import concurrent.futures
+import hashlib
+import json
 import os
-import requests
+import queue
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import httpx
+
+DEFAULT_BASE_URL = "https://generativelanguage.googleapis.com"
+GENERATION_CONFIG = {"temperature": 0.15, "maxOutputTokens": 1500}
 
-def gemini_generate(text: str) -> str:
-    api_key = os.getenv("GEMINI_API_KEY", "")
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def _model() -> str:
     model = os.getenv("GEMINI_MODEL", "models/gemini-2.5-flash")
+    return model if model.startswith("models/") else f"models/{model}"
 
-    if not api_key:
-        return "GEMINI_API_KEY missing (check backend/.env)"
 
-    if not model.startswith("models/"):
-        model = f"models/{model}"
+def normalize_prompt(text: str) -> str:
+    # whitespace/indentation differences must not produce a different cache entry
+    return "\n".join(" ".join(line.split()) for line in text.strip().splitlines() if line.strip())
 
-    url = f"https://generativelanguage.googleapis.com/v1beta/{model}:generateContent?key={api_key}"
-    payload = {
-        "contents": [{"role": "user", "parts": [{"text": text}]}],
-        "generationConfig": {"temperature": 0.15, "maxOutputTokens": 1500},
-    }
 
-    try:
-        r = requests.post(url, json=payload, timeout=60)
-        if r.status_code != 200:
-            return f"Gemini error {r.status_code}: {r.text}"
-        data = r.json()
-        return data["candidates"][0]["content"]["parts"][0]["text"]
-    except Exception as e:
-        return f"Gemini exception: {type(e).__name__}: {e}"
+def prompt_key(text: str, model: Optional[str] = None) -> str:
+    raw = json.dumps([model or _model(), GENERATION_CONFIG, normalize_prompt(text)], sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class TTLCache:
+    def __init__(self, maxsize: int, ttl_s: float):
+        self.maxsize = maxsize
+        self.ttl_s = ttl_s
+        self._data: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is None:
+                return None
+            if hit[0] < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return hit[1]
+
+    def put(self, key: str, value: str) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl_s, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class GeminiClient:
+    def __init__(self):
+        self.cache = TTLCache(int(_env_float("GEMINI_CACHE_SIZE", 256)), _env_float("GEMINI_CACHE_TTL_S", 3600))
+        self._inflight: Dict[str, concurrent.futures.Future] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._http: Optional[httpx.AsyncClient] = None
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="gemini-loop", daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    def http(self) -> httpx.AsyncClient:
+        # created (and only used) on the client's own loop
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                timeout=httpx.Timeout(_env_float("GEMINI_TIMEOUT_S", 60.0), connect=10.0),
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60.0),
+            )
+        return self._http
+
+    def url(self, method: str = "generateContent", query: str = "") -> str:
+        base = os.getenv("GEMINI_BASE_URL", DEFAULT_BASE_URL).rstrip("/")
+        key = os.getenv("GEMINI_API_KEY", "")
+        return f"{base}/v1beta/{_model()}:{method}?{query}key={key}"
+
+    @staticmethod
+    def payload(text: str) -> Dict[str, Any]:
+        return {
+            "contents": [{"role": "user", "parts": [{"text": text}]}],
+            "generationConfig": GENERATION_CONFIG,
+        }
+
+    async def _generate(self, text: str) -> Tuple[bool, str]:
+        try:
+            r = await self.http().post(self.url(), json=self.payload(text))
+            if r.status_code != 200:
+                return False, f"Gemini error {r.status_code}: {r.text}"
+            data = r.json()
+            return True, data["candidates"][0]["content"]["parts"][0]["text"]
+        except Exception as e:
+            return False, f"Gemini exception: {type(e).__name__}: {e}"
+
+    def submit(self, text: str) -> concurrent.futures.Future:
+        '''Future of (ok, text); identical prompts already in flight share one request.'''
+        key = prompt_key(text)
+        loop = self.loop
+        with self._lock:
+            fut = self._inflight.get(key)
+            if fut is not None:
+                return fut
+            fut = asyncio.run_coroutine_threadsafe(self._generate(text), loop)
+            self._inflight[key] = fut
+
+        def done(f: concurrent.futures.Future) -> None:
+            # cache before leaving the in-flight table, so no caller slips in between and re-sends
+            if not f.cancelled() and f.exception() is None:
+                ok, out = f.result()
+                if ok:  # errors are not cached, the next call retries
+                    self.cache.put(key, out)
+            with self._lock:
+                self._inflight.pop(key, None)
+
+        fut.add_done_callback(done)
+        return fut
+
+    def generate(self, text: str, budget_s: Optional[float] = None, fallback: Optional[str] = None) -> str:
+        hit = self.cache.get(prompt_key(text))
+        if hit is not None:
+            return hit
+        fut = self.submit(text)
+        budget = _env_float("GEMINI_BUDGET_S", 20.0) if budget_s is None else budget_s
+        try:
+            return fut.result(timeout=budget)[1]
+        except concurrent.futures.TimeoutError:
+            # the request keeps running and will populate the cache for the next ask
+            return fallback if fallback is not None else f"Gemini did not answer within {budget:g}s"
+
+    async def _stream(self, text: str, out: "queue.Queue[Tuple[str, Optional[str]]]") -> None:
+        # streamGenerateContent with alt=sse: one `data: {GenerateContentResponse}` line per chunk
+        parts = []
+        try:
+            async with self.http().stream("POST", self.url("streamGenerateContent", "alt=sse&"), json=self.payload(text)) as r:
+                if r.status_code != 200:
+                    body = (await r.aread()).decode("utf-8", errors="replace")
+                    out.put(("error", f"Gemini error {r.status_code}: {body}"))
+                    return
+                async for line in r.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = json.loads(line[5:])
+                    for cand in data.get("candidates", [])[:1]:
+                        for part in cand.get("content", {}).get("parts", []):
+                            if part.get("text"):
+                                parts.append(part["text"])
+                                out.put(("text", part["text"]))
+            if parts:
+                self.cache.put(prompt_key(text), "".join(parts))
+        except Exception as e:
+            out.put(("error", f"Gemini exception: {type(e).__name__}: {e}"))
+        finally:
+            out.put(("end", None))
+
+    def stream(self, text: str, budget_s: Optional[float] = None, fallback: Optional[str] = None) -> Iterator[str]:
+        '''
+        Starts the request right away and returns an iterator over the text chunks.
+        `budget_s` bounds the wait for the first chunk; a cached answer is returned as one chunk.
+        '''
+        hit = self.cache.get(prompt_key(text))
+        if hit is not None:
+            return iter([hit])
+        chunks: "queue.Queue[Tuple[str, Optional[str]]]" = queue.Queue()
+        asyncio.run_coroutine_threadsafe(self._stream(text, chunks), self.loop)
+        budget = _env_float("GEMINI_BUDGET_S", 20.0) if budget_s is None else budget_s
+        return self._drain(chunks, budget, fallback)
+
+    @staticmethod
+    def _drain(chunks: "queue.Queue[Tuple[str, Optional[str]]]", budget: float, fallback: Optional[str]) -> Iterator[str]:
+        first = True
+        while True:
+            try:
+                # later chunks are bounded by the HTTP read timeout
+                kind, value = chunks.get(timeout=budget if first else None)
+            except queue.Empty:
+                # as with generate(): the request finishes in the background and fills the cache
+                yield fallback if fallback is not None else f"Gemini did not answer within {budget:g}s"
+                return
+            if kind == "end":
+                return
+            first = False
+            yield value
+            if kind == "error":
+                return
+
+    def reset(self) -> None:
+        self.cache.clear()
+        with self._lock:
+            self._inflight.clear()
+
+
+client = GeminiClient()
+
+
+def gemini_generate(text: str, budget_s: Optional[float] = None, fallback: Optional[str] = None) -> str:
+    if not os.getenv("GEMINI_API_KEY", ""):
+        return "GEMINI_API_KEY missing (check backend/.env)"
+    return client.generate(text, budget_s=budget_s, fallback=fallback)
+
+
+def gemini_stream(text: str, budget_s: Optional[float] = None, fallback: Optional[str] = None) -> Iterator[str]:
+    if not os.getenv("GEMINI_API_KEY", ""):
+        return iter(["GEMINI_API_KEY missing (check backend/.env)"])
+    return client.stream(text, budget_s=budget_s, fallback=fallback)
@@ -9,191 +9,87 @@ This keeps the demo trustworthy (no hallucinated numbers):
 
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional
-
-from app.agent.gemini_client import gemini_generate
-from app.services.reports import summary, future_forecast, recs
-
-
-def _pct_change(before: Optional[float], after: Optional[float]) -> Optional[float]:
-    if before is None or after is None:
-        return None
-    if before == 0:
-        return None
-    return (after - before) / before
-
-
-def _round(v: Optional[float], nd: int = 3) -> Optional[float]:
-    if v is None:
-        return None
-    try:
-        return round(float(v), nd)
-    except Exception:
-        return None
-
-
-def _top_inventory_actions(inv_rows: List[Dict[str, Any]], n: int = 10) -> List[Dict[str, Any]]:
-    # Prefer highest reorder_point (more urgent / high volume); fallback to avg_pred.
-    def key(r):
-        return (
-            float(r.get("reorder_point", 0.0) or 0.0),
-            float(r.get("avg_pred", 0.0) or 0.0),
-        )
-
-    out = sorted(inv_rows, key=key, reverse=True)[:n]
-    for i, r in enumerate(out, 1):
-        r = r  # noqa
-        r["rank"] = i
-        # Light formatting
-        for k in ("avg_pred", "reorder_point", "safety_stock"):
-            if k in r:
-                try:
-                    r[k] = _round(float(r[k]), 3)
-                except Exception:
-                    pass
-    return out
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
+import pandas as pd
+
+from app.agent.gemini_client import gemini_generate, gemini_stream
+from app.services.reports import copilot_brief, summary, future_forecast, recs
+from pipeline import memo
+
+# Tool calls are independent reads; run them side by side. The LLM call gets its own
+# pool so a slow model response never holds a slot a report lookup is waiting for.
+_TOOL_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="agent-tool")
+_LLM_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="agent-llm")
+
+
+def _timed(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Tuple[Any, float]:
+    t0 = time.perf_counter()
+    out = fn(*args, **kwargs)
+    return out, round((time.perf_counter() - t0) * 1000.0, 2)
 
-def _top_pricing_actions(prc_rows: List[Dict[str, Any]], n: int = 10) -> List[Dict[str, Any]]:
-    # Prefer rows where markdown > 0, then highest profit.
-    def key(r):
-        return (
-            float(r.get("markdown", 0.0) or 0.0),
-            float(r.get("profit", 0.0) or 0.0),
-        )
-
-    out = sorted(prc_rows, key=key, reverse=True)[:n]
-    for i, r in enumerate(out, 1):
-        r["rank"] = i
-        for k in ("base_price", "opt_price", "markdown", "elasticity", "profit"):
-            if k in r:
-                try:
-                    r[k] = _round(float(r[k]), 3)
-                except Exception:
-                    pass
-    return out
 
+def _submit(pool: ThreadPoolExecutor, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+    return pool.submit(_timed, fn, *args, **kwargs)
 
-def _compose_markdown_answer(
-    key_metrics: Dict[str, Any],
-    decisions: List[str],
-    inv_top: List[Dict[str, Any]],
-    prc_top: List[Dict[str, Any]],
-    tradeoffs: List[str],
-    assumptions: List[str],
-    confidence: float,
-) -> str:
-    # Keep this deterministic and presentable.
-    lines: List[str] = []
-    lines.append("KEY METRICS")
-    for k in (
-        "forecast_valid_wape",
-        "forecast_valid_rmse",
-        "stockout_units_before",
-        "stockout_units_after",
-        "stockout_units_pct_change",
-        "total_cost_before",
-        "total_cost_after",
-        "total_cost_pct_change",
-    ):
-        if k in key_metrics and key_metrics[k] is not None:
-            lines.append(f"- {k}: {key_metrics[k]}")
-
-    lines.append("")
-    lines.append("DECISION (what to do now)")
-    for d in decisions:
-        lines.append(f"- {d}")
-
-    def md_table(rows: List[Dict[str, Any]], cols: List[str]) -> List[str]:
-        if not rows:
-            return ["(no rows)"]
-        out = ["| " + " | ".join(cols) + " |", "|" + "|".join(["---"] * len(cols)) + "|"]
-        for r in rows:
-            out.append("| " + " | ".join(str(r.get(c, "")) for c in cols) + " |")
-        return out
-
-    lines.append("")
-    lines.append("TOP 10 INVENTORY ACTIONS")
-    lines += md_table(inv_top, ["rank", "item_id", "avg_pred", "reorder_point", "safety_stock"])
-
-    lines.append("")
-    lines.append("TOP 10 PRICING ACTIONS")
-    lines += md_table(prc_top, ["rank", "item_id", "base_price", "opt_price", "markdown", "elasticity", "profit"])
-
-    lines.append("")
-    lines.append("TRADEOFFS")
-    for t in tradeoffs:
-        lines.append(f"- {t}")
-
-    lines.append("")
-    lines.append("ASSUMPTIONS")
-    for a in assumptions:
-        lines.append(f"- {a}")
-
-    lines.append("")
-    lines.append(f"CONFIDENCE: {round(confidence, 2)}")
-    return "\n".join(lines)
+
+def _fallback_explanation(key_metrics: Dict[str, Any], store_id: Optional[str]) -> str:
+    # Deterministic stand-in when the LLM does not answer within its time budget.
+    m = key_metrics
+    return "\n".join([
+        f"- Demand forecast (validation): WAPE {m.get('forecast_valid_wape')}, RMSE {m.get('forecast_valid_rmse')}.",
+        f"- Inventory policy for {store_id or 'all stores'}: reorder_point = forecast mean + safety_stock.",
+        f"- Simulated stockout units: {m.get('stockout_units_before')} → {m.get('stockout_units_after')}.",
+        f"- Total cost proxy: {m.get('total_cost_before')} → {m.get('total_cost_after')}.",
+        "- Pricing/markdown and assortment tables below are ranked from the same report files.",
+        "- Monitor forecast error and retrain when it drifts.",
+    ])
 
 
 def agent_answer(user_message: str, store_id: Optional[str] = None, item_id: Optional[str] = None):
-    # 1) Tool calls (deterministic)
-    s = summary()
-    inv_rows = recs("inventory", store_id=store_id, limit=200)
-    prc_rows = recs("pricing", store_id=store_id, limit=200)
-    ast_rows = recs("assortment", store_id=store_id, limit=50)
-    fut_rows = future_forecast(store_id=store_id, item_id=item_id, limit=50)
-
-    # 2) Key metrics
-    inv_before = (s.get("inventory_before") or {})
-    inv_after = (s.get("inventory_after") or {})
-    stock_before = inv_before.get("stockout_units")
-    stock_after = inv_after.get("stockout_units")
-    cost_before = inv_before.get("total_cost")
-    cost_after = inv_after.get("total_cost")
-
-    key_metrics: Dict[str, Any] = {
-        "forecast_valid_wape": _round(s.get("forecast_valid_wape"), 3),
-        "forecast_valid_rmse": _round(s.get("forecast_valid_rmse"), 3),
-        "stockout_units_before": _round(stock_before, 3),
-        "stockout_units_after": _round(stock_after, 3),
-        "stockout_units_pct_change": _round(_pct_change(stock_before, stock_after), 3),
-        "total_cost_before": _round(cost_before, 3),
-        "total_cost_after": _round(cost_after, 3),
-        "total_cost_pct_change": _round(_pct_change(cost_before, cost_after), 3),
-    }
+    out: Dict[str, Any] = {}
+    for event, data in agent_events(user_message, store_id, item_id):
+        if event == "done":
+            out = data
+    return out
 
-    inv_top = _top_inventory_actions(inv_rows, 10)
-    prc_top = _top_pricing_actions(prc_rows, 10)
 
-    # 3) Decisions (make it “decision grade”)
-    decisions: List[str] = []
-    if store_id:
-        decisions.append(f"Prioritize replenishment for {store_id}: execute reorder_point + safety_stock for the top 10 SKUs below.")
+def agent_events(
+    user_message: str,
+    store_id: Optional[str] = None,
+    item_id: Optional[str] = None,
+    stream: bool = False,
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Yields the answer in the order its parts become available:
+
+    ("metrics", key metrics + decisions) -> ("actions", tables + memo) ->
+    ("token", explanation text) * n (stream=True only) -> ("done", the full answer dict).
+    """
+    t_start = time.perf_counter()
+
+    # 1) Tool calls (deterministic), all in flight at once.
+    # A precomputed brief (written by run_all) replaces summary/recs/ranking/memo for the store.
+    brief, brief_ms = _timed(copilot_brief, store_id)
+    f_fut = _submit(_TOOL_POOL, future_forecast, store_id=store_id, item_id=item_id, limit=50)
+    if brief is None:
+        f_summary = _submit(_TOOL_POOL, summary)
+        f_inv = _submit(_TOOL_POOL, recs, "inventory", store_id=store_id, limit=200)
+        f_prc = _submit(_TOOL_POOL, recs, "pricing", store_id=store_id, limit=200)
+        f_ast = _submit(_TOOL_POOL, recs, "assortment", store_id=store_id, limit=50)
+
+        s, summary_ms = f_summary.result()
+
+        # 2) Key metrics, 3) decisions (make it “decision grade”)
+        key_metrics = memo.key_metrics(s)
+        decisions = memo.decisions(s, store_id)
     else:
-        decisions.append("Select a store_id (e.g., CA_1) and execute reorder_point + safety_stock for the top 10 SKUs below.")
-    if stock_before is not None and stock_after is not None:
-        decisions.append(
-            f"This policy reduces projected stockout units from {int(stock_before):,} to {int(stock_after):,} (simulated)."
-        )
-    if cost_before is not None and cost_after is not None:
-        decisions.append(
-            f"Total cost proxy changes from {int(cost_before):,} to {int(cost_after):,}; validate holding vs. stockout tradeoff for your service-level target."
-        )
-
-    # 4) Tradeoffs + assumptions (mostly deterministic)
-    tradeoffs = [
-        "Lower stockouts usually increases average inventory on hand (holding cost rises while stockout cost falls).",
-        "Pricing recommendations depend on elasticity assumptions; validate with A/B or historical promo outcomes.",
-        "Forecast error (WAPE/RMSE) compounds into inventory decisions; monitor drift and retrain regularly.",
-    ]
-    assumptions = [
-        "This is a demo using the M5 dataset; item/store IDs are from the dataset, not Nordstrom production catalogs.",
-        "Lead time and service level are simplified; reorder_point is based on forecast mean + safety_stock.",
-        "Profit and cost are proxies; real systems need unit cost, margin, and markdown constraints.",
-    ]
-    confidence = 0.7
+        key_metrics = brief["key_metrics"]
+        decisions = brief["decisions"]
 
-    # 5) Optional: short LLM explanation (kept small to avoid truncation)
+    # 4) Optional: short LLM explanation (kept small to avoid truncation).
+    # The prompt only needs the KPIs, so the request starts while the tables are still loading.
     explain_prompt = f"""
 You are an ML engineer explaining a retail merchandising/inventory recommendation to a recruiter.
 Write 6-8 bullet points max. Use the exact KPI numbers below; do not invent anything.
@@ -211,25 +107,43 @@ KPIs:
 
 Focus on: demand forecasting → inventory optimization → pricing/markdown → assortment, and mention monitoring/retraining.
 """
-    explanation = gemini_generate(explain_prompt).strip()
-
-    answer_md = _compose_markdown_answer(
-        key_metrics=key_metrics,
-        decisions=decisions,
-        inv_top=inv_top,
-        prc_top=prc_top,
-        tradeoffs=tradeoffs,
-        assumptions=assumptions,
-        confidence=confidence,
-    )
-
-    tool_calls = [
-        {"tool": "summary", "ok": bool(s)},
-        {"tool": "recs.inventory", "rows": len(inv_rows)},
-        {"tool": "recs.pricing", "rows": len(prc_rows)},
-        {"tool": "recs.assortment", "rows": len(ast_rows)},
-        {"tool": "forecast.future", "rows": len(fut_rows)},
-    ]
+    fallback = _fallback_explanation(key_metrics, store_id)
+    t_llm = time.perf_counter()
+    if stream:
+        llm_chunks = gemini_stream(explain_prompt, fallback=fallback)
+    else:
+        f_llm = _submit(_LLM_POOL, gemini_generate, explain_prompt, fallback=fallback)
+
+    yield "metrics", {"key_metrics": key_metrics, "decisions": decisions}
+
+    if brief is None:
+        inv_rows, inv_ms = f_inv.result()
+        prc_rows, prc_ms = f_prc.result()
+        ast_rows, ast_ms = f_ast.result()
+
+        inv_top = memo.top_inventory(pd.DataFrame(inv_rows), 10)
+        prc_top = memo.top_pricing(pd.DataFrame(prc_rows), 10)
+        ast_preview = ast_rows[:10]
+
+        # 5) Tradeoffs, assumptions and the memo: the same text a precomputed brief carries
+        answer_md = memo.compose_memo(key_metrics, decisions, inv_top, prc_top)
+
+        # ms: wall time of each call on its worker; total_ms: the whole request
+        tool_calls = [
+            {"tool": "summary", "ok": bool(s), "ms": summary_ms},
+            {"tool": "recs.inventory", "rows": len(inv_rows), "ms": inv_ms},
+            {"tool": "recs.pricing", "rows": len(prc_rows), "ms": prc_ms},
+            {"tool": "recs.assortment", "rows": len(ast_rows), "ms": ast_ms},
+        ]
+    else:
+        inv_top = brief["inventory_actions"]
+        prc_top = brief["pricing_actions"]
+        ast_preview = brief["assortment_preview"]
+        answer_md = brief["answer"]
+        tool_calls = [{"tool": "copilot_brief", "store": store_id or "__all__", "ms": brief_ms}]
+
+    fut_rows, fut_ms = f_fut.result()
+    tool_calls.append({"tool": "forecast.future", "rows": len(fut_rows), "ms": fut_ms})
 
     downloads = {
         "summary_metrics.json": "/downloads/summary_metrics.json",
@@ -239,15 +153,35 @@ Focus on: demand forecasting → inventory optimization → pricing/markdown →
         "future_forecast_next_28d.csv": "/downloads/future_forecast_next_28d.csv",
     }
 
-    return {
+    out = {
         "answer": answer_md,
-        "explanation": explanation,
         "key_metrics": key_metrics,
         "decisions": decisions,
         "inventory_actions": inv_top,
         "pricing_actions": prc_top,
-        "assortment_preview": ast_rows[:10],
+        "assortment_preview": ast_preview,
         "future_forecast_preview": fut_rows[:10],
         "tool_calls": tool_calls,
         "downloads": downloads,
     }
+    yield "actions", out
+
+    if stream:
+        parts: List[str] = []
+        for chunk in llm_chunks:
+            parts.append(chunk)
+            yield "token", {"text": chunk}
+        explanation = "".join(parts).strip()
+        llm_ms = round((time.perf_counter() - t_llm) * 1000.0, 2)
+    else:
+        explanation, llm_ms = f_llm.result()
+        explanation = explanation.strip()
+
+    tool_calls = tool_calls + [
+        {"tool": "llm.explanation", "ok": bool(explanation), "ms": llm_ms},
+        {"tool": "total", "ms": round((time.perf_counter() - t_start) * 1000.0, 2)},
+    ]
+    done = {"answer": answer_md, "explanation": explanation}
+    done.update((k, v) for k, v in out.items() if k != "answer")
+    done["tool_calls"] = tool_calls
+    yield "done", done
@@ -0,0 +1,156 @@
+"""Conditional GET and serialized-response cache for report endpoints.
+
+Report artifacts only change when a pipeline run finishes, so a response is fully determined
+by (endpoint, params, artifact version). The ETag is a hash of exactly that; a matching
+If-None-Match (or an If-Modified-Since not older than the artifact) gets a 304 without
+touching the data. Serialized bodies, and their gzip/brotli encodings, are kept in a
+bounded LRU so repeated requests between runs skip serialization and compression.
+brotli is used when the `brotli` package is installed and the client accepts `br`.
+"""
+
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+MIN_COMPRESS_BYTES = 1024
+MAX_ENTRY_BYTES = 8 * 1024 * 1024
+
+
+def etag_for(key: Hashable, version: str) -> str:
+    return 'W/"' + hashlib.sha1(repr((key, version)).encode("utf-8")).hexdigest()[:20] + '"'
+
+
+def _validators(etag: str, mtime_ns: int) -> Dict[str, str]:
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if mtime_ns:
+        headers["Last-Modified"] = formatdate(mtime_ns / 1e9, usegmt=True)
+    return headers
+
+
+def not_modified(request: Request, etag: str, mtime_ns: int) -> bool:
+    inm = request.headers.get("if-none-match")
+    if inm is not None:
+        # weak comparison: W/"x" and "x" match
+        tags = {t.strip().removeprefix("W/") for t in inm.split(",")}
+        return "*" in tags or etag.removeprefix("W/") in tags
+    ims = request.headers.get("if-modified-since")
+    if ims and mtime_ns:
+        try:
+            return int(mtime_ns // 1_000_000_000) <= int(parsedate_to_datetime(ims).timestamp())
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def not_modified_response(etag: str, mtime_ns: int, vary: str = "Accept-Encoding") -> Response:
+    return Response(status_code=304, headers={**_validators(etag, mtime_ns), "Vary": vary})
+
+
+def _encoding(request: Request) -> Optional[str]:
+    accepted = {p.split(";")[0].strip().lower() for p in request.headers.get("accept-encoding", "").split(",")}
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+class _Entry:
+    __slots__ = ("body", "headers", "encoded", "lock")
+
+    def __init__(self, body: bytes, headers: Dict[str, str]):
+        self.body = body
+        self.headers = headers
+        self.encoded: Dict[str, bytes] = {}
+        self.lock = threading.Lock()
+
+    def encode(self, encoding: str) -> bytes:
+        out = self.encoded.get(encoding)
+        if out is None:
+            with self.lock:
+                out = self.encoded.get(encoding)
+                if out is None:
+                    if encoding == "br":
+                        out = brotli.compress(self.body, quality=5)
+                    else:
+                        out = gzip.compress(self.body, compresslevel=6, mtime=0)
+                    self.encoded[encoding] = out
+        return out
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + sum(len(v) for v in self.encoded.values())
+
+
+class ResponseCache:
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, etag: str) -> Optional[_Entry]:
+        with self._lock:
+            entry = self._entries.get(etag)
+            if entry is not None:
+                self._entries.move_to_end(etag)
+            return entry
+
+    def put(self, etag: str, entry: _Entry) -> None:
+        if len(entry.body) > MAX_ENTRY_BYTES:
+            return
+        with self._lock:
+            self._entries[etag] = entry
+            self._entries.move_to_end(etag)
+            # sizes grow as encodings are added; re-measured on every insert
+            while len(self._entries) > 1 and sum(e.size for e in self._entries.values()) > self.max_bytes:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+response_cache = ResponseCache()
+
+
+def cached_response(
+    request: Request,
+    key: Hashable,
+    version: Tuple[str, int],
+    build: Callable[[], Tuple[bytes, Dict[str, str]]],
+    media_type: str = "application/json",
+) -> Response:
+    '''
+    key:     endpoint + every parameter that shapes the body
+    version: (token, mtime_ns) of the artifacts behind it, from reports.artifact_version
+    build:   returns (serialized body, extra headers such as X-Next-Cursor)
+    '''
+    token, mtime_ns = version
+    etag = etag_for((key, media_type), token)
+    if not_modified(request, etag, mtime_ns):
+        return not_modified_response(etag, mtime_ns)
+
+    entry = response_cache.get(etag)
+    if entry is None:
+        body, extra = build()
+        entry = _Entry(body, extra)
+        response_cache.put(etag, entry)
+
+    headers = {**entry.headers, **_validators(etag, mtime_ns), "Vary": "Accept-Encoding"}
+    body = entry.body
+    encoding = _encoding(request) if len(body) >= MIN_COMPRESS_BYTES else None
+    if encoding:
+        body = entry.encode(encoding)
+        headers["Content-Encoding"] = encoding
+    return Response(body, media_type=media_type, headers=headers)
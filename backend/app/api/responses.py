@@ -0,0 +1,91 @@
+"""Response encodings for tabular endpoints, chosen from the Accept header.
+
+- application/json (default): a JSON array, as before
+- application/x-ndjson: one JSON object per line, streamed in batches
+- application/vnd.apache.arrow.stream: Arrow IPC stream, streamed per record batch
+- application/vnd.apache.parquet: a Parquet file
+
+The cursor of the next page (if any) is sent in the X-Next-Cursor header for every format.
+"""
+
+import io
+import json
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+from fastapi.responses import Response, StreamingResponse
+
+NDJSON = "application/x-ndjson"
+ARROW = "application/vnd.apache.arrow.stream"
+PARQUET = "application/vnd.apache.parquet"
+BATCH_ROWS = 2000
+
+Rows = Union[List[Dict[str, Any]], Any]  # list of dicts or a pyarrow.Table
+
+
+def negotiate(accept: Optional[str]) -> str:
+    accept = (accept or "").lower()
+    for media in (ARROW, PARQUET, NDJSON):
+        if media in accept:
+            return media
+    # common aliases
+    if "application/vnd.apache.arrow.file" in accept or "application/x-arrow" in accept:
+        return ARROW
+    if "application/x-parquet" in accept:
+        return PARQUET
+    return "application/json"
+
+
+def dumps(v: Any) -> str:
+    # dates/timestamps from DuckDB -> ISO strings, like FastAPI's encoder
+    return json.dumps(v, default=lambda o: o.isoformat() if hasattr(o, "isoformat") else str(o))
+
+
+def _batches(data: Rows) -> Iterator[List[Dict[str, Any]]]:
+    if isinstance(data, list):
+        for i in range(0, len(data), BATCH_ROWS):
+            yield data[i:i + BATCH_ROWS]
+    else:
+        for batch in data.to_batches(max_chunksize=BATCH_ROWS):
+            yield batch.to_pylist()
+
+
+def _ndjson(data: Rows) -> Iterator[bytes]:
+    for rows in _batches(data):
+        yield "".join(dumps(r) + "\n" for r in rows).encode("utf-8")
+
+
+def _arrow_table(data: Rows):
+    import pyarrow as pa
+    return pa.Table.from_pylist(data) if isinstance(data, list) else data
+
+
+def _arrow_stream(table) -> Iterator[bytes]:
+    import pyarrow as pa
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        for batch in table.to_batches(max_chunksize=64 * 1024):
+            writer.write_batch(batch)
+            yield sink.getvalue()
+            sink.seek(0)
+            sink.truncate()
+    yield sink.getvalue()
+
+
+def table_response(data: Rows, next_cursor: Optional[str], accept: Optional[str]) -> Response:
+    media = negotiate(accept)
+    headers = {"Vary": "Accept"}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+
+    if media == NDJSON:
+        return StreamingResponse(_ndjson(data), media_type=NDJSON, headers=headers)
+    if media == ARROW:
+        return StreamingResponse(_arrow_stream(_arrow_table(data)), media_type=ARROW, headers=headers)
+    if media == PARQUET:
+        import pyarrow.parquet as pq
+        buf = io.BytesIO()
+        pq.write_table(_arrow_table(data), buf)
+        return Response(buf.getvalue(), media_type=PARQUET, headers=headers)
+
+    rows = data if isinstance(data, list) else data.to_pylist()
+    return Response(dumps(rows), media_type="application/json", headers=headers)
@@ -1,15 +1,30 @@
+import asyncio
+import gzip
 import os
+import shutil
+import tempfile
 from fastapi.responses import JSONResponse
 
 import traceback
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
-from pydantic import BaseModel
+from fastapi import APIRouter, Header, HTTPException, Query, Request
+from fastapi.responses import FileResponse, StreamingResponse
+from datetime import date
 
-from app.agent.orchestrator import agent_answer
+from pydantic import BaseModel, Field
+
+from app.agent.orchestrator import agent_answer, agent_events
+from app.api.http_cache import cached_response, etag_for, not_modified, not_modified_response
+from app.api.responses import dumps, negotiate, table_response
 from app.core.config import settings
+from app.services.jobs import job_manager
+from app.services import monitor
+from app.services.models import SchemaMismatch, list_models
 from app.services.pipeline import forecast_future, retrain, run_all, run_sql
-from app.services.reports import future_forecast, recs, summary
+from app.services.predict import predict_batcher
+from app.services.reports import (
+    REC_FILES, ROLLUP_SOURCES, StaleCursor, artifact_version, future_forecast_page, pipeline_profile, recs_page,
+    rollup_page, summary,
+)
 
 
 router = APIRouter()
@@ -20,6 +35,25 @@ class RunReq(BaseModel):
     max_series: int = 3000
 
 
+class PredictReq(BaseModel):
+    item_id: str
+    store_id: str
+    date: date
+    price: float | None = Field(None, gt=0)
+
+
+class ActualRow(BaseModel):
+    item_id: str | None = None
+    store_id: str | None = None
+    id: str | None = None
+    date: date
+    units: float = Field(ge=0)
+
+
+class ActualsReq(BaseModel):
+    rows: list[ActualRow] = []
+
+
 class AgentReq(BaseModel):
     message: str
     store_id: str | None = None
@@ -36,41 +70,218 @@ def health():
     }
 
 
+def _json_body(data) -> tuple:
+    return dumps(data).encode("utf-8"), {}
+
+
+def _table(request: Request, key: tuple, version, accept: str | None, page):
+    """Paged table response: JSON bodies are cached, other formats are revalidated and re-encoded."""
+    media = negotiate(accept)
+
+    def build():
+        rows, next_cursor = page(media != "application/json")
+        return dumps(rows).encode("utf-8"), ({"X-Next-Cursor": next_cursor} if next_cursor else {})
+
+    try:
+        if media == "application/json":
+            resp = cached_response(request, key, version, build)
+            resp.headers["Vary"] = "Accept, Accept-Encoding"
+            return resp
+        etag = etag_for((key, media), version[0])
+        if not_modified(request, etag, version[1]):
+            return not_modified_response(etag, version[1], vary="Accept, Accept-Encoding")
+        rows, next_cursor = page(True)
+    except StaleCursor as e:
+        raise HTTPException(409, str(e))
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    resp = table_response(rows, next_cursor, accept)
+    resp.headers["ETag"] = etag
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
+
 @router.get("/summary")
-def get_summary():
-    return summary()
+def get_summary(request: Request):
+    version = artifact_version("summary_metrics.json", "retrain_metrics.json")
+    return cached_response(request, ("summary",), version, lambda: _json_body(summary()))
 
 
-@router.post("/pipeline/run_all")
+@router.post("/pipeline/run_all", status_code=202)
 def p_run_all(req: RunReq):
     return run_all(req.zip_path, req.max_series)
 
 
-@router.post("/pipeline/forecast_future")
+@router.post("/pipeline/forecast_future", status_code=202)
 def p_future(req: RunReq):
     return forecast_future(req.zip_path, req.max_series)
 
 
-@router.post("/pipeline/run_sql")
+@router.post("/pipeline/run_sql", status_code=202)
 def p_sql(req: RunReq):
     return run_sql(req.zip_path, req.max_series)
 
 
-@router.post("/pipeline/retrain")
+@router.post("/pipeline/retrain", status_code=202)
 def p_retrain(req: RunReq):
     return retrain(req.zip_path, max(1000, req.max_series))
 
 
+@router.get("/jobs")
+def list_jobs(limit: int = 50):
+    return job_manager.list(limit)
+
+
+@router.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(404, "Unknown job")
+    return job
+
+
+@router.get("/jobs/{job_id}/logs")
+def get_job_logs(job_id: str, offset: int = 0, follow: bool = False):
+    """Job output from byte `offset`; with follow=true the response streams until the job ends."""
+    if job_manager.get(job_id) is None:
+        raise HTTPException(404, "Unknown job")
+    if follow:
+        return StreamingResponse(job_manager.follow_log(job_id, offset), media_type="text/plain; charset=utf-8")
+    text, next_offset = job_manager.read_log(job_id, offset)
+    return {"offset": next_offset, "text": text}
+
+
+@router.post("/jobs/{job_id}/cancel")
+def cancel_job(job_id: str):
+    job = job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(404, "Unknown job")
+    return job
+
+
+@router.get("/models")
+def get_models():
+    """Registered forecast models, newest first, with their metrics and training data key."""
+    return list_models()
+
+
+@router.get("/ops/profile")
+def get_pipeline_profile(request: Request):
+    version = artifact_version("pipeline_profile.json")
+    return cached_response(request, ("ops/profile",), version, lambda: _json_body(pipeline_profile()))
+
+
 @router.get("/forecast/future")
-def get_future(store_id: str | None = None, item_id: str | None = None, limit: int = 1000):
-    return future_forecast(store_id, item_id, limit)
+def get_future(
+    request: Request,
+    store_id: str | None = None,
+    item_id: str | None = None,
+    limit: int = Query(1000, ge=1),
+    cursor: str | None = None,
+    accept: str | None = Header(None),
+):
+    """Paged forecast rows; pass X-Next-Cursor back as `cursor` for the next page."""
+    return _table(
+        request, ("forecast/future", store_id, item_id, limit, cursor),
+        artifact_version("future_forecast_next_28d"), accept,
+        lambda columnar: future_forecast_page(store_id, item_id, limit, cursor, columnar=columnar),
+    )
+
+
+@router.post("/forecast/predict")
+async def post_predict(body: PredictReq | list[PredictReq]):
+    """Point forecasts for one request or a list; concurrent calls share micro-batched model calls."""
+    reqs = body if isinstance(body, list) else [body]
+    futures = [predict_batcher.submit(r.model_dump()) for r in reqs]
+    try:
+        out = [await asyncio.wrap_future(f) for f in futures]
+    except FileNotFoundError as e:
+        raise HTTPException(503, str(e))
+    except SchemaMismatch as e:
+        raise HTTPException(409, str(e))
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    return out if isinstance(body, list) else out[0]
+
+
+@router.get("/forecast/predict/stats")
+def get_predict_stats():
+    """Latency percentiles and batch sizes of /forecast/predict."""
+    return predict_batcher.stats()
+
+
+@router.get("/monitor")
+def get_monitor(level: str = "store_id", limit: int = Query(50, ge=1)):
+    """Running accuracy of the stored forecast against posted actuals, worst keys of `level` first."""
+    try:
+        return monitor.status(level, limit)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+
+@router.post("/monitor/actuals")
+def post_actuals(req: ActualsReq):
+    """Folds daily actuals into the monitor; may submit a retrain."""
+    rows = [r.model_dump(exclude_none=True) for r in req.rows]
+    try:
+        return monitor.ingest(rows)
+    except FileNotFoundError as e:
+        raise HTTPException(503, str(e))
+    except (KeyError, ValueError) as e:
+        raise HTTPException(400, str(e))
+
+
+@router.post("/monitor/reset")
+def reset_monitor():
+    monitor.reset()
+    return {"ok": True}
 
 
 @router.get("/recs/{kind}")
-def get_recs(kind: str, store_id: str | None = None, limit: int = 200):
-    if kind not in {"inventory", "pricing", "assortment", "sql_top_items"}:
+def get_recs(
+    request: Request,
+    kind: str,
+    store_id: str | None = None,
+    limit: int = Query(200, ge=1),
+    cursor: str | None = None,
+    accept: str | None = Header(None),
+):
+    if kind not in REC_FILES:
         raise HTTPException(400, "Invalid kind")
-    return recs(kind, store_id, limit)
+    return _table(
+        request, ("recs", kind, store_id, limit, cursor),
+        artifact_version(REC_FILES[kind].replace(".csv", "")), accept,
+        lambda columnar: recs_page(kind, store_id, limit, cursor),
+    )
+
+
+@router.get("/rollup")
+def get_rollup(
+    request: Request,
+    source: str = "forecast",
+    period: str | None = None,
+    by: str | None = None,
+    state_id: str | None = None,
+    store_id: str | None = None,
+    cat_id: str | None = None,
+    dept_id: str | None = None,
+    item_id: str | None = None,
+    period_start: str | None = None,
+    limit: int = Query(1000, ge=1),
+    cursor: str | None = None,
+    accept: str | None = Header(None),
+):
+    """Pre-aggregated slice, e.g. ?source=forecast&store_id=CA_1&by=dept_id&period=week"""
+    if source not in ROLLUP_SOURCES:
+        raise HTTPException(400, f"source must be one of {', '.join(ROLLUP_SOURCES)}")
+    group_by = [d.strip() for d in (by or "").split(",") if d.strip()]
+    filters = dict(state_id=state_id, store_id=store_id, cat_id=cat_id, dept_id=dept_id, item_id=item_id,
+                   period_start=period_start)
+    return _table(
+        request, ("rollup", source, period, tuple(group_by), tuple(sorted(filters.items())), limit, cursor),
+        artifact_version(f"rollup_{source}"), accept,
+        lambda columnar: rollup_page(source, period, group_by, limit, cursor, **filters),
+    )
 
 
 
@@ -87,13 +298,59 @@ def chat(req: AgentReq):
 
 
 
+def _gzipped(path: str) -> str:
+    """gzip copy of a report file, rebuilt when the file changes."""
+    cache_dir = os.path.join(settings.REPORTS_DIR, ".gzip")
+    gz = os.path.join(cache_dir, os.path.basename(path) + ".gz")
+    if not os.path.exists(gz) or os.path.getmtime(gz) < os.path.getmtime(path):
+        os.makedirs(cache_dir, exist_ok=True)
+        # a private temp file per call: concurrent requests (threads or workers) never share one
+        fd, tmp = tempfile.mkstemp(suffix=".tmp", dir=cache_dir)
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(os.path.basename(path), "wb", 6, raw) as dst, open(path, "rb") as src:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+            os.replace(tmp, gz)
+        except BaseException:
+            os.remove(tmp)
+            raise
+    return gz
+
+
+@router.post("/agent/chat/stream")
+def chat_stream(req: AgentReq):
+    """Server-sent events: metrics, actions, token*, done (or error)."""
+
+    def events():
+        try:
+            for event, data in agent_events(req.message, req.store_id, req.item_id, stream=True):
+                yield f"event: {event}\ndata: {dumps(data)}\n\n"
+        except Exception:
+            yield f"event: error\ndata: {dumps({'error': 'agent_chat_failed', 'trace': traceback.format_exc()})}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/downloads/{filename}")
-def download(filename: str):
-    """Download a report artifact (CSV/JSON) from REPORTS_DIR."""
+def download(
+    filename: str,
+    accept_encoding: str | None = Header(None),
+    range_header: str | None = Header(None, alias="range"),
+):
+    """Download a report artifact (CSV/JSON) from REPORTS_DIR.
+
+    Text artifacts are sent gzip-encoded when the client accepts it; byte-range requests
+    are served from the uncompressed file (FileResponse handles Range / 206).
+    """
 
     allowed = {
         "summary_metrics.json",
         "retrain_metrics.json",
+        "pipeline_profile.json",
+        "copilot_briefs.json",
         "recommendations_inventory.csv",
         "recommendations_pricing.csv",
         "recommendations_assortment.csv",
@@ -111,4 +368,9 @@ def download(filename: str):
     media = "text/csv" if filename.endswith(".csv") else "application/json"
     if filename.endswith(".duckdb"):
         media = "application/octet-stream"
-    return FileResponse(path, media_type=media, filename=filename)
+    elif range_header is None and "gzip" in (accept_encoding or "").lower():
+        return FileResponse(
+            _gzipped(path), media_type=media, filename=filename,
+            headers={"Content-Encoding": "gzip", "Vary": "Accept-Encoding"},
+        )
+    return FileResponse(path, media_type=media, filename=filename, headers={"Vary": "Accept-Encoding"})
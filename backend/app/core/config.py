@@ -1,4 +1,5 @@
 import os
+import sys
 
 from pydantic import BaseModel
 
@@ -12,12 +13,40 @@ def _repo_root() -> str:
 class Settings(BaseModel):
     """Runtime configuration.
 
-    - PIPELINE_REPO: path to the separate forecasting/optimization repo (optional)
+    - PIPELINE_REPO: path to the forecasting/optimization repo (default: this repo); its `pipeline`
+      package is importable from the backend, which reads the model registry and builds the
+      copilot memo with the same code as the pipeline
     - REPORTS_DIR: where CSV/JSON artifacts live (defaults to repo_root/reports)
+    - JOBS_DIR: state + logs of background pipeline jobs (defaults to REPORTS_DIR/jobs)
+    - JOB_CONCURRENCY: how many pipeline jobs may run at once
+    - PIPELINE_DAEMON: socket of a running `python -m pipeline daemon` to send jobs to (optional)
+    - MODEL_VERSION: pin a registry version (vNNNN) instead of following models/CURRENT
+    - PREDICT_WINDOW_MS / PREDICT_MAX_BATCH: micro-batching of /forecast/predict
+    - RETRAIN_TRAIN_MINUTES: training budget of backend-submitted retrain jobs (0: fit on every row)
+    - MONITOR_ALPHA: per-day EWMA weight of the /monitor accuracy accumulators
+    - MONITOR_WAPE_RATIO / MONITOR_MAX_BIAS / MONITOR_MIN_DAYS: when a total/store/category is flagged
+    - MONITOR_RETRAIN_ZIP / MONITOR_RETRAIN_MAX_SERIES: retrain on a flag with this data (empty: only flag)
     """
 
     PIPELINE_REPO: str = os.getenv("PIPELINE_REPO", "")
     REPORTS_DIR: str = os.getenv("REPORTS_DIR", os.path.join(_repo_root(), "reports"))
-
-
-settings = Settings()
\ No newline at end of file
+    JOBS_DIR: str = os.getenv("JOBS_DIR", os.path.join(REPORTS_DIR, "jobs"))
+    JOB_CONCURRENCY: int = int(os.getenv("JOB_CONCURRENCY", "1"))
+    PIPELINE_DAEMON: str = os.getenv("PIPELINE_DAEMON", "")
+    MODEL_VERSION: str = os.getenv("MODEL_VERSION", "")
+    PREDICT_WINDOW_MS: float = float(os.getenv("PREDICT_WINDOW_MS", "5"))
+    PREDICT_MAX_BATCH: int = int(os.getenv("PREDICT_MAX_BATCH", "2048"))
+    RETRAIN_TRAIN_MINUTES: float = float(os.getenv("RETRAIN_TRAIN_MINUTES", "0"))
+    MONITOR_ALPHA: float = float(os.getenv("MONITOR_ALPHA", "0.2"))
+    MONITOR_WAPE_RATIO: float = float(os.getenv("MONITOR_WAPE_RATIO", "1.25"))
+    MONITOR_MAX_BIAS: float = float(os.getenv("MONITOR_MAX_BIAS", "0.25"))
+    MONITOR_MIN_DAYS: int = int(os.getenv("MONITOR_MIN_DAYS", "7"))
+    MONITOR_RETRAIN_ZIP: str = os.getenv("MONITOR_RETRAIN_ZIP", "")
+    MONITOR_RETRAIN_MAX_SERIES: int = int(os.getenv("MONITOR_RETRAIN_MAX_SERIES", "3000"))
+
+
+settings = Settings()
+
+PIPELINE_ROOT = os.path.abspath(settings.PIPELINE_REPO or _repo_root())
+if PIPELINE_ROOT not in sys.path:
+    sys.path.append(PIPELINE_ROOT)
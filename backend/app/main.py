@@ -1,13 +1,22 @@
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.routes import router
+from app.services.jobs import job_manager
 from fastapi.responses import PlainTextResponse
 import traceback
 
 load_dotenv()
 
-app = FastAPI(title="Merch & Inventory ML API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    job_manager.shutdown()
+
+
+app = FastAPI(title="Merch & Inventory ML API", lifespan=lifespan)
 
 
 @app.get("/")
@@ -29,6 +38,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Last-Modified"],
 )
 
 app.include_router(router)
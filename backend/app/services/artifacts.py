@@ -0,0 +1,56 @@
+"""Versioned, memory-mapped report artifacts (written by pipeline/artifacts.py).
+
+REPORTS_DIR/artifacts/<name>/<version>.<ext>, with a CURRENT file naming the live version.
+Arrow tables are opened with mmap, so every worker process maps the same page-cache pages
+read-only instead of holding its own copy.
+A publish swaps CURRENT; each worker notices the new version on its next lookup and
+switches over, the old mapping goes away with the last reference to it.
+"""
+
+import os
+from typing import Any, Optional, Tuple
+
+from app.core.config import settings
+from app.services.cache import file_version, report_cache
+
+
+class ArtifactStore:
+    def __init__(self, reports_dir: str):
+        self.root = os.path.join(reports_dir, "artifacts")
+
+    def _pointer(self, name: str) -> str:
+        return os.path.join(self.root, name, "CURRENT")
+
+    def version(self, name: str) -> Optional[Tuple[int, int]]:
+        # CURRENT is replaced on every publish: its mtime/size is the artifact version
+        return file_version(self._pointer(name))
+
+    def has(self, name: str) -> bool:
+        return self.version(name) is not None
+
+    def path(self, name: str) -> Optional[str]:
+        try:
+            with open(self._pointer(name), "r", encoding="utf-8") as f:
+                fn = f.read().strip()
+        except OSError:
+            return None
+        return os.path.join(self.root, name, fn) if fn else None
+
+    def get(self, name: str, loader) -> Any:
+        '''loader(path) for the current version of `name`, cached until CURRENT changes.'''
+        def load():
+            path = self.path(name)
+            return loader(path) if path else None
+        return report_cache.get(("artifact", name), lambda: self.version(name), load)
+
+    def table(self, name: str):
+        '''The current version as a pyarrow.Table backed by a read-only memory map (None if unpublished).'''
+        def load(path: str):
+            import pyarrow as pa
+            with pa.memory_map(path, "r") as source:
+                # buffers keep the mapping alive after the file handle is closed
+                return pa.ipc.open_file(source).read_all()
+        return self.get(name, load)
+
+
+artifacts = ArtifactStore(settings.REPORTS_DIR)
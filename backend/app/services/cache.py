@@ -0,0 +1,155 @@
+"""In-process cache for report artifacts.
+
+Each artifact is loaded once and kept until its file (or Parquet dataset directory)
+changes on disk. A reload builds a complete new snapshot and swaps it in with a single
+dict assignment, so concurrent readers see either the old or the new snapshot.
+"""
+
+import os
+import threading
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def file_version(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+class ReportCache:
+    def __init__(self):
+        self._entries: Dict[Hashable, Tuple[Any, Any]] = {}
+        self._locks: Dict[Hashable, threading.Lock] = {}
+        self._guard = threading.Lock()
+
+    def _lock(self, key: Hashable) -> threading.Lock:
+        with self._guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def get(self, key: Hashable, version: Callable[[], Any], loader: Callable[[], Any]) -> Any:
+        v = version()
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == v:
+            return entry[1]
+        # one loader per key; other threads wait and then reuse its result
+        with self._lock(key):
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == v:
+                return entry[1]
+            value = loader()
+            # only keep it if the file did not change while we were reading it
+            if version() == v:
+                self._entries[key] = (v, value)
+            return value
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+class IndexedFrame:
+    """A sorted, read-only frame with row positions precomputed per key value."""
+
+    def __init__(self, df: pd.DataFrame, keys: Iterable[Sequence[str]] = (), materialize: bool = True,
+                 lazy_keys: bool = False):
+        # lazy_keys: index any other filter combination the first time it is asked for
+        df = df.reset_index(drop=True)
+        self.lazy_keys = lazy_keys
+        # NaN -> None once, so records are JSON-ready
+        self.df = df.astype(object).where(df.notna(), None) if len(df) else df
+        self.columns = list(df.columns)
+        self.records = self.df.to_dict(orient="records") if materialize else None
+        self.index: Dict[Tuple[str, ...], Dict[Any, np.ndarray]] = {}
+        for k in keys:
+            k = tuple(sorted(k))
+            if all(c in df.columns for c in k):
+                # groupby().indices keeps positions ascending, i.e. in the frame's sort order
+                by = list(k) if len(k) > 1 else k[0]
+                self.index[k] = df.groupby(by, sort=False).indices
+
+    def __len__(self) -> int:
+        return len(self.df)
+
+    def rows(self, limit: Optional[int] = None, offset: int = 0, **filters: Any):
+        active = {c: v for c, v in filters.items() if v is not None and c in self.columns}
+        if active:
+            key = tuple(sorted(active))
+            idx = self.index.get(key)
+            if idx is None and self.lazy_keys:
+                # built outside any lock: a concurrent first lookup only duplicates the work
+                idx = self.index[key] = self.df.groupby(list(key) if len(key) > 1 else key[0], sort=False).indices
+            if idx is not None:
+                pos = idx.get(active[key[0]] if len(key) == 1 else tuple(active[c] for c in key), np.empty(0, dtype=np.int64))
+            else:
+                mask = np.ones(len(self.df), dtype=bool)
+                for c, v in active.items():
+                    mask &= (self.df[c] == v).to_numpy()
+                pos = np.flatnonzero(mask)
+        else:
+            pos = np.arange(len(self.df))
+        pos = pos[max(0, int(offset)):]
+        if limit is not None:
+            pos = pos[:max(0, int(limit))]
+        if self.records is not None:
+            # copies: callers (e.g. the orchestrator) annotate rows in place
+            return [dict(self.records[i]) for i in pos]
+        return self.df.iloc[pos].to_dict(orient="records")
+
+
+class ArrowFrame:
+    """IndexedFrame over a read-only (typically memory-mapped) Arrow table.
+
+    Only the per-key row positions live on the process heap; column data stays in the mapped
+    file, shared with every other worker, and dicts are built just for the rows returned.
+    """
+
+    def __init__(self, table, keys: Iterable[Sequence[str]] = (), lazy_keys: bool = False):
+        self.table = table
+        self.columns = list(table.column_names)
+        self.lazy_keys = lazy_keys
+        self.index: Dict[Tuple[str, ...], Dict[Any, np.ndarray]] = {}
+        for k in keys:
+            k = tuple(sorted(k))
+            if all(c in self.columns for c in k):
+                self.index[k] = self._group(k)
+
+    def _values(self, c: str) -> np.ndarray:
+        col = self.table.column(c)
+        # dates are looked up by their ISO string, as they arrive in query parameters
+        return (col.cast("string") if str(col.type).startswith("date") else col).to_numpy()
+
+    def _group(self, key: Tuple[str, ...]) -> Dict[Any, np.ndarray]:
+        cols = {c: self._values(c) for c in key}
+        by = list(key) if len(key) > 1 else key[0]
+        return pd.DataFrame(cols).groupby(by, sort=False).indices
+
+    def __len__(self) -> int:
+        return self.table.num_rows
+
+    def positions(self, **filters: Any) -> np.ndarray:
+        active = {c: v for c, v in filters.items() if v is not None and c in self.columns}
+        if not active:
+            return np.arange(self.table.num_rows)
+        key = tuple(sorted(active))
+        idx = self.index.get(key)
+        if idx is None and self.lazy_keys:
+            idx = self.index[key] = self._group(key)
+        if idx is not None:
+            return idx.get(active[key[0]] if len(key) == 1 else tuple(active[c] for c in key), np.empty(0, dtype=np.int64))
+        mask = np.ones(self.table.num_rows, dtype=bool)
+        for c, v in active.items():
+            mask &= self._values(c) == v
+        return np.flatnonzero(mask)
+
+    def rows(self, limit: Optional[int] = None, offset: int = 0, **filters: Any):
+        pos = self.positions(**filters)[max(0, int(offset)):]
+        if limit is not None:
+            pos = pos[:max(0, int(limit))]
+        return self.table.take(pos).to_pylist()
+
+
+report_cache = ReportCache()
@@ -0,0 +1,239 @@
+"""Background job queue for the pipeline scripts.
+
+Submitting a job returns immediately; a bounded worker pool runs the script as a subprocess
+and streams its output into a log file. Job state is kept as one JSON file per job under
+JOBS_DIR, so the job list survives a backend restart: queued jobs are re-queued and jobs
+that were running are marked interrupted (their process is not ours to reattach to).
+On shutdown the running scripts are killed and marked interrupted the same way; queued
+jobs stay queued on disk for the next start.
+"""
+
+import json
+import os
+import re
+import signal
+import subprocess
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.core.config import settings
+
+ACTIVE = ("queued", "running")
+# scripts announce their stages as "3) Train + validate forecast model..."
+STEP_RE = re.compile(r"^\s*(\d+)\)\s*(.+?)\s*$")
+STEPS = {"run_all": 6}
+
+
+def _now() -> float:
+    return round(time.time(), 3)
+
+
+class JobManager:
+    def __init__(self, jobs_dir: str, max_workers: int = 1):
+        self.dir = jobs_dir
+        os.makedirs(self.dir, exist_ok=True)
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._procs: Dict[str, subprocess.Popen] = {}
+        self._lock = threading.RLock()
+        self._closed = False
+        self._pool = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="job")
+        self._recover()
+
+    def _path(self, job_id: str, ext: str) -> str:
+        return os.path.join(self.dir, f"{job_id}.{ext}")
+
+    def _save(self, job: Dict[str, Any]) -> None:
+        path = self._path(job["id"], "json")
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(job, f, indent=2)
+        os.replace(tmp, path)
+
+    def _recover(self) -> None:
+        queued = []
+        for fn in sorted(os.listdir(self.dir)):
+            if not fn.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.dir, fn), "r", encoding="utf-8") as f:
+                    job = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if job.get("status") == "running":
+                job.update(status="interrupted", finished_at=_now(), error="backend restarted while the job was running")
+                self._save(job)
+            elif job.get("status") == "queued":
+                job.pop("cancel_requested", None)
+                queued.append(job)
+            self._jobs[job["id"]] = job
+        for job in sorted(queued, key=lambda j: j["created_at"]):
+            self._pool.submit(self._run, job["id"])
+
+    @staticmethod
+    def _public(job: Dict[str, Any]) -> Dict[str, Any]:
+        return {k: v for k, v in job.items() if k != "key"}
+
+    def submit(self, kind: str, cmd: List[str], cwd: str, args: Dict[str, Any]) -> Dict[str, Any]:
+        key = json.dumps([kind, args], sort_keys=True)
+        with self._lock:
+            # an identical request that is still queued/running is the same job
+            for job in self._jobs.values():
+                if job["key"] == key and job["status"] in ACTIVE:
+                    return {**self._public(job), "deduplicated": True}
+            job_id = uuid.uuid4().hex[:12]
+            job = {
+                "id": job_id,
+                "kind": kind,
+                "args": args,
+                "key": key,
+                "cmd": " ".join(cmd),
+                "argv": cmd,
+                "cwd": cwd,
+                "status": "queued",
+                "created_at": _now(),
+                "started_at": None,
+                "finished_at": None,
+                "returncode": None,
+                "progress": {"step": 0, "total": STEPS.get(kind), "message": "queued"},
+            }
+            self._jobs[job_id] = job
+            self._save(job)
+        self._pool.submit(self._run, job_id)
+        return self._public(job)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            out = {**self._public(job), "progress": dict(job["progress"])}
+        if out["started_at"]:
+            out["elapsed_s"] = round((out["finished_at"] or time.time()) - out["started_at"], 2)
+        return out
+
+    def list(self, limit: int = 50) -> List[Dict[str, Any]]:
+        with self._lock:
+            jobs = sorted(self._jobs.values(), key=lambda j: j["created_at"], reverse=True)[:limit]
+            return [self.get(j["id"]) for j in jobs]
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if job["status"] == "queued":
+                job.update(status="cancelled", finished_at=_now())
+                self._save(job)
+            elif job["status"] == "running":
+                job["cancel_requested"] = True
+                self._save(job)
+                proc = self._procs.get(job_id)
+                if proc is not None:
+                    self._kill(proc)
+        return self.get(job_id)
+
+    @staticmethod
+    def _kill(proc: subprocess.Popen) -> None:
+        if proc.poll() is not None:
+            return
+        # the script may have spawned workers: signal the whole process group
+        if hasattr(os, "killpg"):
+            try:
+                os.killpg(proc.pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        else:
+            proc.terminate()
+
+    def shutdown(self) -> None:
+        '''Drops queued work, kills the running scripts and marks their jobs interrupted.'''
+        with self._lock:
+            self._closed = True
+            for job_id, proc in self._procs.items():
+                job = self._jobs[job_id]
+                job.update(status="interrupted", finished_at=_now(), error="backend shut down while the job was running")
+                self._save(job)
+                self._kill(proc)
+        # the worker threads are not daemons: with their scripts killed they finish promptly
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, job_id: str) -> None:
+        with self._lock:
+            job = self._jobs[job_id]
+            if self._closed or job["status"] != "queued":
+                return
+            job.update(status="running", started_at=_now())
+            job["progress"] = {**job["progress"], "message": "starting"}
+            self._save(job)
+
+        env = {**os.environ, "PYTHONUNBUFFERED": "1", "PYTHONIOENCODING": "utf-8"}
+        rc, error = None, None
+        try:
+            with open(self._path(job_id, "log"), "a", encoding="utf-8") as log:
+                proc = subprocess.Popen(
+                    job["argv"], cwd=job["cwd"], env=env,
+                    stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                    text=True, encoding="utf-8", errors="replace", bufsize=1,
+                    start_new_session=True,
+                )
+                with self._lock:
+                    self._procs[job_id] = proc
+                    job["pid"] = proc.pid
+                    self._save(job)
+                if job.get("cancel_requested") or self._closed:
+                    self._kill(proc)
+                for line in proc.stdout:
+                    log.write(line)
+                    log.flush()
+                    m = STEP_RE.match(line)
+                    if m:
+                        with self._lock:
+                            job["progress"] = {"step": int(m.group(1)), "total": STEPS.get(job["kind"]), "message": m.group(2)}
+                            self._save(job)
+                rc = proc.wait()
+        except OSError as e:
+            error = str(e)
+        finally:
+            with self._lock:
+                self._procs.pop(job_id, None)
+                if job["status"] == "interrupted":  # shutdown() already recorded it
+                    job["returncode"] = rc
+                else:
+                    if job.get("cancel_requested"):
+                        status = "cancelled"
+                    else:
+                        status = "succeeded" if rc == 0 else "failed"
+                    job.update(status=status, returncode=rc, finished_at=_now())
+                    if error:
+                        job["error"] = error
+                    if status == "succeeded":
+                        job["progress"] = {**job["progress"], "step": job["progress"]["total"] or job["progress"]["step"], "message": "done"}
+                self._save(job)
+
+    def read_log(self, job_id: str, offset: int = 0) -> Tuple[str, int]:
+        try:
+            with open(self._path(job_id, "log"), "rb") as f:
+                f.seek(offset)
+                data = f.read()
+        except OSError:
+            return "", offset
+        return data.decode("utf-8", errors="replace"), offset + len(data)
+
+    def follow_log(self, job_id: str, offset: int = 0, poll_s: float = 0.5) -> Iterator[str]:
+        '''Yields log output as it is written until the job has finished.'''
+        while True:
+            with self._lock:
+                done = self._jobs[job_id]["status"] not in ACTIVE
+            chunk, offset = self.read_log(job_id, offset)
+            if chunk:
+                yield chunk
+            elif done:
+                return
+            else:
+                time.sleep(poll_s)
+
+
+job_manager = JobManager(settings.JOBS_DIR, settings.JOB_CONCURRENCY)
@@ -0,0 +1,65 @@
+"""Forecast models from the registry written by pipeline/registry.py.
+
+REPORTS_DIR/models/vNNNN/{model.txt, meta.json}; models/CURRENT names the live version unless
+MODEL_VERSION pins one. The layout, meta reading and schema check come from pipeline.registry
+itself (importable via app.core.config), so the two cannot drift. Models
+are LightGBM text files parsed into a Booster (no unpickling), cached per version; promoting a
+new version is picked up on the next lookup.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.core.config import settings
+from app.services.cache import file_version, report_cache
+
+from pipeline import registry
+from pipeline.registry import SchemaMismatch  # noqa: F401  (re-exported for routes/predict)
+
+
+def current_version() -> Optional[str]:
+    return settings.MODEL_VERSION or registry.current_version(settings.REPORTS_DIR)
+
+
+def model_meta(version: str) -> Optional[Dict[str, Any]]:
+    path = registry.version_path(settings.REPORTS_DIR, version, registry.META_FILE)
+    return report_cache.get(("model-meta", version), lambda: file_version(path),
+                            lambda: registry.read_meta(settings.REPORTS_DIR, version))
+
+
+def list_models() -> List[Dict[str, Any]]:
+    current = current_version()
+    out = []
+    for v in reversed(registry.versions(settings.REPORTS_DIR)):
+        meta = model_meta(v) or {}
+        out.append({
+            "version": v,
+            "current": v == current,
+            "created_at": meta.get("created_at"),
+            "metrics": meta.get("metrics"),
+            "data_key": meta.get("data_key"),
+            "params": meta.get("params"),
+            "tiers": meta.get("tiers"),
+        })
+    return out
+
+
+def load_model(version: Optional[str] = None, feature_cols: Optional[Sequence[str]] = None) -> Tuple[Dict[str, Any], Any]:
+    '''
+    (meta, lightgbm.Booster) of `version` (default: the current one). With `feature_cols`, raises
+    SchemaMismatch unless the model was trained on exactly that feature list.
+    '''
+    version = version or current_version()
+    if version is None:
+        raise FileNotFoundError("no model registered (run run_all.py or retrain.py)")
+    meta = model_meta(version)
+    if meta is None:
+        raise FileNotFoundError(f"model version {version} is not registered")
+    if feature_cols is not None:
+        registry.check_schema(version, meta["feature_cols"], feature_cols)
+    path = registry.version_path(settings.REPORTS_DIR, version, registry.MODEL_FILE)
+
+    def load():
+        import lightgbm as lgb
+        return lgb.Booster(model_file=path)
+
+    return meta, report_cache.get(("model", version), lambda: file_version(path), load)
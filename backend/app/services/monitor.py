@@ -0,0 +1,368 @@
+"""Streaming forecast-accuracy monitor for /monitor.
+
+Daily actuals (item, store, date, units) are matched against the stored
+future_forecast_next_28d.csv and folded into running accumulators for the total, every
+store, category and item: row count, absolute error, error (pred - actual, so positive is
+over-forecast) and actual units, plus an exponentially weighted (MONITOR_ALPHA per day)
+version of the daily sums. Each posted day costs one update per key it touches, never a
+re-scoring of the history; WAPE and bias are ratios of the sums.
+
+Each series keeps a watermark, the last date ingested for it: rows at or before it are
+skipped, so re-posting is a no-op and a day may arrive over several posts (late items of a
+store join the day's sums), but a series' older day cannot be back-filled once a later one
+is in.
+
+The state is a columnar JSON snapshot, REPORTS_DIR/monitor_state.json, keyed to the
+forecast file it was built against (a new forecast, from forecast-future, starts it over),
+plus monitor_deltas.jsonl: each post appends one line with the rows it counted, and every
+COMPACT_EVERY posts the deltas are folded into a rewritten snapshot. A post therefore
+writes O(its rows); loading replays the deltas through the same watermarks, which makes a
+line already in the snapshot a no-op. When the total, a store or a category has
+seen MONITOR_MIN_DAYS days and its EWMA WAPE exceeds MONITOR_WAPE_RATIO x the model's
+validation WAPE, or its EWMA bias exceeds MONITOR_MAX_BIAS in either direction, it is
+flagged; with MONITOR_RETRAIN_ZIP set a flag also submits a `retrain` job, once: until
+that job fails or a new forecast arrives, further flags only report.
+"""
+
+import itertools
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.core.config import settings
+from app.services import pipeline
+from app.services.cache import file_version, report_cache
+from app.services.jobs import job_manager
+from app.services.models import current_version, model_meta
+
+STATE_FILE = "monitor_state.json"
+DELTA_FILE = "monitor_deltas.jsonl"
+COMPACT_EVERY = 500
+FORECAST_FILE = "future_forecast_next_28d.csv"
+LEVELS = ("total", "store_id", "cat_id", "item_id")
+ALERT_LEVELS = ("total", "store_id", "cat_id")
+TOTAL = "__all__"
+# one accumulator per key: last day seen, days seen, then running and EWMA daily sums
+FIELDS = ("last_date", "days", "n", "abs_err", "err", "actual", "ewma_abs_err", "ewma_err", "ewma_actual")
+_SUMS = slice(2, 6)
+_EWMA = slice(6, 9)
+_RETRY = ("failed", "cancelled", "interrupted")
+
+_lock = threading.Lock()
+# version: of the snapshot; offset: bytes of DELTA_FILE replayed; posts: lines since the snapshot;
+# fresh: state not yet persisted (new forecast)
+_cached: Dict[str, Any] = {"version": None, "offset": 0, "posts": 0, "fresh": False, "state": None}
+
+
+def _path(name: str) -> str:
+    return os.path.join(settings.REPORTS_DIR, name)
+
+
+def _forecast_token() -> Optional[List[int]]:
+    v = file_version(_path(FORECAST_FILE))
+    return list(v) if v else None
+
+
+def _forecast():
+    '''(pred_units indexed by (item_id, store_id, date), {base id: (item_id, store_id)}) of the stored forecast.'''
+    path = _path(FORECAST_FILE)
+
+    def load():
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"no {FORECAST_FILE} in REPORTS_DIR (run forecast_future first)")
+        df = pd.read_csv(path, usecols=lambda c: c in ("id", "item_id", "store_id", "date", "pred_units"))
+        pred = pd.Series(df["pred_units"].to_numpy(np.float64),
+                         index=pd.MultiIndex.from_arrays([df["item_id"], df["store_id"], df["date"]]))
+        pred = pred[~pred.index.duplicated(keep="last")]
+        ids = {}
+        if "id" in df.columns:
+            first = df.drop_duplicates("id")
+            ids = {_base_id(i): (it, st) for i, it, st in zip(first["id"], first["item_id"], first["store_id"])}
+        return pred, ids
+
+    return report_cache.get(("monitor-forecast", path), lambda: file_version(path), load)
+
+
+def _base_id(series_id: str) -> str:
+    # FOODS_3_090_CA_1_validation / _evaluation -> FOODS_3_090_CA_1
+    return series_id.rsplit("_", 1)[0] if series_id.endswith(("_validation", "_evaluation")) else series_id
+
+
+def _empty_state() -> Dict[str, Any]:
+    # series: {"item_id/store_id": last date ingested}
+    return {"forecast": _forecast_token(), "series": {}, "unmatched": 0, "trigger": None,
+            "levels": {level: {} for level in LEVELS}}
+
+
+def _load_state() -> Dict[str, Any]:
+    '''
+    Current state: the snapshot (reloaded when another process rewrote it) plus the deltas
+    appended since; only new lines are replayed. Starts over when the forecast changed.
+    '''
+    path = _path(STATE_FILE)
+    version = file_version(path)
+    if _cached["state"] is None or _cached["version"] != version:
+        state = None
+        if version is not None:
+            with open(path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+            state = {**raw, "series": dict(zip(raw["series"]["key"], raw["series"]["last_date"])),
+                     "levels": {level: {k: list(row) for k, *row in zip(cols["key"], *(cols[f] for f in FIELDS))}
+                                for level, cols in raw["levels"].items()}}
+        _cached.update(version=version, offset=0, posts=0, fresh=False, state=state)
+    if _cached["state"] is not None and not _cached["fresh"]:
+        _replay(_cached["state"])
+    state = _cached["state"]
+    if state is None or state["forecast"] != _forecast_token():
+        state = _empty_state()
+        _cached.update(state=state, fresh=True)
+    return state
+
+
+def _replay(state: Dict[str, Any]) -> None:
+    path = _path(DELTA_FILE)
+    try:
+        with open(path, "rb") as f:
+            f.seek(_cached["offset"])
+            data = f.read()
+    except FileNotFoundError:
+        return
+    end = data.rfind(b"\n") + 1  # a line still being written is left for the next load
+    for line in data[:end].splitlines():
+        delta = json.loads(line)
+        rows = pd.DataFrame({c: delta[c] for c in ("item_id", "store_id", "date", "units", "pred")})
+        _fold(state, rows.astype({"item_id": str, "store_id": str, "date": str, "units": np.float64, "pred": np.float64}))
+        state["trigger"] = delta["trigger"]
+        _cached["posts"] += 1
+    _cached["offset"] += end
+
+
+def _save(state: Dict[str, Any]) -> None:
+    '''Rewrites the snapshot and drops the deltas it now contains.'''
+    levels = {}
+    for level, acc in state["levels"].items():
+        cols: Dict[str, list] = {"key": list(acc)}
+        for i, f in enumerate(FIELDS):
+            cols[f] = [row[i] for row in acc.values()]
+        levels[level] = cols
+    series = {"key": list(state["series"]), "last_date": list(state["series"].values())}
+    path = _path(STATE_FILE)
+    os.makedirs(settings.REPORTS_DIR, exist_ok=True)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({**state, "series": series, "levels": levels}, f, separators=(",", ":"))
+    os.replace(path + ".tmp", path)
+    try:
+        os.remove(_path(DELTA_FILE))
+    except FileNotFoundError:
+        pass
+    _cached.update(version=file_version(path), offset=0, posts=0, fresh=False, state=state)
+
+
+def _append(state: Dict[str, Any], rows: pd.DataFrame) -> None:
+    '''Persists a post: one delta line with its counted rows, or a compaction every COMPACT_EVERY posts.'''
+    if _cached["fresh"] or _cached["posts"] >= COMPACT_EVERY:
+        _save(state)
+        return
+    delta = {c: rows[c].tolist() for c in ("item_id", "store_id", "date", "units")}
+    delta["pred"] = [None if np.isnan(p) else p for p in rows["pred"].tolist()]
+    delta["trigger"] = state["trigger"]
+    with open(_path(DELTA_FILE), "ab") as f:
+        f.write(json.dumps(delta, separators=(",", ":")).encode("utf-8") + b"\n")
+        _cached.update(offset=f.tell(), posts=_cached["posts"] + 1)
+
+
+def _update(acc: Dict[str, list], key: str, day: str, sums: Tuple[float, ...], alpha: float) -> None:
+    row = acc.get(key)
+    if row is None:
+        acc[key] = [day, 1, *sums, *sums[1:]]
+        return
+    for i, x in enumerate(sums, start=_SUMS.start):
+        row[i] += x
+    if day > row[0]:
+        row[0] = day
+        row[1] += 1
+        for i, x in enumerate(sums[1:], start=_EWMA.start):
+            row[i] = alpha * x + (1 - alpha) * row[i]
+    else:
+        # more rows of the latest day (or a late one): part of the latest day's weight
+        w = 1.0 if row[1] == 1 else alpha
+        for i, x in enumerate(sums[1:], start=_EWMA.start):
+            row[i] += w * x
+
+
+def _fold(state: Dict[str, Any], df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    '''
+    Counts the rows of `df` (item_id, store_id, date, units, pred; pred NaN where the forecast
+    has no such series-day) that are past their series' watermark and advances it. Returns
+    (the new rows, those of them that were matched and scored).
+    '''
+    last = state["series"]
+    series = (df["item_id"] + "/" + df["store_id"]).tolist()
+    new = np.fromiter((d > last.get(k, "") for k, d in zip(series, df["date"])), dtype=bool, count=len(df))
+    df = df[new]
+    for k, d in zip(itertools.compress(series, new), df["date"]):
+        if d > last.get(k, ""):
+            last[k] = d
+    matched = df["pred"].notna().to_numpy()
+    state["unmatched"] += int((~matched).sum())
+    scored = df[matched]
+    scored = scored.assign(cat_id=scored["item_id"].str.split("_", n=1).str[0], total=TOTAL,
+                           err=scored["pred"] - scored["units"], abs_err=(scored["pred"] - scored["units"]).abs(), n=1)
+
+    alpha = settings.MONITOR_ALPHA
+    for day, rows_day in scored.groupby("date", sort=True):
+        for level in LEVELS:
+            acc = state["levels"][level]
+            g = rows_day.groupby(level, sort=False)[["n", "abs_err", "err", "units"]].sum()
+            for key, sums in zip(g.index, g.itertuples(index=False, name=None)):
+                _update(acc, key, day, tuple(float(x) for x in sums), alpha)
+    return df, scored
+
+
+def _metrics(row: list) -> Dict[str, Any]:
+    r = dict(zip(FIELDS, row))
+    ratio = lambda num, den: num / den if den > 0 else None  # noqa: E731
+    return {
+        "last_date": r["last_date"], "days": r["days"], "rows": int(r["n"]),
+        "actual_units": r["actual"], "abs_error": r["abs_err"], "error": r["err"],
+        "wape": ratio(r["abs_err"], r["actual"]), "bias": ratio(r["err"], r["actual"]),
+        "ewma_wape": ratio(r["ewma_abs_err"], r["ewma_actual"]), "ewma_bias": ratio(r["ewma_err"], r["ewma_actual"]),
+    }
+
+
+def _to_frame(rows: List[Dict[str, Any]], ids: Dict[str, Tuple[str, str]]) -> pd.DataFrame:
+    df = pd.DataFrame(rows)
+    if df.empty:
+        return pd.DataFrame(columns=["item_id", "store_id", "date", "units"])
+    if "units" not in df.columns or "date" not in df.columns:
+        raise ValueError("actuals need date and units columns")
+    if "id" in df.columns:
+        keys = [ids.get(_base_id(i)) if isinstance(i, str) else None for i in df["id"]]
+        for col, pos in (("item_id", 0), ("store_id", 1)):
+            from_id = pd.Series([k[pos] if k else None for k in keys], index=df.index)
+            df[col] = df[col].fillna(from_id) if col in df.columns else from_id
+    if "item_id" not in df.columns or "store_id" not in df.columns:
+        raise ValueError("actuals need item_id and store_id (or a series id)")
+    df["date"] = pd.to_datetime(df["date"]).dt.strftime("%Y-%m-%d")
+    df["units"] = pd.to_numeric(df["units"], errors="raise").astype(np.float64)
+    if (df["units"] < 0).any():
+        raise ValueError("units must be >= 0")
+    return df[["item_id", "store_id", "date", "units"]]
+
+
+def baseline_wape() -> Optional[float]:
+    '''Validation WAPE of the current model (the summary's, if no model is registered).'''
+    version = current_version()
+    meta = model_meta(version) if version else None
+    wape = (meta or {}).get("metrics", {}).get("valid_wape")
+    if wape is None:
+        path = _path("summary_metrics.json")
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                wape = json.load(f).get("forecast_valid_wape")
+    return wape
+
+
+def _alerts(state: Dict[str, Any], baseline: Optional[float]) -> List[Dict[str, Any]]:
+    out = []
+    for level in ALERT_LEVELS:
+        for key, row in state["levels"][level].items():
+            m = _metrics(row)
+            if m["days"] < settings.MONITOR_MIN_DAYS:
+                continue
+            reasons = []
+            if baseline and m["ewma_wape"] is not None and m["ewma_wape"] > settings.MONITOR_WAPE_RATIO * baseline:
+                reasons.append(f"ewma_wape {m['ewma_wape']:.3f} > {settings.MONITOR_WAPE_RATIO:g} x baseline {baseline:.3f}")
+            if m["ewma_bias"] is not None and abs(m["ewma_bias"]) > settings.MONITOR_MAX_BIAS:
+                reasons.append(f"|ewma_bias| {abs(m['ewma_bias']):.3f} > {settings.MONITOR_MAX_BIAS:g}")
+            if reasons:
+                out.append({"level": level, "key": key, "reason": "; ".join(reasons),
+                            "ewma_wape": m["ewma_wape"], "ewma_bias": m["ewma_bias"]})
+    return out
+
+
+def _maybe_retrain(state: Dict[str, Any], alerts: List[Dict[str, Any]]) -> None:
+    if not alerts or not settings.MONITOR_RETRAIN_ZIP:
+        return
+    trigger = state.get("trigger")
+    if trigger:
+        job = job_manager.get(trigger["job_id"])
+        if job is not None and job["status"] not in _RETRY:
+            return
+    job = pipeline.retrain(settings.MONITOR_RETRAIN_ZIP, settings.MONITOR_RETRAIN_MAX_SERIES)
+    first = alerts[0]
+    state["trigger"] = {"at": round(time.time(), 3), "job_id": job["id"],
+                        "reason": f"{first['level']} {first['key']}: {first['reason']}", "alerts": len(alerts)}
+
+
+def ingest(rows: Optional[List[Dict[str, Any]]] = None, path: Optional[str] = None) -> Dict[str, Any]:
+    '''
+    Folds actuals ({item_id, store_id, date, units} or {id, date, units} rows, or a CSV at `path`;
+    the HTTP route passes rows only) into the monitor. Returns what was counted; raises
+    FileNotFoundError without a stored forecast.
+    '''
+    pred, ids = _forecast()
+    frames = [_to_frame(rows or [], ids)]
+    if path:
+        if not os.path.exists(path):
+            raise ValueError(f"no actuals file at {path}")
+        frames.append(_to_frame(pd.read_csv(path).to_dict("records"), ids))
+    df = pd.concat(frames, ignore_index=True).drop_duplicates(["item_id", "store_id", "date"], keep="last")
+
+    df = df.assign(pred=pred.reindex(pd.MultiIndex.from_arrays([df["item_id"], df["store_id"], df["date"]])).to_numpy())
+
+    with _lock:
+        state = _load_state()
+        new, scored = _fold(state, df)
+        alerts = _alerts(state, baseline_wape())
+        _maybe_retrain(state, alerts)
+        _append(state, new)
+
+    return {"rows": int(len(scored)), "days": sorted(scored["date"].unique().tolist()), "skipped": int(len(df) - len(new)),
+            "unmatched": int(len(new) - len(scored)), "alerts": len(alerts), "trigger": state["trigger"]}
+
+
+def status(level: str = "store_id", limit: int = 50) -> Dict[str, Any]:
+    '''Monitor state: totals, the worst `limit` keys of `level` by EWMA WAPE, alerts and the retrain trigger.'''
+    if level not in LEVELS:
+        raise ValueError(f"level must be one of {', '.join(LEVELS)}")
+    with _lock:
+        state = _load_state()
+        baseline = baseline_wape()
+        alerts = _alerts(state, baseline)
+        rows = [{"key": k, **_metrics(r)} for k, r in state["levels"][level].items()]
+        trigger = state["trigger"]
+    rows.sort(key=lambda r: -1.0 if r["ewma_wape"] is None else r["ewma_wape"], reverse=True)
+    total = state["levels"]["total"].get(TOTAL)
+    if trigger:
+        job = job_manager.get(trigger["job_id"])
+        trigger = {**trigger, "job_status": job["status"] if job else None}
+    return {
+        "forecast_version": state["forecast"],
+        "baseline_wape": baseline,
+        "thresholds": {"alpha": settings.MONITOR_ALPHA, "wape_ratio": settings.MONITOR_WAPE_RATIO,
+                       "max_bias": settings.MONITOR_MAX_BIAS, "min_days": settings.MONITOR_MIN_DAYS,
+                       "retrain": bool(settings.MONITOR_RETRAIN_ZIP)},
+        "total": _metrics(total) if total else None,
+        "level": level,
+        "count": len(rows),
+        "rows": rows[:limit],
+        "alerts": alerts,
+        "unmatched": state["unmatched"],
+        "trigger": trigger,
+    }
+
+
+def reset() -> None:
+    with _lock:
+        for name in (STATE_FILE, DELTA_FILE):
+            try:
+                os.remove(_path(name))
+            except FileNotFoundError:
+                pass
+        _cached.update(version=None, offset=0, posts=0, fresh=False, state=None)
@@ -1,30 +1,26 @@
-import os, subprocess, time
-from typing import Dict, Any
-from app.core.config import settings
+import sys
+from typing import Any, Dict, Sequence
+from app.core.config import PIPELINE_ROOT, settings
+from app.services.jobs import job_manager
 
-def _run(cmd: list[str], cwd: str) -> Dict[str, Any]:
-    start = time.time()
-    p = subprocess.run(cmd, cwd=cwd, capture_output=True, text=True)
-    return {
-        "cmd": " ".join(cmd),
-        "returncode": p.returncode,
-        "stdout_tail": (p.stdout or "")[-4000:],
-        "stderr_tail": (p.stderr or "")[-4000:],
-        "duration_s": round(time.time() - start, 2),
-    }
+def _submit(kind: str, command: str, zip_path: str, max_series: int, extra: Sequence[str] = ()) -> Dict[str, Any]:
+    # queued on the job pool; poll /jobs/{id} for status and /jobs/{id}/logs for output.
+    # With PIPELINE_DAEMON set the command runs on a warm `python -m pipeline daemon`; its
+    # output streams back through this process, and cancelling the job cancels it there too.
+    daemon = ["--daemon", settings.PIPELINE_DAEMON] if settings.PIPELINE_DAEMON else []
+    cmd = [sys.executable, "-m", "pipeline", *daemon, command, "--zip_path", zip_path, "--max_series", str(max_series), *extra]
+    return job_manager.submit(kind, cmd, PIPELINE_ROOT, {"zip_path": zip_path, "max_series": max_series})
 
 def run_all(zip_path: str, max_series: int = 3000):
-    repo = os.path.abspath(settings.PIPELINE_REPO)
-    return _run(["python","scripts/run_all.py","--zip_path",zip_path,"--max_series",str(max_series)], repo)
+    return _submit("run_all", "run-all", zip_path, max_series)
 
 def forecast_future(zip_path: str, max_series: int = 3000):
-    repo = os.path.abspath(settings.PIPELINE_REPO)
-    return _run(["python","scripts/forecast_future.py","--zip_path",zip_path,"--max_series",str(max_series)], repo)
+    return _submit("forecast_future", "forecast-future", zip_path, max_series)
 
 def run_sql(zip_path: str, max_series: int = 3000):
-    repo = os.path.abspath(settings.PIPELINE_REPO)
-    return _run(["python","scripts/run_sql_pipeline.py","--zip_path",zip_path,"--max_series",str(max_series)], repo)
+    return _submit("run_sql", "sql", zip_path, max_series)
 
 def retrain(zip_path: str, max_series: int = 5000):
-    repo = os.path.abspath(settings.PIPELINE_REPO)
-    return _run(["python","scripts/retrain.py","--zip_path",zip_path,"--max_series",str(max_series)], repo)
+    # a budgeted fit samples rows to finish in RETRAIN_TRAIN_MINUTES (pipeline/sampling.py)
+    budget = ["--train_minutes", str(settings.RETRAIN_TRAIN_MINUTES)] if settings.RETRAIN_TRAIN_MINUTES > 0 else []
+    return _submit("retrain", "retrain", zip_path, max_series, budget)
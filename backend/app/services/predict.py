@@ -0,0 +1,337 @@
+"""Online forecasts for /forecast/predict.
+
+A Predictor holds the current registry model plus the series_state and calendar_state
+artifacts written by run_all (pipeline/online.py): per series its ids, the last 28 days of
+units, rolling stats and last price as of its last observed day. A request (item, store,
+date, optional price) becomes one feature row without touching the training data:
+lag_k is read from that history when the date is within k days of it (missing otherwise,
+as LightGBM handles it), rolling stats are those of the last observed window. For a tiered
+model the state also holds tail_rate, the flat forecast of the series it routes to an
+intermittent-demand estimator; those series get that rate instead of the booster's output.
+An unknown item/store pair has no history to route on. For a tiered model it goes to the
+intermittent tier at a cold-start rate: the mean tail_rate of the tail series of the same
+store x dept, else dept, else store, else all of them. The booster was trained only on the
+dense head, so it is not used for new series. An untiered model scores them with the booster,
+with every history feature missing. Each result names the method that produced it.
+
+The flat rates do not see the request's price, so a price is applied to them with the
+constant-elasticity curve of pipeline/pricing.py, starting from the series' last price. The
+elasticity is the series' estimate in the published pricing recommendations, or
+DEFAULT_ELASTICITY. A cold-start series has no last price, so its rate ignores the price.
+`price_response` says how the price entered the result: lgbm, elasticity or null (ignored).
+Rows served by a rate are not sent to the booster.
+
+Requests are not predicted one by one: a MicroBatcher thread collects whatever arrives
+within PREDICT_WINDOW_MS of the first waiting request and runs a single vectorized
+Booster.predict over the batch. It also keeps the latency distribution behind
+/forecast/predict/stats. A new model version or a new state publish is picked up at
+the next batch.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from datetime import date
+from queue import Empty, SimpleQueue
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.artifacts import artifacts
+from app.services.cache import report_cache
+from app.services.models import SchemaMismatch, current_version, load_model
+from pipeline.pricing import DEFAULT_ELASTICITY, price_response
+
+_EPOCH = date(1970, 1, 1)
+
+
+def _days(d: date) -> int:
+    return (d - _EPOCH).days
+
+
+def _column(table, name: str) -> np.ndarray:
+    return table.column(name).to_numpy()
+
+
+def _item_hierarchy(item_id: str) -> tuple:
+    # FOODS_3_090 -> (FOODS_3, FOODS)
+    return item_id.rsplit("_", 1)[0], item_id.split("_", 1)[0]
+
+
+class Predictor:
+    """Immutable snapshot of (model, series state, calendar); rebuilt when any of them changes."""
+
+    def __init__(self, meta: Dict[str, Any], booster, state, calendar, elasticity=None):
+        self.version = meta["version"]
+        self.feature_cols: List[str] = meta["feature_cols"]
+        self.booster = booster
+        # categorical features are fed as their training category codes (unseen -> NaN)
+        self.codes = {c: {v: float(i) for i, v in enumerate(cats)} for c, cats in meta.get("categorical", {}).items()}
+
+        items = state.column("item_id").to_pylist()
+        stores = state.column("store_id").to_pylist()
+        self.index = {(i, s): n for n, (i, s) in enumerate(zip(items, stores))}
+        self.last_day = _column(state, "last_date").astype("datetime64[D]").astype(np.int64)
+        hist = state.column("history").combine_chunks()
+        self.history = hist.flatten().to_numpy(zero_copy_only=False).astype(np.float32).reshape(len(hist), -1)
+        self.stats = {c: _column(state, c).astype(np.float32)
+                      for c in state.column_names if c.startswith("roll_")}
+        self.last_price = _column(state, "last_price").astype(np.float32)
+        # tiered models: series routed to an intermittent estimator are forecast at its flat rate
+        self.tail_rate = _column(state, "tail_rate").astype(np.float32) if "tail_rate" in state.column_names else None
+        self.cold_rate: Dict[tuple, float] = {}
+        if self.tail_rate is not None:
+            depts = state.column("dept_id").to_pylist()
+            sums: Dict[tuple, list] = {}
+            for n in np.flatnonzero(np.isfinite(self.tail_rate)):
+                for key in ((stores[n], depts[n]), (None, depts[n]), (stores[n], None), (None, None)):
+                    acc = sums.setdefault(key, [0.0, 0])
+                    acc[0] += float(self.tail_rate[n])
+                    acc[1] += 1
+            self.cold_rate = {k: total / count for k, (total, count) in sums.items()}
+        # per-series elasticity for repricing the tail rates (recommendations_pricing covers a subset)
+        self.elasticity = np.full(len(items), DEFAULT_ELASTICITY, dtype=np.float32)
+        if elasticity is not None:
+            for i, s, e in zip(*(elasticity.column(c).to_pylist() for c in ("item_id", "store_id", "elasticity"))):
+                n = self.index.get((i, s))
+                if n is not None and e is not None:
+                    self.elasticity[n] = e
+
+        cal_days = _column(calendar, "date").astype("datetime64[D]").astype(np.int64)
+        self.first_day = int(cal_days[0])
+        self.calendar = {c: _column(calendar, c).astype(np.float32) for c in calendar.column_names if c != "date"}
+        if not np.array_equal(cal_days, np.arange(self.first_day, self.first_day + len(cal_days))):
+            raise ValueError("calendar_state is not a contiguous range of days")
+
+        missing = [c for c in self.feature_cols if c not in self._buildable()]
+        if missing:
+            raise SchemaMismatch(f"model {self.version} needs features the online state lacks: {missing}")
+
+    def _buildable(self) -> set:
+        lags = {f"lag_{k}" for k in range(1, self.history.shape[1] + 1)}
+        return (set(self.codes) | set(self.stats) | lags | {
+            "item_id", "dept_id", "cat_id", "store_id", "state_id", "weekday", "month", "year", "snap",
+            "is_event", "sell_price_filled", "price_change_pct", "price_isna",
+        })
+
+    @property
+    def date_range(self) -> tuple:
+        first = np.datetime64(self.first_day, "D")
+        return str(first), str(first + len(self.calendar["wday"]) - 1)
+
+    def predict(self, requests: Sequence[Dict[str, Any]]) -> List[Any]:
+        '''
+        requests: {item_id, store_id, date (datetime.date), price (optional)}.
+        Returns one result dict per request, or a ValueError for a request that cannot be scored.
+        '''
+        n = len(requests)
+        out: List[Any] = [None] * n
+        rows = np.full(n, -1, dtype=np.int64)
+        cal_pos = np.zeros(n, dtype=np.int64)
+        ok = np.ones(n, dtype=bool)
+        n_days = len(self.calendar["wday"])
+        for j, r in enumerate(requests):
+            pos = _days(r["date"]) - self.first_day
+            if not 0 <= pos < n_days:
+                lo, hi = self.date_range
+                out[j] = ValueError(f"date {r['date']} is outside the forecastable range {lo}..{hi}")
+                ok[j] = False
+                continue
+            cal_pos[j] = pos
+            rows[j] = self.index.get((r["item_id"], r["store_id"]), -1)
+        todo = np.flatnonzero(ok)
+        if len(todo) == 0:
+            return out
+
+        reqs = [requests[j] for j in todo]
+        rows, cal_pos = rows[todo], cal_pos[todo]
+        known = rows >= 0
+        safe = np.where(known, rows, 0)
+        horizon = np.where(known, cal_pos + self.first_day - self.last_day[safe], 0)
+
+        def per_series(values: np.ndarray) -> np.ndarray:
+            return np.where(known, values[safe], np.nan).astype(np.float32)
+
+        cols: Dict[str, np.ndarray] = {}
+        ids = {
+            "item_id": [r["item_id"] for r in reqs],
+            "store_id": [r["store_id"] for r in reqs],
+        }
+        ids["dept_id"] = [_item_hierarchy(i)[0] for i in ids["item_id"]]
+        ids["cat_id"] = [_item_hierarchy(i)[1] for i in ids["item_id"]]
+        ids["state_id"] = [s.split("_", 1)[0] for s in ids["store_id"]]
+        for c, values in ids.items():
+            codes = self.codes.get(c, {})
+            cols[c] = np.array([codes.get(v, np.nan) for v in values], dtype=np.float32)
+
+        cols["weekday"] = self.calendar["wday"][cal_pos]
+        for c in ("month", "year", "is_event"):
+            cols[c] = self.calendar[c][cal_pos]
+        snap = np.zeros(len(reqs), dtype=np.float32)
+        for state in ("CA", "TX", "WI"):
+            snap = np.where(np.array(ids["state_id"]) == state, self.calendar[f"snap_{state}"][cal_pos], snap)
+        cols["snap"] = snap
+
+        last_price = per_series(self.last_price)
+        asked = np.array([np.nan if r.get("price") is None else r["price"] for r in reqs], dtype=np.float32)
+        price = np.where(np.isnan(asked), last_price, asked)
+        cols["sell_price_filled"] = price
+        with np.errstate(all="ignore"):
+            change = np.where(last_price > 0, price / last_price - 1.0, 0.0)
+        cols["price_change_pct"] = np.nan_to_num(change, nan=0.0, posinf=0.0, neginf=0.0).astype(np.float32)
+        cols["price_isna"] = np.isnan(price).astype(np.float32)
+
+        for c in self.feature_cols:
+            if c.startswith("lag_"):
+                # lag_k of a day h days after the last observed one is history[k - h], if observed
+                back = int(c[4:]) - horizon
+                observed = known & (back >= 0) & (back < self.history.shape[1])
+                back = np.clip(back, 0, self.history.shape[1] - 1)
+                cols[c] = np.where(observed, self.history[safe, back], np.nan).astype(np.float32)
+        for c, values in self.stats.items():
+            cols[c] = per_series(values)
+
+        method = np.full(len(reqs), "lgbm", dtype=object)
+        rate = np.full(len(reqs), np.nan, dtype=np.float32)
+        if self.tail_rate is not None:
+            rate = per_series(self.tail_rate)
+            method[known & ~np.isnan(rate)] = "intermittent"
+            for k in np.flatnonzero(~known):
+                store, dept = ids["store_id"][k], ids["dept_id"][k]
+                for key in ((store, dept), (None, dept), (store, None), (None, None)):
+                    if key in self.cold_rate:
+                        rate[k] = self.cold_rate[key]
+                        method[k] = "cold_start"
+                        break
+
+        response = np.where(method == "lgbm", "lgbm", None).astype(object)
+        repriced = (method == "intermittent") & (last_price > 0)
+        with np.errstate(all="ignore"):
+            rate = np.where(repriced, price_response(rate, last_price, price, per_series(self.elasticity)), rate)
+        response[repriced] = "elasticity"
+
+        pred = rate.astype(np.float64)
+        boost = method == "lgbm"
+        if boost.any():
+            X = np.column_stack([cols[c][boost] for c in self.feature_cols])
+            pred[boost] = np.clip(self.booster.predict(X), 0, None)
+        for k, j in enumerate(todo):
+            r = reqs[k]
+            out[j] = {
+                "item_id": r["item_id"],
+                "store_id": r["store_id"],
+                "date": r["date"].isoformat(),
+                "pred_units": round(float(pred[k]), 4),
+                "price": None if np.isnan(price[k]) else round(float(price[k]), 4),
+                "horizon_days": int(horizon[k]) if known[k] else None,
+                "known_series": bool(known[k]),
+                "method": method[k],
+                "price_response": response[k],
+                "model_version": self.version,
+            }
+        return out
+
+
+def current_predictor() -> Predictor:
+    def version():
+        return (current_version(), artifacts.version("series_state"), artifacts.version("calendar_state"),
+                artifacts.version("recommendations_pricing"))
+
+    def load():
+        state, calendar = artifacts.table("series_state"), artifacts.table("calendar_state")
+        if state is None or calendar is None:
+            raise FileNotFoundError("no series state published (run run_all.py)")
+        meta, booster = load_model()
+        return Predictor(meta, booster, state, calendar, artifacts.table("recommendations_pricing"))
+
+    return report_cache.get(("predictor",), version, load)
+
+
+class MicroBatcher:
+    """Runs fn(list of items) -> list of results on a background thread, a batch at a time.
+
+    A batch closes window_s after its first item arrived or at max_batch items, whichever
+    comes first; an idle batcher adds no delay beyond the window.
+    """
+
+    def __init__(self, fn: Callable[[List[Any]], List[Any]], window_s: float = 0.005, max_batch: int = 2048,
+                 keep: int = 100_000):
+        self.fn = fn
+        self.window_s = window_s
+        self.max_batch = max_batch
+        self._queue: SimpleQueue = SimpleQueue()
+        self._latency_ms: deque = deque(maxlen=keep)
+        self._batches: deque = deque(maxlen=keep)
+        self._done = 0
+        self._errors = 0
+        self._started_at = time.time()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, item: Any) -> Future:
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._loop, name="predict-batcher", daemon=True)
+                    self._thread.start()
+        fut: Future = Future()
+        self._queue.put((time.perf_counter(), item, fut))
+        return fut
+
+    def _loop(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = batch[0][0] + self.window_s
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.perf_counter()
+                try:
+                    batch.append(self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait())
+                except Empty:
+                    break
+            self._run(batch)
+
+    def _run(self, batch: List[tuple]) -> None:
+        started = time.perf_counter()
+        try:
+            results = self.fn([item for _, item, _ in batch])
+        except Exception as e:  # the whole batch fails alike (e.g. no model yet)
+            results = [e] * len(batch)
+        done = time.perf_counter()
+        for (t0, _, fut), res in zip(batch, results):
+            if isinstance(res, Exception):
+                self._errors += 1
+                fut.set_exception(res)
+            else:
+                fut.set_result(res)
+            self._latency_ms.append((done - t0) * 1000.0)
+        self._done += len(batch)
+        self._batches.append((len(batch), (done - started) * 1000.0))
+
+    def stats(self) -> Dict[str, Any]:
+        lat = np.array(self._latency_ms, dtype=np.float64)
+        batches = np.array(self._batches, dtype=np.float64).reshape(-1, 2)
+
+        def pct(a: np.ndarray, q: float) -> Optional[float]:
+            return round(float(np.percentile(a, q)), 3) if len(a) else None
+
+        return {
+            "window_ms": self.window_s * 1000.0,
+            "max_batch": self.max_batch,
+            "predictions": self._done,
+            "errors": self._errors,
+            "uptime_s": round(time.time() - self._started_at, 1),
+            # over the last `keep` predictions / batches; latency is queueing + batch + predict
+            "latency_ms": {"p50": pct(lat, 50), "p90": pct(lat, 90), "p99": pct(lat, 99), "max": pct(lat, 100)},
+            "batch_size": {"mean": round(float(batches[:, 0].mean()), 1) if len(batches) else None,
+                           "max": int(batches[:, 0].max()) if len(batches) else None},
+            "batch_predict_ms": {"p50": pct(batches[:, 1], 50), "p99": pct(batches[:, 1], 99)},
+        }
+
+
+predict_batcher = MicroBatcher(
+    lambda reqs: current_predictor().predict(reqs),
+    window_s=settings.PREDICT_WINDOW_MS / 1000.0,
+    max_batch=settings.PREDICT_MAX_BATCH,
+)
@@ -0,0 +1,138 @@
+"""DuckDB query layer over the partitioned Parquet report datasets.
+
+The pipeline writes REPORTS_DIR/parquet/<name>/store_id=<id>/*.parquet. Each dataset is
+exposed as a view; filters, ordering and limits are pushed into DuckDB so a lookup reads
+only the matching partition (and row groups, via min/max stats) instead of a whole CSV.
+"""
+
+import os
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
+import duckdb
+
+from app.core.config import settings
+
+
+class ReportStore:
+    def __init__(self, reports_dir: str):
+        self.root = os.path.join(reports_dir, "parquet")
+        self._con = duckdb.connect(":memory:")
+        # keep parsed Parquet footers between queries
+        self._con.execute("SET enable_object_cache = true")
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._columns: Dict[str, Any] = {}
+
+    def _cursor(self) -> duckdb.DuckDBPyConnection:
+        # one cursor per worker thread: cursors share the database but are safe to use concurrently
+        cur = getattr(self._local, "cur", None)
+        if cur is None:
+            cur = self._local.cur = self._con.cursor()
+        return cur
+
+    def _glob(self, name: str) -> str:
+        return os.path.join(self.root, name, "**", "*.parquet").replace("'", "''")
+
+    def version(self, name: str) -> int:
+        # the pipeline swaps whole dataset directories in, so the directory mtime marks a new version
+        try:
+            return os.stat(os.path.join(self.root, name)).st_mtime_ns
+        except OSError:
+            return 0
+
+    def has(self, name: str) -> bool:
+        return self.version(name) != 0
+
+    def columns(self, name: str) -> List[str]:
+        version = self.version(name)
+        cached = self._columns.get(name)
+        if cached is None or cached[0] != version:
+            with self._lock:
+                self._con.execute(
+                    f"CREATE OR REPLACE VIEW {name} AS "
+                    f"SELECT * FROM read_parquet('{self._glob(name)}', hive_partitioning = true)"
+                )
+                cols = [r[0] for r in self._con.execute(f"DESCRIBE {name}").fetchall()]
+                cached = self._columns[name] = (version, cols)
+        return cached[1]
+
+    def select(
+        self,
+        name: str,
+        columns: Optional[Sequence[str]] = None,
+        exprs: Optional[Dict[str, str]] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        order_by: Optional[Sequence[str]] = None,
+        descending: bool = False,
+        limit: Optional[int] = None,
+        after: Optional[Sequence[Any]] = None,
+        offset: int = 0,
+    ) -> List[Dict[str, Any]]:
+        '''
+        columns: output columns that exist in the dataset (default: all, in file order)
+        exprs:   extra computed columns {alias: sql_expression}, appended after `columns`
+        filters: equality filters; None values are skipped
+        after:   keyset cursor, the `order_by` values of the last row already returned
+        offset:  rows to skip after ordering (offset cursors)
+        '''
+        sql, params = self._sql(name, columns, exprs, filters, order_by, descending, limit, after, offset)
+        res = self._cursor().execute(sql, params)
+        names = [d[0] for d in res.description]
+        return [dict(zip(names, row)) for row in res.fetchall()]
+
+    def select_arrow(self, name: str, batch_size: int = 65536, **kwargs: Any):
+        '''Same query as select(), returned as a pyarrow.Table (no per-row Python objects).'''
+        sql, params = self._sql(name, **kwargs)
+        return self._cursor().execute(sql, params).fetch_record_batch(batch_size).read_all()
+
+    def _sql(
+        self,
+        name: str,
+        columns: Optional[Sequence[str]] = None,
+        exprs: Optional[Dict[str, str]] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        order_by: Optional[Sequence[str]] = None,
+        descending: bool = False,
+        limit: Optional[int] = None,
+        after: Optional[Sequence[Any]] = None,
+        offset: int = 0,
+    ):
+        known = self.columns(name)
+        cols = [c for c in (columns or known) if c in known]
+        select = [f'"{c}"' for c in cols] + [f'{sql} AS "{alias}"' for alias, sql in (exprs or {}).items()]
+
+        where, params = [], []
+        for col, val in (filters or {}).items():
+            if val is None or col not in known:
+                continue
+            where.append(f'"{col}" = ?')
+            params.append(val)
+
+        sortable = [c for c in (order_by or []) if c in known or c in (exprs or {})]
+        if after is not None:
+            # (a, b) > (x, y) spelled out, so each value is compared against its own column type
+            op = "<" if descending else ">"
+            terms = []
+            for i, col in enumerate(sortable):
+                eq = [f'"{c}" = ?' for c in sortable[:i]]
+                terms.append("(" + " AND ".join(eq + [f'"{col}" {op} ?']) + ")")
+                params.extend(list(after[:i]) + [after[i]])
+            where.append("(" + " OR ".join(terms) + ")")
+
+        sql = f"SELECT {', '.join(select)} FROM {name}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        if sortable:
+            direction = " DESC" if descending else ""
+            sql += " ORDER BY " + ", ".join(f'"{c}"{direction}' for c in sortable)
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        if offset:
+            sql += " OFFSET ?"
+            params.append(int(offset))
+        return sql, params
+
+
+report_db = ReportStore(settings.REPORTS_DIR)
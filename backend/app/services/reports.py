@@ -1,11 +1,27 @@
 import os
+import json
+import base64
+import hashlib
+import datetime as dt
 import pandas as pd
-import numpy as np
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Sequence, Tuple
 from app.core.config import settings
+from app.services.artifacts import artifacts
+from app.services.cache import ArrowFrame, IndexedFrame, file_version, report_cache
+from app.services.query import report_db
+from pipeline.memo import INVENTORY_COLS, inventory_actions
+
+FUTURE_COLS = ["id","item_id","store_id","date","pred_units","sell_price_filled","snap","is_event"]
+REC_FILES = {
+    "inventory": "recommendations_inventory.csv",
+    "pricing": "recommendations_pricing.csv",
+    "assortment": "recommendations_assortment.csv",
+    "sql_top_items": "sql_top_items.csv",
+}
+# lookup keys the API filters on; each gets a precomputed position index
+INDEX_KEYS = [("store_id",), ("item_id",), ("store_id", "item_id")]
 
 def _read_json(path: str) -> Dict[str, Any]:
-    import json
     if not os.path.exists(path): return {}
     with open(path, "r", encoding="utf-8") as f:
         return json.load(f)
@@ -14,58 +30,252 @@ def _read_csv(path: str) -> pd.DataFrame:
     if not os.path.exists(path): return pd.DataFrame()
     return pd.read_csv(path)
 
+def encode_cursor(state: Dict[str, Any]) -> str:
+    raw = json.dumps(state, separators=(",", ":"), default=lambda v: v.isoformat()).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: Optional[str]) -> Dict[str, Any]:
+    if not cursor: return {}
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        raise ValueError("Invalid cursor")
+    if not isinstance(state, dict):
+        raise ValueError("Invalid cursor")
+    return state
+
+class StaleCursor(ValueError):
+    '''The cursor was issued for an earlier version of the data.'''
+
+def _offset_page(fetch, limit: int, cursor: Optional[str], version: str, **filters) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    # fetch(limit, offset=..., **filters): a cached frame's rows() or a query
+    # a row offset is only stable within one version of the data, so the cursor carries it
+    state = decode_cursor(cursor)
+    if state and "o" not in state:
+        raise ValueError("Cursor does not belong to this result")
+    if state and state.get("v") != version:
+        raise StaleCursor("The data changed since this cursor was issued; start again from the first page")
+    try:
+        offset = int(state.get("o", 0))
+    except (TypeError, ValueError):
+        raise ValueError("Invalid cursor")
+    rows = fetch(limit + 1, offset=offset, **filters)
+    if len(rows) > limit:
+        return rows[:limit], encode_cursor({"o": offset + limit, "v": version})
+    return rows, None
+
+def _version_tag(*names: str) -> str:
+    '''Short digest of artifact_version(*names), for cursors.'''
+    return hashlib.sha1(artifact_version(*names)[0].encode("utf-8")).hexdigest()[:12]
+
+def artifact_version(*names: str) -> Tuple[str, int]:
+    '''
+    (token, newest mtime_ns) over report artifacts. A name without an extension is a published
+    Arrow artifact, else a Parquet dataset, else <name>.csv; the token changes whenever any of
+    them is rewritten.
+    '''
+    parts, newest = [], 0
+    for name in names:
+        if "." not in name and artifacts.has(name):
+            v = artifacts.version(name)
+            parts.append(f"{name}:arrow:{v[0]}:{v[1]}")
+            newest = max(newest, v[0])
+            continue
+        if "." not in name and report_db.has(name):
+            v = report_db.version(name)
+            parts.append(f"{name}:pq:{v}")
+            newest = max(newest, v)
+            continue
+        fn = name if "." in name else name + ".csv"
+        fv = file_version(os.path.join(settings.REPORTS_DIR, fn))
+        parts.append(f"{fn}:{fv[0]}:{fv[1]}" if fv else f"{fn}:-")
+        if fv: newest = max(newest, fv[0])
+    return "|".join(parts), newest
+
+def _cached_json(name: str) -> Dict[str, Any]:
+    path = os.path.join(settings.REPORTS_DIR, name)
+    return report_cache.get(("json", path), lambda: file_version(path), lambda: _read_json(path))
+
 def summary():
-    s = _read_json(os.path.join(settings.REPORTS_DIR, "summary_metrics.json"))
-    s["retrain_metrics"] = _read_json(os.path.join(settings.REPORTS_DIR, "retrain_metrics.json"))
+    # build a new dict: the cached ones are shared between requests
+    s = dict(_cached_json("summary_metrics.json"))
+    s["retrain_metrics"] = _cached_json("retrain_metrics.json")
     return s
 
+def pipeline_profile():
+    return _cached_json("pipeline_profile.json")
+
+def copilot_brief(store_id: Optional[str]) -> Optional[Dict[str, Any]]:
+    '''Precomputed copilot answer for a store (None: all stores), if run_all wrote one.'''
+    briefs = _cached_json("copilot_briefs.json")
+    if briefs.get("version") != 1: return None
+    # a summary written after the briefs means they describe an older run
+    b = file_version(os.path.join(settings.REPORTS_DIR, "copilot_briefs.json"))
+    s = file_version(os.path.join(settings.REPORTS_DIR, "summary_metrics.json"))
+    if b is None or (s is not None and s[0] > b[0]): return None
+    return briefs.get("stores", {}).get(store_id or "__all__")
+
+def _future_frame() -> IndexedFrame:
+    path = os.path.join(settings.REPORTS_DIR, "future_forecast_next_28d.csv")
+
+    def load():
+        df = _read_csv(path)
+        if not df.empty:
+            df = df.sort_values(["date", "id"] if "id" in df.columns else ["date"], kind="stable")
+        # ~1M rows: keep the frame, build dicts only for the rows a request returns
+        return IndexedFrame(df, keys=INDEX_KEYS, materialize=False)
+
+    return report_cache.get(("csv", path), lambda: file_version(path), load)
+
 def future_forecast(store_id: Optional[str]=None, item_id: Optional[str]=None, limit: int=1000):
-    df = _read_csv(os.path.join(settings.REPORTS_DIR, "future_forecast_next_28d.csv"))
-    if df.empty: return []
-    if store_id: df = df[df["store_id"] == store_id]
-    if item_id: df = df[df["item_id"] == item_id]
-    df = df.sort_values("date").head(limit)
-    return df.to_dict(orient="records")
+    return future_forecast_page(store_id, item_id, limit)[0]
 
-def recs(kind: str, store_id: Optional[str]=None, limit: int=200):
-    file_map = {
-        "inventory": "recommendations_inventory.csv",
-        "pricing": "recommendations_pricing.csv",
-        "assortment": "recommendations_assortment.csv",
-        "sql_top_items": "sql_top_items.csv",
-    }
-    path = file_map.get(kind)
-    if not path: return []
-
-    df = _read_csv(os.path.join(settings.REPORTS_DIR, path))
-    if df.empty: return []
-
-    if store_id and "store_id" in df.columns:
-        df = df[df["store_id"] == store_id]
-
-    # --- ✅ INVENTORY ACTION UPGRADE (actionable fields) ---
+def future_forecast_page(store_id: Optional[str]=None, item_id: Optional[str]=None, limit: int=1000,
+                         cursor: Optional[str]=None, columnar: bool=False):
+    '''
+    One page of the forecast plus the cursor of the next page (None on the last page).
+    Pages are keyed on (date, id); columnar=True returns the page as a pyarrow.Table
+    when it comes from the Parquet dataset.
+    '''
+    if not report_db.has("future_forecast_next_28d"):
+        version = _version_tag("future_forecast_next_28d.csv")
+        return _offset_page(_future_frame().rows, limit, cursor, version, store_id=store_id, item_id=item_id)
+
+    state = decode_cursor(cursor)
+    if state and "k" not in state:
+        raise ValueError("Cursor does not belong to this result")
+    after = None
+    if state:
+        try:
+            after = [dt.date.fromisoformat(state["k"][0]), str(state["k"][1])]
+        except (KeyError, IndexError, TypeError, ValueError):
+            raise ValueError("Invalid cursor")
+    query = dict(columns=FUTURE_COLS, filters={"store_id": store_id, "item_id": item_id},
+                 order_by=["date", "id"], limit=limit + 1, after=after)
+    if columnar:
+        table = report_db.select_arrow("future_forecast_next_28d", **query)
+        if table.num_rows <= limit:
+            return table, None
+        table = table.slice(0, limit)
+        last = table.slice(limit - 1, 1).select(["date", "id"]).to_pylist()[0]
+        return table, encode_cursor({"k": [last["date"], last["id"]]})
+    rows = report_db.select("future_forecast_next_28d", **query)
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor({"k": [rows[-1]["date"], rows[-1]["id"]]})
+
+def _recs_query(kind: str, name: str, limit: int, offset: int = 0, store_id: Optional[str]=None):
+    # Parquet dataset: derive, filter, sort and page inside DuckDB instead of loading the table
+    cols = report_db.columns(name)
+    exprs: Dict[str, str] = {}
+    ordered = cols
     if kind == "inventory":
-        # If pipeline doesn't provide inventory_on_hand, we simulate a deterministic demo value:
-        # assume ~7 days on hand based on avg_pred.
-        if "inventory_on_hand" not in df.columns and "avg_pred" in df.columns:
-            df["inventory_on_hand"] = (df["avg_pred"].astype(float).fillna(0.0) * 7.0).round(3)
-
-        if "reorder_point" in df.columns and "inventory_on_hand" in df.columns:
-            df["order_qty"] = (df["reorder_point"].astype(float) - df["inventory_on_hand"].astype(float)).clip(lower=0).round(3)
-
-        if "avg_pred" in df.columns and "inventory_on_hand" in df.columns:
-            denom = df["avg_pred"].astype(float).replace(0, np.nan)
-            df["days_of_supply"] = (df["inventory_on_hand"].astype(float) / denom).replace([np.inf, -np.inf], np.nan).fillna(0.0).round(3)
-
-        # Put important columns early (so UI shows them)
-        preferred = ["item_id","store_id","avg_pred","inventory_on_hand","days_of_supply","reorder_point","safety_stock","order_qty"]
-        cols = [c for c in preferred if c in df.columns] + [c for c in df.columns if c not in preferred]
-        df = df[cols]
-
-    # Sort for presentability
-    if "profit" in df.columns:
-        df = df.sort_values("profit", ascending=False)
-    elif "reorder_point" in df.columns:
-        df = df.sort_values("reorder_point", ascending=False)
-
-    return df.head(limit).to_dict(orient="records")
+        # pipeline.memo.inventory_actions (the CSV path and the Arrow artifact), computed inside the query
+        on_hand = "inventory_on_hand"
+        if "inventory_on_hand" not in cols and "avg_pred" in cols:
+            on_hand = "ROUND(COALESCE(avg_pred, 0) * 7.0, 3)"
+            exprs["inventory_on_hand"] = on_hand
+        if "avg_pred" in cols and ("inventory_on_hand" in cols or exprs):
+            exprs["days_of_supply"] = f"ROUND(COALESCE({on_hand} / NULLIF(avg_pred, 0), 0), 3)"
+        if "reorder_point" in cols and ("inventory_on_hand" in cols or exprs):
+            exprs["order_qty"] = f"ROUND(GREATEST(reorder_point - {on_hand}, 0), 3)"
+        ordered = [c for c in INVENTORY_COLS if c in cols or c in exprs] + [c for c in cols if c not in INVENTORY_COLS]
+        cols = [c for c in ordered if c in cols]
+    # store/item break ties so offsets page through a fixed order
+    order = ["profit"] if "profit" in cols else (["reorder_point"] if "reorder_point" in cols else [])
+    rows = report_db.select(name, columns=cols, exprs=exprs, filters={"store_id": store_id},
+                            order_by=order + ["store_id", "item_id"], descending=True, limit=limit, offset=offset)
+    return [{c: r.get(c) for c in ordered} for r in rows] if exprs else rows
+
+def _recs_frame(kind: str):
+    name = REC_FILES[kind].replace(".csv", "")
+    if artifacts.has(name):
+        # published already derived and sorted: map it, nothing to build per worker but the index
+        return report_cache.get(("recs-arrow", kind), lambda: artifacts.version(name),
+                                lambda: ArrowFrame(artifacts.table(name), keys=INDEX_KEYS))
+    path = os.path.join(settings.REPORTS_DIR, REC_FILES[kind])
+
+    def load():
+        df = _read_csv(path)
+        if not df.empty:
+            if kind == "inventory":
+                df = inventory_actions(df)
+            # Sort for presentability
+            if "profit" in df.columns:
+                df = df.sort_values("profit", ascending=False, kind="stable")
+            elif "reorder_point" in df.columns:
+                df = df.sort_values("reorder_point", ascending=False, kind="stable")
+        return IndexedFrame(df, keys=INDEX_KEYS)
+
+    return report_cache.get(("recs", kind), lambda: file_version(path), load)
+
+def recs(kind: str, store_id: Optional[str]=None, limit: int=200):
+    return recs_page(kind, store_id, limit)[0]
+
+def recs_page(kind: str, store_id: Optional[str]=None, limit: int=200, cursor: Optional[str]=None):
+    if kind not in REC_FILES: return [], None
+    name = REC_FILES[kind].replace(".csv", "")
+    version = _version_tag(name)
+    if not artifacts.has(name) and report_db.has(name):
+        return _offset_page(lambda n, offset, **f: _recs_query(kind, name, n, offset, **f), limit, cursor, version, store_id=store_id)
+    return _offset_page(_recs_frame(kind).rows, limit, cursor, version, store_id=store_id)
+
+# pipeline/rollup.py cubes, published as the Arrow artifacts rollup_<source>
+ROLLUP_SOURCES = ("forecast", "inventory", "pricing")
+# hierarchy dims -> (axis, level they imply); levels per axis are coarse to fine
+ROLLUP_DIMS = {
+    "state_id": ("geo", "state"), "store_id": ("geo", "store"),
+    "cat_id": ("product", "cat"), "dept_id": ("product", "dept"), "item_id": ("product", "item"),
+}
+ROLLUP_LEVELS = {"geo": ["total", "state", "store"], "product": ["total", "cat", "dept", "item"]}
+
+def _rollup_cube(source: str) -> Dict[Tuple[str, str, str], ArrowFrame]:
+    name = f"rollup_{source}"
+
+    def load():
+        table = artifacts.table(name)
+        if table is None: return {}
+        levels = ["period", "geo_level", "product_level"]
+        blocks = pd.DataFrame({c: table.column(c).to_numpy() for c in levels}).groupby(levels, sort=False).indices
+        cube = {}
+        for key, pos in blocks.items():
+            # the cube is sorted by level, so a block is a zero-copy slice of the mapped table
+            contiguous = pos[-1] - pos[0] + 1 == len(pos)
+            part = table.slice(pos[0], len(pos)) if contiguous else table.take(pos)
+            # rolled-up dims (and period_start of undated cubes) are all null: leave them out of the rows
+            part = part.drop_columns(levels + [c for c in part.column_names if c not in levels and part.column(c).null_count == len(part)])
+            dims = [c for c in list(ROLLUP_DIMS) + ["period_start"] if c in part.column_names]
+            cube[key] = ArrowFrame(part, keys=[(c,) for c in dims], lazy_keys=True)
+        return cube
+
+    return report_cache.get(("rollup", source), lambda: artifacts.version(name), load)
+
+def rollup_page(source: str, period: Optional[str]=None, by: Sequence[str]=(), limit: int=1000,
+                cursor: Optional[str]=None, **filters):
+    '''
+    One slice of a precomputed rollup cube. The level is the finest one named by `by` or a filter
+    on each axis (e.g. store_id=CA_1, by=["dept_id"] -> store x dept); rows come out per
+    (dims, period_start). period: day | week (default) for dated cubes, horizon for pricing.
+    '''
+    if source not in ROLLUP_SOURCES:
+        raise ValueError(f"source must be one of {', '.join(ROLLUP_SOURCES)}")
+    unknown = [d for d in by if d not in ROLLUP_DIMS]
+    if unknown:
+        raise ValueError(f"Cannot group by {', '.join(unknown)}; use {', '.join(ROLLUP_DIMS)}")
+    level = {"geo": "total", "product": "total"}
+    for d in list(by) + [c for c, v in filters.items() if v is not None and c in ROLLUP_DIMS]:
+        axis, lvl = ROLLUP_DIMS[d]
+        if ROLLUP_LEVELS[axis].index(lvl) > ROLLUP_LEVELS[axis].index(level[axis]):
+            level[axis] = lvl
+
+    version = _version_tag(f"rollup_{source}")
+    cube = _rollup_cube(source)
+    periods = sorted({k[0] for k in cube})
+    if period is None:
+        period = "week" if "week" in periods else (periods[0] if periods else None)
+    elif cube and period not in periods:
+        raise ValueError(f"period must be one of {', '.join(periods)}")
+    frame = cube.get((period, level["geo"], level["product"]))
+    if frame is None: return [], None
+    return _offset_page(frame.rows, limit, cursor, version, **filters)
@@ -22,6 +22,17 @@ export async function getFutureForecast(store_id?: string, item_id?: string) {
   return request(`/forecast/future?${usp.toString()}`);
 }
 
+// One page of forecast rows; pass nextCursor back to fetch the following page.
+export async function getFutureForecastPage(store_id?: string, item_id?: string, cursor?: string, limit = 1000) {
+  const usp = new URLSearchParams({ limit: String(limit) });
+  if (store_id) usp.set("store_id", store_id);
+  if (item_id) usp.set("item_id", item_id);
+  if (cursor) usp.set("cursor", cursor);
+  const res = await fetch(`${API_BASE}/forecast/future?${usp.toString()}`);
+  if (!res.ok) throw new Error(await res.text());
+  return { rows: (await res.json()) as any[], nextCursor: res.headers.get("X-Next-Cursor") };
+}
+
 export async function getRecs(kind: string, store_id?: string) {
   const usp = new URLSearchParams();
   if (store_id) usp.set("store_id", store_id);
@@ -35,10 +46,69 @@ export async function runPipeline(endpoint: string, zip_path: string, max_series
   });
 }
 
+export async function getJob(id: string) {
+  return request(`/jobs/${id}`);
+}
+
+export async function cancelJob(id: string) {
+  return request(`/jobs/${id}/cancel`, { method: "POST" });
+}
+
+// Streams a job's log output; resolves when the job has finished and the log is drained.
+export async function streamJobLogs(id: string, onChunk: (text: string) => void, signal?: AbortSignal) {
+  const res = await fetch(`${API_BASE}/jobs/${id}/logs?follow=true`, { signal });
+  if (!res.ok || !res.body) throw new Error(await res.text());
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    onChunk(decoder.decode(value, { stream: true }));
+  }
+}
+
+export async function getPipelineProfile() {
+  return request("/ops/profile");
+}
+
+export async function getMonitor(level = "store_id", limit = 20) {
+  return request(`/monitor?level=${encodeURIComponent(level)}&limit=${limit}`);
+}
+
 export async function chatAgent(payload: any) {
   return request("/agent/chat", { method: "POST", body: JSON.stringify(payload) });
 }
 
+// POST + server-sent events: metrics, actions, token*, done (or error).
+export async function streamAgent(payload: any, onEvent: (event: string, data: any) => void) {
+  const res = await fetch(`${API_BASE}/agent/chat/stream`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json", Accept: "text/event-stream" },
+    body: JSON.stringify(payload),
+  });
+  if (!res.ok || !res.body) throw new Error(await res.text());
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buf = "";
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buf += decoder.decode(value, { stream: true });
+    let sep: number;
+    while ((sep = buf.indexOf("\n\n")) >= 0) {
+      const block = buf.slice(0, sep);
+      buf = buf.slice(sep + 2);
+      let event = "message";
+      let data = "";
+      for (const line of block.split("\n")) {
+        if (line.startsWith("event:")) event = line.slice(6).trim();
+        else if (line.startsWith("data:")) data += line.slice(5).trim();
+      }
+      if (data) onEvent(event, JSON.parse(data));
+    }
+  }
+}
+
 export function downloadsUrl(path: string) {
   // path like "/downloads/xxx.csv"
   return `${API_BASE}${path}`;
@@ -1,5 +1,5 @@
 import { useEffect, useMemo, useRef, useState } from "react";
-import { chatAgent, downloadsUrl, getSummary } from "../api/client";
+import { downloadsUrl, getSummary, streamAgent } from "../api/client";
 import { KPI } from "../components/KPI";
 import { SimpleTable } from "../components/SimpleTable";
 import type { AgentChatPayload, ChatMsg } from "../types";
@@ -152,22 +152,43 @@ export function CopilotPage() {
         history,
       };
 
-      const resp = await chatAgent(payload);
-      const a = resp?.answer ?? resp;   // ✅ unwrap
-      setAgent(a);
-
-      let assistantText =
-        a?.explanation ||
-        a?.memo ||
-        "Done. See the decision panels on the right.";
-
-      if (a?.downloads && typeof a.downloads === "object") {
-        const links = Object.entries(a.downloads)
-          .map(([k, v]: any) => `- ${k}: ${downloadsUrl(String(v))}`)
-          .join("\n");
-        assistantText += `\n\nDOWNLOAD LINKS\n${links}`;
-      }   
-      setMsgs((m) => [...m, { role: "assistant", text: assistantText, ts: Date.now() }]);
+      // Panels fill in as soon as metrics/actions arrive; the explanation streams into one message.
+      let streamed = "";
+      let started = false;
+      const showText = (text: string) =>
+        setMsgs((m) =>
+          started
+            ? [...m.slice(0, -1), { ...m[m.length - 1], text }]
+            : [...m, { role: "assistant", text, ts: Date.now() }]
+        );
+
+      await streamAgent(payload, (event, data) => {
+        if (event === "metrics" || event === "actions") {
+          setAgent((prev: any) => ({ ...(prev || {}), ...data }));
+          setLoading(false);
+        } else if (event === "token") {
+          streamed += data.text;
+          showText(streamed);
+          started = true;
+        } else if (event === "done") {
+          setAgent(data);
+          let assistantText =
+            data?.explanation ||
+            data?.memo ||
+            "Done. See the decision panels on the right.";
+
+          if (data?.downloads && typeof data.downloads === "object") {
+            const links = Object.entries(data.downloads)
+              .map(([k, v]: any) => `- ${k}: ${downloadsUrl(String(v))}`)
+              .join("\n");
+            assistantText += `\n\nDOWNLOAD LINKS\n${links}`;
+          }
+          showText(assistantText);
+          started = true;
+        } else if (event === "error") {
+          throw new Error(data?.error || "agent_chat_failed");
+        }
+      });
     } catch (e: any) {
       setMsgs((m) => [...m, { role: "assistant", text: `Error: ${String(e?.message || e)}`, ts: Date.now() }]);
     } finally {
@@ -1,5 +1,5 @@
 import { useEffect, useMemo, useState } from "react";
-import { getFutureForecast } from "../api/client";
+import { getFutureForecastPage } from "../api/client";
 import { LineChart, Line, XAxis, YAxis, Tooltip, ResponsiveContainer } from "recharts";
 import { SimpleTable } from "../components/SimpleTable";
 
@@ -7,13 +7,28 @@ export function ForecastPage() {
   const [storeId, setStoreId] = useState("");
   const [itemId, setItemId] = useState("");
   const [rows, setRows] = useState<any[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
 
   useEffect(() => {
-    getFutureForecast(storeId || undefined, itemId || undefined)
-      .then((r) => setRows(Array.isArray(r) ? r : []))
-      .catch(() => setRows([]));
+    getFutureForecastPage(storeId || undefined, itemId || undefined)
+      .then((p) => {
+        setRows(p.rows);
+        setNextCursor(p.nextCursor);
+      })
+      .catch(() => {
+        setRows([]);
+        setNextCursor(null);
+      });
   }, [storeId, itemId]);
 
+  function loadMore() {
+    if (!nextCursor) return;
+    getFutureForecastPage(storeId || undefined, itemId || undefined, nextCursor).then((p) => {
+      setRows((prev) => prev.concat(p.rows));
+      setNextCursor(p.nextCursor);
+    });
+  }
+
   const chartData = useMemo(
     () =>
       rows.map((r) => ({
@@ -55,6 +70,11 @@ export function ForecastPage() {
 
       <h3>Rows</h3>
       <SimpleTable rows={rows} />
+      {nextCursor ? (
+        <button onClick={loadMore} style={{ padding: "8px 12px", borderRadius: 10, marginTop: 8 }}>
+          Load more
+        </button>
+      ) : null}
     </div>
   );
 }
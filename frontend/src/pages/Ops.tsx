@@ -1,16 +1,81 @@
-import { useState } from "react";
-import { runPipeline } from "../api/client";
+import { useEffect, useRef, useState } from "react";
+import { cancelJob, getJob, getMonitor, getPipelineProfile, runPipeline, streamJobLogs } from "../api/client";
+import { SimpleTable } from "../components/SimpleTable";
 
 export function OpsPage() {
   const [zipPath, setZipPath] = useState("data/m5-forecasting-accuracy.zip");
   const [maxSeries, setMaxSeries] = useState(3000);
-  const [log, setLog] = useState<any>(null);
+  const [job, setJob] = useState<any>(null);
+  const [logText, setLogText] = useState("");
+  const [profile, setProfile] = useState<any>(null);
+  const [monitor, setMonitor] = useState<any>(null);
+  const logAbort = useRef<AbortController | null>(null);
+  const active = job?.status === "queued" || job?.status === "running";
+
+  function loadProfile() {
+    getPipelineProfile().then(setProfile).catch(() => setProfile(null));
+  }
+
+  useEffect(loadProfile, []);
+  useEffect(() => {
+    getMonitor().then(setMonitor).catch(() => setMonitor(null));
+  }, []);
+
+  // poll the submitted job until it leaves the queue / finishes
+  useEffect(() => {
+    if (!job?.id || !active) return;
+    const t = setTimeout(() => {
+      getJob(job.id)
+        .then((j: any) => {
+          setJob(j);
+          if (j.status === "succeeded") loadProfile();
+        })
+        .catch(() => undefined);
+    }, 1000);
+    return () => clearTimeout(t);
+  }, [job]);
+
+  useEffect(() => () => logAbort.current?.abort(), []);
 
   async function run(endpoint: "run_all" | "forecast_future" | "run_sql" | "retrain") {
-    const res = await runPipeline(endpoint, zipPath, maxSeries);
-    setLog(res);
+    const res: any = await runPipeline(endpoint, zipPath, maxSeries);
+    setJob(res);
+    setLogText("");
+    logAbort.current?.abort();
+    const ctrl = new AbortController();
+    logAbort.current = ctrl;
+    streamJobLogs(res.id, (chunk) => setLogText((prev) => prev + chunk), ctrl.signal).catch(() => undefined);
+  }
+
+  async function cancel() {
+    if (job?.id) setJob(await cancelJob(job.id));
   }
 
+  const progress = job?.progress;
+  const progressLabel = progress
+    ? `${progress.total ? `step ${progress.step}/${progress.total}` : `step ${progress.step}`} · ${progress.message}`
+    : "";
+
+  const stageRows = (profile?.stages ?? []).map((s: any) => ({
+    stage: s.name,
+    wall_s: s.wall_s,
+    cpu_s: s.cpu_s,
+    peak_rss_mb: s.peak_rss_mb,
+    rows_in: s.rows_in ?? "—",
+    rows_out: s.rows_out ?? "—",
+    rows_per_s: s.rows_per_s != null ? Math.round(s.rows_per_s) : "—",
+  }));
+
+  const pct = (v: number | null | undefined) => (v != null ? `${(v * 100).toFixed(1)}%` : "—");
+  const monitorRows = (monitor?.rows ?? []).map((r: any) => ({
+    store_id: r.key,
+    days: r.days,
+    last_date: r.last_date,
+    wape: pct(r.wape),
+    ewma_wape: pct(r.ewma_wape),
+    ewma_bias: pct(r.ewma_bias),
+  }));
+
   return (
     <div>
       <h2 style={{ marginTop: 0 }}>Ops (run pipelines)</h2>
@@ -42,11 +107,57 @@ export function OpsPage() {
         <button onClick={() => run("retrain")} style={{ padding: "8px 12px", borderRadius: 10 }}>
           Retrain
         </button>
+        <button onClick={cancel} disabled={!active} style={{ padding: "8px 12px", borderRadius: 10 }}>
+          Cancel
+        </button>
       </div>
 
-      <h3>Last response</h3>
-      <pre style={{ whiteSpace: "pre-wrap", border: "1px solid #e5e7eb", borderRadius: 12, padding: 12 }}>
-        {log ? JSON.stringify(log, null, 2) : "—"}
+      {job ? (
+        <div style={{ fontSize: 13, marginTop: 12 }}>
+          Job {job.id} ({job.kind}{job.deduplicated ? ", already in flight" : ""}): <b>{job.status}</b>
+          {progressLabel ? ` · ${progressLabel}` : ""}
+          {job.elapsed_s != null ? ` · ${job.elapsed_s}s` : ""}
+        </div>
+      ) : null}
+
+      <h3>Pipeline profile</h3>
+      {profile?.total ? (
+        <div style={{ fontSize: 12, opacity: 0.7, marginBottom: 8 }}>
+          {profile.command} · {profile.generated_at} · total {profile.total.wall_s}s wall, {profile.total.cpu_s}s CPU,
+          peak {profile.total.peak_rss_mb} MB
+        </div>
+      ) : null}
+      {(profile?.regressions ?? []).map((r: any) => (
+        <div key={r.stage} style={{ color: "#b91c1c", fontSize: 12, marginBottom: 4 }}>
+          Regression: {r.stage} {r.previous_wall_s}s → {r.wall_s}s (+{Math.round(r.change_pct * 100)}%)
+        </div>
+      ))}
+      <SimpleTable rows={stageRows} />
+
+      <h3>Forecast monitor</h3>
+      {monitor?.total ? (
+        <div style={{ fontSize: 12, opacity: 0.7, marginBottom: 8 }}>
+          {monitor.total.days} days through {monitor.total.last_date} · EWMA WAPE {pct(monitor.total.ewma_wape)} (validation{" "}
+          {pct(monitor.baseline_wape)}) · EWMA bias {pct(monitor.total.ewma_bias)}
+        </div>
+      ) : (
+        <div style={{ fontSize: 12, opacity: 0.7, marginBottom: 8 }}>No actuals posted yet (POST /monitor/actuals).</div>
+      )}
+      {(monitor?.alerts ?? []).map((a: any) => (
+        <div key={`${a.level}:${a.key}`} style={{ color: "#b91c1c", fontSize: 12, marginBottom: 4 }}>
+          Drift: {a.level} {a.key} · {a.reason}
+        </div>
+      ))}
+      {monitor?.trigger ? (
+        <div style={{ fontSize: 12, marginBottom: 8 }}>
+          Retrain job {monitor.trigger.job_id} ({monitor.trigger.job_status ?? "unknown"}) · {monitor.trigger.reason}
+        </div>
+      ) : null}
+      <SimpleTable rows={monitorRows} />
+
+      <h3>Job log</h3>
+      <pre style={{ whiteSpace: "pre-wrap", border: "1px solid #e5e7eb", borderRadius: 12, padding: 12, maxHeight: 400, overflow: "auto" }}>
+        {logText || "—"}
       </pre>
     </div>
   );
@@ -25,6 +25,10 @@ export function SummaryPage() {
           title="Forecast RMSE (validation)"
           value={summary?.forecast_valid_rmse != null ? Number(summary.forecast_valid_rmse).toFixed(3) : "—"}
         />
+        <KPI
+          title="Forecast WRMSSE (validation)"
+          value={summary?.forecast_valid_wrmsse != null ? Number(summary.forecast_valid_wrmsse).toFixed(3) : "—"}
+        />
         <KPI
           title="Stockout units (before → after)"
           value={
@@ -0,0 +1,87 @@
+import os
+import time
+from typing import Callable, Optional
+
+# <out_dir>/artifacts/<name>/<version>.<ext> plus a CURRENT file naming the live version.
+# Readers (every backend worker) memory-map the file CURRENT points to and re-resolve it
+# when CURRENT changes, so a publish is picked up without restarting anything.
+ARTIFACTS_DIR = "artifacts"
+KEEP_VERSIONS = 3
+BATCH_ROWS = 64 * 1024
+
+
+def new_version() -> str:
+    # sortable, and unique across concurrent publishers
+    return time.strftime("%Y%m%dT%H%M%S", time.gmtime()) + f"-{time.time_ns() % 1_000_000_000:09d}-{os.getpid()}"
+
+
+def artifact_dir(out_dir: str, name: str) -> str:
+    return os.path.join(out_dir, ARTIFACTS_DIR, name)
+
+
+def current_path(out_dir: str, name: str) -> Optional[str]:
+    d = artifact_dir(out_dir, name)
+    try:
+        with open(os.path.join(d, "CURRENT"), "r", encoding="utf-8") as f:
+            fn = f.read().strip()
+    except OSError:
+        return None
+    return os.path.join(d, fn) if fn else None
+
+
+def _publish(out_dir: str, name: str, ext: str, write: Callable[[str], None]) -> str:
+    d = artifact_dir(out_dir, name)
+    os.makedirs(d, exist_ok=True)
+    fn = f"{new_version()}.{ext}"
+    path = os.path.join(d, fn)
+    write(path + ".tmp")
+    os.replace(path + ".tmp", path)
+    # the pointer swap is the publish: readers see the old or the new version, never a partial file
+    with open(os.path.join(d, "CURRENT.tmp"), "w", encoding="utf-8") as f:
+        f.write(fn)
+    os.replace(os.path.join(d, "CURRENT.tmp"), os.path.join(d, "CURRENT"))
+    _prune(d, ext)
+    return path
+
+
+def _prune(d: str, ext: str, keep: int = KEEP_VERSIONS) -> None:
+    # workers still mapping an unlinked version keep it until they swap (POSIX);
+    # where the OS refuses to delete a mapped file it is retried on the next publish
+    old = sorted(fn for fn in os.listdir(d) if fn.endswith("." + ext))[:-keep]
+    for fn in old:
+        try:
+            os.remove(os.path.join(d, fn))
+        except OSError:
+            pass
+
+
+def publish_table(out_dir: str, name: str, data) -> str:
+    '''
+    Publishes a pandas DataFrame, pyarrow Table or RecordBatchReader as an uncompressed Arrow
+    IPC file, which readers map without copying. Day-resolution timestamps are stored as dates.
+    '''
+    import pyarrow as pa
+    import pandas as pd
+
+    if isinstance(data, pd.DataFrame):
+        data = pa.Table.from_pandas(data, preserve_index=False)
+    reader = data.to_reader(max_chunksize=BATCH_ROWS) if isinstance(data, pa.Table) else data
+
+    fields = []
+    for field in reader.schema:
+        if field.name == "date" and pa.types.is_timestamp(field.type):
+            field = field.with_type(pa.date32())
+        fields.append(field)
+    schema = pa.schema(fields)
+
+    def write(path: str) -> None:
+        with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+            for batch in reader:
+                if batch.schema != schema:
+                    batch = pa.RecordBatch.from_arrays(
+                        [col.cast(f.type) for col, f in zip(batch.columns, schema)], schema=schema
+                    )
+                writer.write_batch(batch)
+
+    return _publish(out_dir, name, "arrow", write)
+
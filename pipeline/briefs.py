@@ -0,0 +1,70 @@
+import json
+import os
+import pandas as pd
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from .memo import compose_memo, decisions, inventory_actions, key_metrics, records, top_inventory, top_pricing
+
+BRIEFS_VERSION = 1
+ALL_STORES = "__all__"
+# rows the backend serves per store before the copilot re-ranks them
+POOL_ROWS = 200
+
+
+def served_pool(df: pd.DataFrame, by: str) -> pd.DataFrame:
+    '''The rows /recs serves per store (sorted by `by`), which the copilot ranks from.'''
+    if df.empty or by not in df.columns:
+        return df
+    return df.sort_values(by, ascending=False, kind="stable").head(POOL_ROWS)
+
+
+def build_briefs(
+    summary: Dict[str, Any],
+    inv_rec: pd.DataFrame,
+    pricing_rec: pd.DataFrame,
+    assort: pd.DataFrame,
+) -> Dict[str, Any]:
+    '''
+    Precomputes what the copilot answers with for every store plus the all-stores view
+    (ALL_STORES): key metrics, decisions, top-10 inventory/pricing actions, an assortment
+    preview and the composed markdown memo. Only the LLM explanation and the item-level
+    forecast preview are left for request time.
+    '''
+    metrics = key_metrics(summary)
+    inv = inventory_actions(inv_rec)
+    stores = sorted(set(inv["store_id"]) | set(pricing_rec.get("store_id", [])) | set(assort.get("store_id", [])))
+
+    def by_store(df: pd.DataFrame, store: Optional[str]) -> pd.DataFrame:
+        if store is None or df.empty or "store_id" not in df.columns:
+            return df
+        return df[df["store_id"] == store]
+
+    out = {}
+    for store in [None] + stores:
+        inv_top = top_inventory(served_pool(by_store(inv, store), "reorder_point"))
+        prc_top = top_pricing(served_pool(by_store(pricing_rec, store), "profit"))
+        ast = by_store(assort, store)
+        if "profit" in ast.columns:
+            ast = ast.sort_values("profit", ascending=False, kind="stable")
+        dec = decisions(summary, store)
+        out[store or ALL_STORES] = {
+            "key_metrics": metrics,
+            "decisions": dec,
+            "inventory_actions": inv_top,
+            "pricing_actions": prc_top,
+            "assortment_preview": records(ast.head(10)),
+            "answer": compose_memo(metrics, dec, inv_top, prc_top),
+        }
+    return {
+        "version": BRIEFS_VERSION,
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "stores": out,
+    }
+
+
+def write_briefs(path: str, briefs: Dict[str, Any]) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(briefs, f, separators=(",", ":"), default=str)
+    os.replace(tmp, path)
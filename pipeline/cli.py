@@ -0,0 +1,49 @@
+import argparse
+import os
+import sys
+from typing import List, Optional
+
+from . import commands
+
+DAEMON_ENV = "PIPELINE_DAEMON"
+
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(prog="python -m pipeline", description="M5 forecasting / inventory / pricing pipeline")
+    ap.add_argument("--daemon", metavar="SOCKET", default=os.getenv(DAEMON_ENV) or None,
+                    help=f"run the command on a warm `python -m pipeline daemon` (default: ${DAEMON_ENV})")
+    sub = commands.add_subparsers(ap)
+    d = sub.add_parser("daemon", help="keep imports, zip tables and features warm and run commands sent over a socket")
+    d.add_argument("--socket", default=os.getenv(DAEMON_ENV) or "/tmp/pipeline.sock")
+    d.add_argument("--preload", action="append", default=[], metavar="ZIP[:MAX_SERIES]",
+                   help="build this zip's feature table at startup (repeatable; max_series defaults to 3000)")
+    return ap
+
+
+def _command_argv(argv: List[str]) -> List[str]:
+    # drops the global options: what is left starts with the command name
+    i = 0
+    while i < len(argv) and argv[i].startswith("-"):
+        i += 1 if "=" in argv[i] else 2
+    return argv[i:]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    ap = build_parser()
+    args = ap.parse_args(argv)
+    if args.command is None:
+        ap.print_help()
+        return 2
+    if args.command == "daemon":
+        from .daemon import serve
+        preload = []
+        for spec in args.preload:
+            zip_path, _, n = spec.rpartition(":") if spec.rpartition(":")[2].isdigit() else (spec, "", "3000")
+            preload.append((zip_path, int(n)))
+        serve(args.socket, preload)
+        return 0
+    if args.daemon:
+        from .daemon import run_remote
+        return run_remote(args.daemon, _command_argv(argv))
+    return commands.execute(args)
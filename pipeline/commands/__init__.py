@@ -0,0 +1,41 @@
+import argparse
+import importlib
+from typing import List, Optional
+
+# `python -m pipeline <command>`. Each command module defines add_arguments(ap) and run(args),
+# and optionally warm_inputs(args), which loads its inputs into pipeline.warm. Only the daemon
+# calls it, in its long-lived process before forking the command; a one-off run loads them in
+# run(). Modules import heavy dependencies (lightgbm, sklearn, scipy, matplotlib, duckdb)
+# inside run(), so building the parser is cheap.
+COMMANDS = {
+    "run-all": ("run_all", "train, evaluate and publish every report"),
+    "retrain": ("retrain", "train and register a new forecast model"),
+    "forecast-future": ("forecast_future", "28-day forecast with the registered model"),
+    "sql": ("sql", "incremental load of the DuckDB warehouse"),
+    "merge": ("merge", "combine the shards of a `run-all --shard k --num_shards n` into the reports"),
+}
+
+
+def load(name: str):
+    return importlib.import_module(f".{COMMANDS[name][0]}", __name__)
+
+
+def add_subparsers(ap: argparse.ArgumentParser):
+    sub = ap.add_subparsers(dest="command", metavar="command")
+    for name, (_, help_) in COMMANDS.items():
+        load(name).add_arguments(sub.add_parser(name, help=help_, description=help_))
+    return sub
+
+
+def execute(args: argparse.Namespace) -> int:
+    load(args.command).run(args)
+    return 0
+
+
+def main(name: str, argv: Optional[List[str]] = None) -> None:
+    '''Entry point of the scripts/ shims: runs one command in this process.'''
+    ap = argparse.ArgumentParser(prog=name, description=COMMANDS[name][1])
+    load(name).add_arguments(ap)
+    args = ap.parse_args(argv)
+    args.command = name
+    execute(args)
@@ -0,0 +1,73 @@
+import argparse
+import os
+
+
+def add_arguments(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument("--zip_path", required=True)
+    ap.add_argument("--max_series", type=int, default=2000)
+    ap.add_argument("--out_dir", default="reports")
+    ap.add_argument("--model_version", default=None, help="registered model to forecast with (default: CURRENT)")
+    ap.add_argument("--retrain", action="store_true",
+                    help="train and register a new model first (also done when nothing is registered yet)")
+    ap.add_argument("--no_tiering", action="store_true",
+                    help="with --retrain: fit LightGBM on every series instead of routing intermittent ones to Croston/SBA/TSB")
+
+
+def warm_inputs(args: argparse.Namespace) -> None:
+    from .. import warm
+    warm.features(args.zip_path, args.max_series)
+
+
+def run(args: argparse.Namespace) -> None:
+    import pandas as pd
+
+    from .. import future as fut
+    from .. import registry, warm
+    from ..config import PipelineConfig
+    from ..forecast import FEATURE_COLS, train_forecast_model
+    from ..intermittent import route_series
+    from ..rollup import FORECAST_MEASURES, publish_rollup
+    from ..utils import save_parquet_dataset
+
+    cfg = PipelineConfig()
+    os.makedirs(args.out_dir, exist_ok=True)
+
+    m5 = warm.m5_tables(args.zip_path)
+    feat = warm.features(args.zip_path, args.max_series)
+
+    key = registry.data_key(args.zip_path, args.max_series, cfg.horizon)
+    version = args.model_version
+    if args.retrain or (version is None and registry.current_version(args.out_dir) is None):
+        train_df = feat[feat["date"] <= feat["date"].max() - pd.Timedelta(days=cfg.horizon)].copy()
+        valid_df = feat[feat["date"] >  feat["date"].max() - pd.Timedelta(days=cfg.horizon)].copy()
+        tiers = None if args.no_tiering else route_series(train_df)
+        model, metrics, _ = train_forecast_model(train_df, valid_df, tiers=tiers)
+        version = registry.register(args.out_dir, model, FEATURE_COLS, key, metrics, params={"script": "forecast_future"},
+                                    tiers=tiers)
+    # refuses a model trained on another feature list; categoricals map to its training categories
+    model = registry.load(args.out_dir, version, feature_cols=FEATURE_COLS)
+    metrics = model.meta["metrics"]
+    if model.meta["data_key"].get("hash") != key["hash"]:
+        print(f"note: model {model.version} was trained on {model.meta['data_key']}; ids it has not seen are treated as unknown categories")
+
+    future_base = fut.build_future_frame(feat, m5["calendar"], warm.price_cube(args.zip_path), horizon=cfg.horizon)
+    if model.tiers is None:
+        future_pred = fut.recursive_forecast(model, feat, future_base)
+    else:
+        # only the dense head goes through the recursive LightGBM loop
+        future_pred = fut.tiered_forecast(model, feat, future_base, model.tiers)
+        print("series by method:", future_pred.groupby("method")["id"].nunique().to_dict())
+
+    out_path = os.path.join(args.out_dir, "future_forecast_next_28d.csv")
+    cols = ["id","item_id","store_id","date","pred_units","sell_price_filled","snap","is_event"]
+    future_pred[cols].to_csv(out_path, index=False)
+    # full forecast with hierarchy columns, partitioned by store and sorted for item lookups
+    save_parquet_dataset(
+        future_pred[cols[:2] + ["dept_id", "cat_id", "state_id"] + cols[2:]],
+        os.path.join(args.out_dir, "parquet", "future_forecast_next_28d"),
+        sort_by=["item_id", "date"],
+    )
+    publish_rollup(args.out_dir, "forecast", future_pred, FORECAST_MEASURES)
+
+    print("DONE ✅ future forecast saved:", out_path)
+    print(f"Model {model.version} metrics (validation):", metrics)
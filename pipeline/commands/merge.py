@@ -0,0 +1,89 @@
+import argparse
+import os
+
+
+def add_arguments(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument("--out_dir", default="reports", help="the --out_dir the shards ran with; reports are written here")
+    ap.add_argument("--num_shards", type=int, required=True)
+    ap.add_argument("--cprofile_stage", action="append", default=[],
+                    help="dump cProfile stats for this stage (repeatable)")
+
+
+def run(args: argparse.Namespace) -> None:
+    import numpy as np
+    import pandas as pd
+
+    from ..artifacts import publish_table
+    from ..config import PipelineConfig
+    from ..forecast import forecast_metrics, method_metrics
+    from ..inventory import merge_simulation_metrics
+    from ..profiling import StageProfiler
+    from ..sharding import read_shards
+    from ..utils import ensure_dir
+    from ..wrmsse import HIERARCHY_COLS, WRMSSEEvaluator, wrmsse_metrics
+    from .run_all import forecast_charts, pricing_ids, publish_reports, report_regressions
+
+    cfg = PipelineConfig()
+    out_dir = args.out_dir
+    fig_dir = os.path.join(out_dir, "figures")
+    ensure_dir(fig_dir)
+    prof = StageProfiler(cprofile_stages=args.cprofile_stage, profile_dir=os.path.join(out_dir, "profiles"))
+
+    print(f"1) Reading {args.num_shards} shards...")
+    with prof.stage("load") as st:
+        try:
+            shards = read_shards(out_dir, args.num_shards)
+        except FileNotFoundError as e:
+            raise SystemExit(f"error: {e}")
+        metas = [m for m, _ in shards]
+        for field in ("model_version", "data_key"):
+            if len({str(m[field]) for m in metas}) > 1:
+                raise SystemExit(f"error: shards disagree on {field}: {sorted({str(m[field]) for m in metas})}")
+        frames = lambda name: [d[name] for _, d in shards]
+        valid_pred = pd.concat(frames("valid_pred"), ignore_index=True).sort_values(["id", "date"], kind="stable", ignore_index=True)
+        st.rows_out = len(valid_pred)
+
+    print("2) Validation metrics + WRMSSE...")
+    metrics = forecast_metrics(valid_pred["units"].to_numpy(np.float32), valid_pred["pred_units"].to_numpy(np.float32))
+    metrics.update(method_metrics(valid_pred))
+    with prof.stage("wrmsse", rows_in=len(valid_pred)):
+        # the shards' training series stacked back into one id-sorted evaluator
+        series = pd.concat(frames("wrmsse_series"), ignore_index=True)
+        order = np.argsort(series["id"].to_numpy(), kind="stable")
+        train = np.concatenate(frames("wrmsse_train"))[order]
+        series = series.iloc[order].reset_index(drop=True)
+        evaluator = WRMSSEEvaluator(series[["id"] + HIERARCHY_COLS], train, series["revenue"].to_numpy())
+        metrics.update(wrmsse_metrics(None, valid_pred, evaluator=evaluator))
+    print(f"  model {metas[0]['model_version']}: valid WAPE {metrics['valid_wape']:.4f}, WRMSSE {metrics['valid_wrmsse']:.4f}")
+
+    print("3) Forecast charts...")
+    forecast_charts(valid_pred, fig_dir, prof)
+
+    print("4) Inventory + pricing reports...")
+    inv_df = pd.concat(frames("inventory"), ignore_index=True).sort_values(["id", "date"], kind="stable", ignore_index=True)
+    before_metrics = merge_simulation_metrics([(m["inventory_before"], m["inventory_rows"]) for m in metas])
+    after_metrics = merge_simulation_metrics([(m["inventory_after"], m["inventory_rows"]) for m in metas])
+    # each shard priced its own top series; keep the global top ones
+    top = valid_pred.loc[valid_pred["id"].isin(pricing_ids(valid_pred)), ["item_id", "store_id"]].drop_duplicates()
+    pricing_rec = (
+        pd.concat(frames("pricing"), ignore_index=True)
+          .merge(top, on=["item_id", "store_id"], how="inner")
+          .sort_values("profit", ascending=False, kind="stable", ignore_index=True)
+    )
+
+    with prof.stage("series_state") as st:
+        state = pd.concat(frames("series_state"), ignore_index=True).sort_values("id", kind="stable", ignore_index=True)
+        publish_table(out_dir, "series_state", state)
+        publish_table(out_dir, "calendar_state", shards[0][1]["calendar_state"])
+        st.rows_out = len(state)
+
+    publish_reports(out_dir, cfg, metrics, valid_pred, inv_df, before_metrics, after_metrics, pricing_rec, prof)
+
+    profile = prof.write(
+        os.path.join(out_dir, "pipeline_profile.json"),
+        meta={"command": "merge", "params": {"num_shards": args.num_shards, "model_version": metas[0]["model_version"]}},
+    )
+    report_regressions(profile)
+
+    print("\nDONE ✅")
+    print(f"Outputs in: {out_dir}/")
@@ -0,0 +1,56 @@
+import argparse
+import json
+import os
+
+
+def add_arguments(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument("--zip_path", required=True)
+    ap.add_argument("--max_series", type=int, default=5000)
+    ap.add_argument("--out_dir", default="reports")
+    ap.add_argument("--no_tiering", action="store_true",
+                    help="fit LightGBM on every series instead of routing intermittent ones to Croston/SBA/TSB")
+    ap.add_argument("--train_rows", type=int, default=None,
+                    help="budget mode: fit on a weighted sample of about this many rows (fewer zero-sales and old days)")
+    ap.add_argument("--train_minutes", type=float, default=None,
+                    help="budget mode: size the sample so the fit takes about this long (throughput probed first)")
+    ap.add_argument("--sample_seed", type=int, default=0)
+
+
+def warm_inputs(args: argparse.Namespace) -> None:
+    from .. import warm
+    warm.features(args.zip_path, args.max_series)
+
+
+def run(args: argparse.Namespace) -> None:
+    from joblib import dump
+
+    from .. import warm
+    from ..config import PipelineConfig
+    from ..features import make_train_valid_split
+    from ..forecast import FEATURE_COLS, train_forecast_model
+    from ..intermittent import route_series
+    from ..registry import data_key, register
+    from ..sampling import TrainingBudget, describe
+    from ..wrmsse import wrmsse_metrics
+
+    cfg = PipelineConfig()
+    os.makedirs(args.out_dir, exist_ok=True)
+
+    feat = warm.features(args.zip_path, args.max_series)
+
+    train_df, valid_df = make_train_valid_split(feat, horizon=cfg.horizon)
+    tiers = None if args.no_tiering else route_series(train_df)
+    budget = TrainingBudget(max_rows=args.train_rows, seed=args.sample_seed,
+                            max_seconds=None if args.train_minutes is None else 60 * args.train_minutes)
+    model, metrics, valid_pred = train_forecast_model(train_df, valid_df, tiers=tiers, budget=budget)
+    if "train_sample" in metrics:
+        print("  training sample:", describe(metrics["train_sample"]))
+    metrics.update(wrmsse_metrics(train_df, valid_pred))
+
+    dump(model, os.path.join(args.out_dir, "lgbm_model.joblib"))
+    key = data_key(args.zip_path, args.max_series, cfg.horizon)
+    version = register(args.out_dir, model, FEATURE_COLS, key, metrics, params={"script": "retrain"}, tiers=tiers)
+    with open(os.path.join(args.out_dir, "retrain_metrics.json"), "w", encoding="utf-8") as f:
+        json.dump(metrics, f, indent=2)
+
+    print(f"DONE ✅ retrained model saved and registered as {version}.")
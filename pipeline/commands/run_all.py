@@ -0,0 +1,316 @@
+import argparse
+import os
+from typing import Dict, Tuple
+
+# the pricing subset: the series with the most validation units
+PRICING_SERIES = 500
+
+
+def add_arguments(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument("--zip_path", required=True)
+    ap.add_argument("--max_series", type=int, default=3000)
+    ap.add_argument("--out_dir", default="reports")
+    ap.add_argument("--feature_engine", choices=["pandas", "duckdb"], default="pandas",
+                    help="duckdb builds melt/joins/lags/rolling stats in SQL from a Parquet cache of the zip")
+    ap.add_argument("--m5_cache_dir", default=None, help="Parquet cache for --feature_engine duckdb (default: next to the zip)")
+    ap.add_argument("--cprofile_stage", action="append", default=[],
+                    help="dump cProfile stats for this stage (repeatable), e.g. --cprofile_stage train")
+    ap.add_argument("--shard", type=int, default=None,
+                    help="run only this md5(id) slice of the series and write it to <out_dir>/shards/<num_shards>/<shard>; "
+                         "scores with a registered model instead of training. `python -m pipeline merge` builds the reports")
+    ap.add_argument("--num_shards", type=int, default=1)
+    ap.add_argument("--model_version", default=None, help="with --shard: registered model to score with (default: CURRENT)")
+    ap.add_argument("--no_tiering", action="store_true",
+                    help="fit LightGBM on every series instead of routing intermittent ones to Croston/SBA/TSB")
+    ap.add_argument("--train_rows", type=int, default=None,
+                    help="budget mode: fit on a weighted sample of about this many rows (fewer zero-sales and old days)")
+    ap.add_argument("--train_minutes", type=float, default=None,
+                    help="budget mode: size the sample so the fit takes about this long (throughput probed first)")
+    ap.add_argument("--sample_seed", type=int, default=0)
+
+
+def warm_inputs(args: argparse.Namespace) -> None:
+    from .. import warm
+    if args.feature_engine == "pandas":
+        warm.features(args.zip_path, args.max_series, shard=args.shard, num_shards=args.num_shards)
+
+
+def forecast_charts(valid_pred, fig_dir: str, prof) -> None:
+    from ..plots import plot_forecast_example, plot_wape_by_store
+
+    with prof.stage("plots", rows_in=2 * len(valid_pred)):
+        plot_forecast_example(valid_pred, os.path.join(fig_dir, "forecast_actual_vs_pred.png"))
+        plot_wape_by_store(valid_pred, os.path.join(fig_dir, "backtest_wape_by_store.png"))
+
+
+def simulate_inventory(cfg, valid_pred, prof) -> Tuple[object, Dict[str, float], Dict[str, float]]:
+    '''(inventory policy rows, simulated metrics without reordering, with the policy).'''
+    from ..inventory import compute_inventory_policy, simulate_replenishment
+
+    with prof.stage("simulate", rows_in=3 * len(valid_pred)) as st:
+        inv_df = compute_inventory_policy(valid_pred, service_level=cfg.service_level, lead_time_days=cfg.lead_time_days)
+
+        inv_before = inv_df.copy()
+        inv_before["reorder_point"] = -1e9  # effectively disables ordering
+
+        before_metrics = simulate_replenishment(
+            inv_before,
+            lead_time_days=cfg.lead_time_days,
+            holding_cost_per_unit_day=cfg.holding_cost_per_unit_day,
+            stockout_penalty_per_unit=cfg.stockout_penalty_per_unit,
+        )
+        after_metrics = simulate_replenishment(
+            inv_df,
+            lead_time_days=cfg.lead_time_days,
+            holding_cost_per_unit_day=cfg.holding_cost_per_unit_day,
+            stockout_penalty_per_unit=cfg.stockout_penalty_per_unit,
+        )
+        st.rows_out = len(inv_df)
+    return inv_df, before_metrics, after_metrics
+
+
+def pricing_ids(valid_pred):
+    # ties broken by id, so a shard's top series contain every global top series it holds
+    return valid_pred.groupby("id")["units"].sum().sort_values(ascending=False, kind="stable").head(PRICING_SERIES).index
+
+
+def optimize_pricing(cfg, valid_pred, prof):
+    from ..pricing import estimate_elasticity_loglog, optimize_markdown
+
+    price_df = valid_pred[valid_pred["id"].isin(pricing_ids(valid_pred))].copy()
+    with prof.stage("pricing", rows_in=len(price_df)) as st:
+        elast = estimate_elasticity_loglog(price_df)
+        pricing_rec = optimize_markdown(
+            price_df,
+            elast,
+            cost_fraction=cfg.cost_fraction_of_base_price,
+            horizon_days=cfg.horizon,
+            inventory_days_of_supply=90,   # was 21 inside pricing.py default; make it “overstock”
+            markdown_grid=(0.0, 0.10, 0.20, 0.30, 0.40, 0.50),
+        )
+        st.rows_out = len(pricing_rec)
+    return pricing_rec
+
+
+def publish_reports(out_dir: str, cfg, metrics: Dict[str, object], valid_pred, inv_df,
+                    before_metrics: Dict[str, float], after_metrics: Dict[str, float], pricing_rec, prof) -> Dict[str, object]:
+    '''Everything run-all writes from the validation-window results; shared with `merge`. Returns the summary.'''
+    from ..assortment import recommend_assortment
+    from ..artifacts import publish_table
+    from ..briefs import build_briefs, write_briefs
+    from ..memo import inventory_actions
+    from ..plots import plot_before_after_bars
+    from ..rollup import PRICING_MEASURES, inventory_measures, publish_rollup
+    from ..utils import save_json, save_parquet_dataset
+
+    fig_dir = os.path.join(out_dir, "figures")
+    with prof.stage("plots"):
+        plot_before_after_bars(
+            before_metrics["stockout_units"], after_metrics["stockout_units"],
+            title="Inventory policy impact: stockout units (lower is better)",
+            ylabel="Stockout units",
+            out_path=os.path.join(fig_dir, "inventory_stockouts_before_after.png"),
+        )
+
+    inv_rec = (
+        inv_df.groupby(["item_id","store_id"], as_index=False)
+              .agg(avg_pred=("pred_units","mean"),
+                   reorder_point=("reorder_point","mean"),
+                   safety_stock=("safety_stock","mean"))
+              .sort_values("avg_pred", ascending=False)
+    )
+    # CSVs stay small download previews; the backend queries the full Parquet datasets
+    pq_dir = os.path.join(out_dir, "parquet")
+    inv_rec.head(200).to_csv(os.path.join(out_dir, "recommendations_inventory.csv"), index=False)
+    save_parquet_dataset(inv_rec, os.path.join(pq_dir, "recommendations_inventory"), sort_by=["item_id"])
+    # Arrow artifacts hold exactly what the backend serves (derived columns, display order), so
+    # its workers map them read-only instead of each building its own frame
+    publish_table(out_dir, "recommendations_inventory",
+                  inventory_actions(inv_rec).sort_values("reorder_point", ascending=False, kind="stable"))
+
+    pricing_rec.head(500).to_csv(os.path.join(out_dir, "recommendations_pricing.csv"), index=False)
+    if len(pricing_rec) > 0:
+        save_parquet_dataset(pricing_rec, os.path.join(pq_dir, "recommendations_pricing"), sort_by=["item_id"])
+        publish_table(out_dir, "recommendations_pricing", pricing_rec.sort_values("profit", ascending=False, kind="stable"))
+    with prof.stage("assortment", rows_in=len(pricing_rec)) as st:
+        assort = recommend_assortment(pricing_rec, valid_pred, max_items_per_store=200, min_items_per_cat=10)
+        st.rows_out = len(assort)
+    assort.to_csv(os.path.join(out_dir, "recommendations_assortment.csv"), index=False)
+    if len(assort) > 0:
+        save_parquet_dataset(assort, os.path.join(pq_dir, "recommendations_assortment"), sort_by=["item_id"])
+        publish_table(out_dir, "recommendations_assortment", assort.sort_values("profit", ascending=False, kind="stable"))
+
+    # total/state/store x total/cat/dept/item aggregates behind the backend's /rollup
+    with prof.stage("rollup", rows_in=len(inv_df) + len(pricing_rec)) as st:
+        st.rows_out = publish_rollup(out_dir, "inventory", inv_df, inventory_measures(cfg.lead_time_days))
+        if len(pricing_rec) > 0:
+            st.rows_out += publish_rollup(out_dir, "pricing", pricing_rec, PRICING_MEASURES, periods=("horizon",))
+
+    if len(pricing_rec) > 0:
+        base_profit = (
+            pricing_rec["base_price"] * (1 - cfg.cost_fraction_of_base_price) *
+            (pricing_rec["base_demand_per_day"] * cfg.horizon).clip(upper=pricing_rec["inventory_on_hand"])
+        ).head(200).sum()
+        opt_profit = pricing_rec["profit"].head(200).sum()
+
+        with prof.stage("plots"):
+            plot_before_after_bars(
+                float(base_profit), float(opt_profit),
+                title="Pricing/markdown optimization: profit (top 200 recs)",
+                ylabel="Profit (proxy units*$)",
+                out_path=os.path.join(fig_dir, "pricing_before_after_profit.png"),
+            )
+
+    summary = {
+        "forecast_valid_rmse": metrics["valid_rmse"],
+        "forecast_valid_wape": metrics["valid_wape"],
+        "forecast_valid_wrmsse": metrics["valid_wrmsse"],
+        "forecast_valid_wrmsse_by_level": metrics["valid_wrmsse_by_level"],
+        "forecast_valid_wape_by_method": metrics.get("valid_wape_by_method"),
+        "inventory_before": before_metrics,
+        "inventory_after": after_metrics,
+        "pricing_recommendations_rows": int(len(pricing_rec)),
+    }
+    save_json(os.path.join(out_dir, "summary_metrics.json"), summary)
+
+    # per-store copilot answers (written after the summary: the backend trusts briefs newer than it)
+    with prof.stage("briefs", rows_in=len(inv_rec) + len(pricing_rec)) as st:
+        briefs = build_briefs(summary, inv_rec, pricing_rec, assort)
+        write_briefs(os.path.join(out_dir, "copilot_briefs.json"), briefs)
+        st.rows_out = len(briefs["stores"])
+    return summary
+
+
+def report_regressions(profile: Dict[str, object]) -> None:
+    for r in profile["regressions"]:
+        print(f"  ⚠ stage '{r['stage']}' slower than previous run: {r['previous_wall_s']:.2f}s -> {r['wall_s']:.2f}s")
+
+
+def run(args: argparse.Namespace) -> None:
+    import numpy as np
+
+    from .. import registry, warm
+    from ..config import PipelineConfig
+    from ..features import make_train_valid_split
+    from ..forecast import FEATURE_COLS, score_forecast, train_forecast_model, save_model
+    from ..intermittent import WINDOW_DAYS, route_series
+    from ..online import build_series_state, publish_series_state, state_inputs_duckdb
+    from ..profiling import StageProfiler
+    from ..sampling import TrainingBudget, describe
+    from ..sharding import check_shard, select_series, shard_dir, write_shard
+    from ..sql_features import m5_sources, build_features_duckdb
+    from ..utils import ensure_dir
+    from ..wrmsse import evaluator_inputs, wrmsse_metrics
+
+    try:
+        check_shard(args.shard, args.num_shards)
+    except ValueError as e:
+        raise SystemExit(f"error: {e}")
+    sharded = args.shard is not None
+    cfg = PipelineConfig()
+    out_dir = shard_dir(args.out_dir, args.shard, args.num_shards) if sharded else args.out_dir
+    fig_dir = os.path.join(out_dir, "figures")
+    ensure_dir(out_dir)
+    ensure_dir(fig_dir)
+    prof = StageProfiler(cprofile_stages=args.cprofile_stage, profile_dir=os.path.join(out_dir, "profiles"))
+    slice_note = f" (shard {args.shard} of {args.num_shards})" if sharded else ""
+
+    if args.feature_engine == "duckdb":
+        print("1) Caching M5 tables as Parquet...")
+        with prof.stage("load"):
+            sources = m5_sources(args.zip_path, cache_dir=args.m5_cache_dir)
+
+        print(f"2) Build long dataset + joins + features in DuckDB{slice_note}...")
+        with prof.stage("features") as st:
+            feat = build_features_duckdb(sources, max_series=args.max_series, shard=args.shard, num_shards=args.num_shards)
+            feat = feat.dropna(subset=["date"]).copy()
+            st.rows_out = len(feat)
+    else:
+        print("1) Loading M5 from zip...")
+        with prof.stage("load") as st:
+            m5 = warm.m5_tables(args.zip_path)
+            st.rows_out = sum(len(df) for df in m5.values())
+
+        print(f"2) Build long dataset + joins{slice_note}...")
+        feat = warm.features(args.zip_path, args.max_series, profiler=prof, shard=args.shard, num_shards=args.num_shards)
+
+    train_df, valid_df = make_train_valid_split(feat, horizon=cfg.horizon)
+    key = registry.data_key(args.zip_path, args.max_series, cfg.horizon)
+    if sharded:
+        # training stays in one place; every shard scores with the same registered model
+        print("3) Score validation window with the registered model...")
+        model = registry.load(args.out_dir, args.model_version, feature_cols=FEATURE_COLS)
+        model_version = model.version
+        tiers = model.tiers
+        metrics, valid_pred = score_forecast(model, valid_df, profiler=prof, tiers=tiers, history=train_df)
+        with prof.stage("wrmsse", rows_in=len(train_df)):
+            wr_ids, wr_train, wr_revenue = evaluator_inputs(train_df)
+        print(f"  model {model_version}: shard valid WAPE {metrics['valid_wape']:.4f}")
+    else:
+        print("3) Train + validate forecast model...")
+        tiers = None
+        if not args.no_tiering:
+            with prof.stage("route", rows_in=len(train_df)) as st:
+                tiers = route_series(train_df)
+                st.rows_out = len(tiers)
+            print("  series by method:", tiers["method"].value_counts().sort_index().to_dict())
+        budget = TrainingBudget(max_rows=args.train_rows, seed=args.sample_seed,
+                                max_seconds=None if args.train_minutes is None else 60 * args.train_minutes)
+        model, metrics, valid_pred = train_forecast_model(train_df, valid_df, profiler=prof, tiers=tiers, budget=budget)
+        if "train_sample" in metrics:
+            print("  training sample:", describe(metrics["train_sample"]))
+        with prof.stage("wrmsse", rows_in=len(train_df) + len(valid_pred)):
+            metrics.update(wrmsse_metrics(train_df, valid_pred))
+        print(f"  valid WRMSSE {metrics['valid_wrmsse']:.4f}")
+        save_model(model, os.path.join(out_dir, "lgbm_model.joblib"))
+        model_version = registry.register(out_dir, model, FEATURE_COLS, key, metrics, params={"script": "run_all", "feature_engine": args.feature_engine}, tiers=tiers)
+        print(f"  registered model {model_version}")
+
+        print("4) Forecast charts...")
+        forecast_charts(valid_pred, fig_dir, prof)
+
+    print("5) Inventory positioning + simulation...")
+    inv_df, before_metrics, after_metrics = simulate_inventory(cfg, valid_pred, prof)
+
+    print("6) Pricing / markdown optimization (subset)...")
+    pricing_rec = optimize_pricing(cfg, valid_pred, prof)
+
+    # latest feature state of every series (not just the sampled ones) for /forecast/predict
+    with prof.stage("series_state") as st:
+        state_inputs = state_inputs_duckdb(sources, days=WINDOW_DAYS) if args.feature_engine == "duckdb" else \
+            (m5["sales_train_validation"], m5["calendar"], m5["sell_prices"])
+        if sharded:
+            sales = state_inputs[0]
+            sales = sales[select_series(sales["id"], shard=args.shard, num_shards=args.num_shards)]
+            state, calendar_state = build_series_state(sales, *state_inputs[1:], tiers=tiers)
+            st.rows_out = len(state)
+        else:
+            st.rows_out = publish_series_state(out_dir, *state_inputs, tiers=tiers)
+
+    if sharded:
+        with prof.stage("write_shard", rows_in=len(valid_pred) + len(inv_df)):
+            write_shard(
+                out_dir,
+                meta={
+                    "shard": args.shard, "num_shards": args.num_shards, "model_version": model_version,
+                    "data_key": key, "inventory_rows": len(inv_df),
+                    "inventory_before": before_metrics, "inventory_after": after_metrics,
+                },
+                frames={
+                    "valid_pred": valid_pred, "inventory": inv_df, "pricing": pricing_rec,
+                    "series_state": state, "calendar_state": calendar_state,
+                    "wrmsse_series": wr_ids.assign(revenue=wr_revenue),
+                },
+                arrays={"wrmsse_train": np.asarray(wr_train, dtype=np.float32)},
+            )
+    else:
+        publish_reports(out_dir, cfg, metrics, valid_pred, inv_df, before_metrics, after_metrics, pricing_rec, prof)
+
+    params = {"max_series": args.max_series, "feature_engine": args.feature_engine}
+    if sharded:
+        params.update(shard=args.shard, num_shards=args.num_shards)
+    profile = prof.write(os.path.join(out_dir, "pipeline_profile.json"), meta={"command": "run_all", "params": params})
+    report_regressions(profile)
+
+    print("\nDONE ✅")
+    print(f"Outputs in: {out_dir}/")
@@ -0,0 +1,71 @@
+import argparse
+import os
+
+# ad hoc queries shipped with the repo; --sql_path falls back to this directory
+SQL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "scripts", "sql")
+
+
+def add_arguments(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument("--zip_path", required=True)
+    ap.add_argument("--db_path", default="reports/m5.duckdb")
+    ap.add_argument("--max_series", type=int, default=2000)
+    ap.add_argument("--engine", choices=["duckdb", "pandas"], default="duckdb",
+                    help="duckdb stages the fact rows in SQL; pandas builds features in pandas and ingests via Arrow")
+    ap.add_argument("--restate_days", type=int, default=0, help="also re-load this many days before each series' watermark")
+    ap.add_argument("--full_refresh", action="store_true", help="drop fact_sales and the summaries and reload everything")
+    ap.add_argument("--out_dir", default=None, help="where sql_top_items.csv goes (default: next to --db_path)")
+    ap.add_argument("--sql_path", default=None, help="optional ad hoc query to run and print, e.g. scripts/sql/examples.sql")
+
+
+def warm_inputs(args: argparse.Namespace) -> None:
+    from .. import warm
+    if args.engine == "pandas":
+        warm.features(args.zip_path, args.max_series)
+
+
+def run(args: argparse.Namespace) -> None:
+    import duckdb
+
+    from .. import warm
+    from ..sql_features import m5_sources, features_sql
+    from ..warehouse import FACT_COLS, ensure_schema, upsert_fact_sales, watermarks
+    from ..utils import save_parquet_dataset
+
+    out_dir = args.out_dir or os.path.dirname(os.path.abspath(args.db_path))
+    os.makedirs(os.path.dirname(os.path.abspath(args.db_path)), exist_ok=True)
+    con = duckdb.connect(args.db_path)
+    ensure_schema(con, full_refresh=args.full_refresh)
+    before = watermarks(con)
+
+    if args.engine == "duckdb":
+        sources = m5_sources(args.zip_path)
+        sql = features_sql(sources, lags=(), windows=(), max_series=args.max_series)
+        con.execute(f"CREATE OR REPLACE TEMP TABLE _staging AS SELECT {', '.join(FACT_COLS)} FROM ({sql})")
+    else:
+        import pyarrow as pa
+        feat = warm.features(args.zip_path, args.max_series)
+        # from_pandas copies only the fact columns (not the whole feature frame) into Arrow;
+        # DuckDB then scans that table without converting it again
+        staging = pa.Table.from_pandas(feat, columns=FACT_COLS, preserve_index=False)
+        con.register("_staging", staging)
+
+    changed = upsert_fact_sales(con, "_staging", restate_days=args.restate_days)
+    stores = sorted({s for _, s in changed})
+    print(f"fact_sales: {len(changed):,} (date, store) partitions upserted across {len(stores)} stores"
+          + (f" (previous watermarks: {len(before):,} series)" if before else " (initial load)"))
+
+    df = con.execute("SELECT store_id, item_id, revenue_proxy, rn FROM mv_top_items ORDER BY store_id, rn").fetchdf()
+    out_csv = os.path.join(out_dir, "sql_top_items.csv")
+    os.makedirs(out_dir, exist_ok=True)
+    df.to_csv(out_csv, index=False)
+    if changed:
+        save_parquet_dataset(df, os.path.join(out_dir, "parquet", "sql_top_items"), sort_by=["item_id"])
+
+    if args.sql_path:
+        path = args.sql_path if os.path.isabs(args.sql_path) or os.path.exists(args.sql_path) \
+            else os.path.join(SQL_DIR, os.path.basename(args.sql_path))
+        with open(path, "r", encoding="utf-8") as f:
+            print(con.execute(f.read()).fetchdf().head(20).to_string(index=False))
+
+    con.close()
+    print("DONE ✅", out_csv)
@@ -0,0 +1,216 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import select
+import signal
+import socket
+import sys
+import threading
+import traceback
+from typing import List, Sequence, Tuple
+
+from . import commands, warm
+
+# `python -m pipeline daemon`: a long-lived process that keeps the heavy imports and the
+# pipeline.warm caches (zip tables, feature frames) loaded. Each request forks a child that
+# runs one command on the warm state and streams its output back over the connection, so a
+# command's memory, models and OpenMP threads never outlive it. POSIX only (AF_UNIX, fork).
+#
+# Protocol: the client sends one JSON line {"argv": [...], "cwd": "..."}; the daemon replies
+# with the command's stdout/stderr, then TRAILER + exit code + "\n". A client that hangs up
+# cancels its command.
+TRAILER = b"\x00pipeline-exit "
+POLL_S = 0.2
+
+# one warm-up/fork at a time: a fork must not happen while another thread holds a lock the
+# child needs (pipeline.warm's, the import lock)
+_fork_lock = threading.Lock()
+_conns = set()
+
+
+def _import_heavy() -> None:
+    import matplotlib
+    matplotlib.use("Agg")
+    from . import forecast, future, inventory, online, plots, registry, rollup, sql_features, warehouse, wrmsse  # noqa: F401
+    import pyarrow.parquet  # noqa: F401
+
+
+def _stop(signum, frame) -> None:
+    raise KeyboardInterrupt
+
+
+def _log(msg: str) -> None:
+    print(f"[pipeline daemon] {msg}", file=sys.stderr, flush=True)
+
+
+def _send(conn: socket.socket, data: bytes) -> None:
+    with contextlib.suppress(OSError):
+        conn.sendall(data)
+
+
+def _read_request(conn: socket.socket) -> dict:
+    buf = b""
+    while not buf.endswith(b"\n"):
+        chunk = conn.recv(65536)
+        if not chunk:
+            raise ConnectionError("client closed before sending a request")
+        buf += chunk
+    return json.loads(buf)
+
+
+def _exit_code(status: int) -> int:
+    code = os.waitstatus_to_exitcode(status)
+    return 128 - code if code < 0 else code
+
+
+def _child(listener: socket.socket, conn: socket.socket, args: argparse.Namespace) -> None:
+    code = 1
+    try:
+        os.setsid()
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        listener.close()
+        for other in list(_conns):
+            if other is not conn:
+                other.close()
+        os.dup2(conn.fileno(), 1)
+        os.dup2(conn.fileno(), 2)
+        sys.stdout = open(1, "w", encoding="utf-8", buffering=1, closefd=False)
+        sys.stderr = open(2, "w", encoding="utf-8", buffering=1, closefd=False)
+        code = commands.execute(args)
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        with contextlib.suppress(Exception):
+            sys.stdout.flush()
+            sys.stderr.flush()
+        os._exit(code)
+
+
+def _handle(listener: socket.socket, conn: socket.socket, parser: argparse.ArgumentParser) -> None:
+    _conns.add(conn)
+    try:
+        req = _read_request(conn)
+        with _fork_lock:
+            os.chdir(req["cwd"])
+            out = io.StringIO()
+            try:
+                with contextlib.redirect_stdout(out), contextlib.redirect_stderr(out):
+                    args = parser.parse_args(req["argv"])
+            except SystemExit as e:
+                # --help or a usage error: answered without running anything
+                _send(conn, out.getvalue().encode() + TRAILER + f"{e.code or 0}\n".encode())
+                return
+            if args.command not in commands.COMMANDS:
+                _send(conn, f"unknown command {args.command!r}\n".encode() + TRAILER + b"2\n")
+                return
+            _log(f"{args.command}: {' '.join(req['argv'][1:])}")
+            module = commands.load(args.command)
+            if hasattr(module, "warm_inputs"):
+                try:
+                    module.warm_inputs(args)
+                except Exception as e:
+                    # the command itself runs into (and reports) the same problem
+                    _log(f"warm-up failed: {e!r}")
+            sys.stdout.flush()
+            sys.stderr.flush()
+            pid = os.fork()
+            if pid == 0:
+                _child(listener, conn, args)
+
+        while True:
+            done, status = os.waitpid(pid, os.WNOHANG)
+            if done:
+                code = _exit_code(status)
+                break
+            readable, _, _ = select.select([conn], [], [], POLL_S)
+            if readable and not conn.recv(1):
+                _log(f"client went away, stopping {args.command} (pid {pid})")
+                with contextlib.suppress(ProcessLookupError):
+                    os.killpg(pid, signal.SIGTERM)
+                code = _exit_code(os.waitpid(pid, 0)[1])
+                break
+        _send(conn, TRAILER + f"{code}\n".encode())
+    except Exception:
+        _log(traceback.format_exc())
+        _send(conn, traceback.format_exc().encode() + TRAILER + b"1\n")
+    finally:
+        _conns.discard(conn)
+        conn.close()
+
+
+def serve(socket_path: str, preload: Sequence[Tuple[str, int]] = ()) -> None:
+    '''Serves commands on socket_path until SIGTERM/Ctrl-C; preload = (zip_path, max_series) pairs to warm first.'''
+    from .cli import build_parser
+
+    _import_heavy()
+    for zip_path, max_series in preload:
+        _log(f"warming {zip_path} (max_series={max_series})")
+        warm.features(zip_path, max_series)
+
+    if os.path.exists(socket_path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(socket_path)
+            raise RuntimeError(f"a daemon is already listening on {socket_path}")
+        except (ConnectionRefusedError, FileNotFoundError):
+            os.unlink(socket_path)
+        finally:
+            probe.close()
+
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    old_umask = os.umask(0o177)  # the socket runs code as this user: owner only
+    try:
+        listener.bind(socket_path)
+    finally:
+        os.umask(old_umask)
+    listener.listen(16)
+    signal.signal(signal.SIGTERM, _stop)
+    parser = build_parser()
+    _log(f"listening on {socket_path} (pid {os.getpid()})")
+    try:
+        while True:
+            conn, _ = listener.accept()
+            threading.Thread(target=_handle, args=(listener, conn, parser), daemon=True).start()
+    except KeyboardInterrupt:
+        _log("stopping")
+    finally:
+        listener.close()
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(socket_path)
+
+
+def run_remote(socket_path: str, argv: List[str]) -> int:
+    '''Runs `argv` (a command and its arguments) on the daemon, streaming its output; returns its exit code.'''
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.connect(socket_path)
+    sock.sendall(json.dumps({"argv": argv, "cwd": os.getcwd()}).encode() + b"\n")
+    out = sys.stdout.buffer
+    buf = b""
+    try:
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                out.write(buf)
+                out.flush()
+                print("pipeline daemon closed the connection without an exit code", file=sys.stderr)
+                return 1
+            buf += chunk
+            i = buf.find(TRAILER)
+            if i >= 0 and buf.endswith(b"\n"):
+                out.write(buf[:i])
+                out.flush()
+                return int(buf[i + len(TRAILER):])
+            # hold back a possible partial trailer
+            keep = i if i >= 0 else max(len(buf) - len(TRAILER) + 1, 0)
+            out.write(buf[:keep])
+            out.flush()
+            buf = buf[keep:]
+    except KeyboardInterrupt:
+        return 130
+    finally:
+        sock.close()
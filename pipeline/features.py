@@ -2,12 +2,15 @@ import numpy as np
 import pandas as pd
 from typing import List
 
-def to_long_sales(sales_wide: pd.DataFrame, max_series: int | None = None) -> pd.DataFrame:
-    df = sales_wide.copy()
-    if max_series is not None:
-    # sample across stores so charts show multiple store_id values
-        df = df.sample(n=max_series, random_state=42).copy()
+from .prices import PRICE_COLS, PriceCube
+from .sharding import select_series
 
+def to_long_sales(sales_wide: pd.DataFrame, max_series: int | None = None,
+                  shard: int | None = None, num_shards: int = 1) -> pd.DataFrame:
+    df = sales_wide
+    if max_series is not None or shard is not None:
+        # md5(id) sample: the same series for every script and engine, spread across stores
+        df = df[select_series(df["id"], max_series, shard, num_shards)]
 
     id_cols = ["id","item_id","dept_id","cat_id","store_id","state_id"]
     d_cols = [c for c in df.columns if c.startswith("d_")]
@@ -15,7 +18,7 @@ def to_long_sales(sales_wide: pd.DataFrame, max_series: int | None = None) -> pd
     long["units"] = long["units"].astype(np.float32)
     return long
 
-def join_calendar_prices(sales_long: pd.DataFrame, calendar: pd.DataFrame, sell_prices: pd.DataFrame) -> pd.DataFrame:
+def join_calendar_prices(sales_long: pd.DataFrame, calendar: pd.DataFrame, sell_prices: "pd.DataFrame | PriceCube") -> pd.DataFrame:
     cal = calendar.copy()
     keep_cols = [
         "d","date","wm_yr_wk","wday","month","year",
@@ -37,12 +40,10 @@ def join_calendar_prices(sales_long: pd.DataFrame, calendar: pd.DataFrame, sell_
     df["snap"] = df.apply(_snap, axis=1).astype(np.int8)
     df.drop(columns=["snap_CA","snap_TX","snap_WI"], inplace=True)
 
-    df = df.merge(
-        sell_prices[["store_id","item_id","wm_yr_wk","sell_price"]],
-        on=["store_id","item_id","wm_yr_wk"],
-        how="left"
-    )
-    df["sell_price"] = df["sell_price"].astype(np.float32)
+    # price, price_isna, filled price and price change come from the price cube by array gather
+    cube = PriceCube.of(sell_prices, weeks=cal["wm_yr_wk"])
+    for c, values in cube.frame_columns(df).items():
+        df[c] = values
     return df
 
 def add_time_series_features(df: pd.DataFrame, lags: List[int] = [7, 28], windows: List[int] = [7, 28]) -> pd.DataFrame:
@@ -52,15 +53,9 @@ def add_time_series_features(df: pd.DataFrame, lags: List[int] = [7, 28], window
     out["month"] = out["month"].astype(np.int8)
     out["year"] = out["year"].astype(np.int16)
 
-    out["price_isna"] = out["sell_price"].isna().astype(np.int8)
-    out["sell_price_filled"] = out.groupby("id")["sell_price"].transform(lambda s: s.ffill().bfill())
-    out["price_change_pct"] = (
-        out.groupby("id")["sell_price_filled"]
-           .pct_change()
-           .replace([np.inf,-np.inf], np.nan)
-           .fillna(0.0)
-           .astype(np.float32)
-    )
+    # gathered by join_calendar_prices; moved after weekday to keep the table's column order
+    for c in PRICE_COLS[1:]:
+        out[c] = out.pop(c)
 
     out["has_event_1"] = out["event_name_1"].notna().astype(np.int8)
     out["has_event_2"] = out["event_name_2"].notna().astype(np.int8)
@@ -69,23 +64,21 @@ def add_time_series_features(df: pd.DataFrame, lags: List[int] = [7, 28], window
     for lag in lags:
         out[f"lag_{lag}"] = out.groupby("id")["units"].shift(lag).astype(np.float32)
 
+    # rolling windows must stay inside each series: roll the shifted units per id,
+    # then drop the id level so the result aligns back on the original row labels
+    shifted = out.groupby("id")["units"].shift(1)
     for w in windows:
+        roll = shifted.groupby(out["id"], sort=False).rolling(window=w, min_periods=max(2, w//3))
         out[f"roll_mean_{w}"] = (
-            out.groupby("id")["units"]
-               .shift(1)
-               .rolling(window=w, min_periods=max(2, w//3))
-               .mean()
-               .reset_index(level=0, drop=True)
-               .astype(np.float32)
+            roll.mean()
+                .reset_index(level=0, drop=True)
+                .astype(np.float32)
         )
         out[f"roll_std_{w}"] = (
-            out.groupby("id")["units"]
-               .shift(1)
-               .rolling(window=w, min_periods=max(2, w//3))
-               .std()
-               .reset_index(level=0, drop=True)
-               .fillna(0.0)
-               .astype(np.float32)
+            roll.std()
+                .reset_index(level=0, drop=True)
+                .fillna(0.0)
+                .astype(np.float32)
         )
     return out
 
@@ -1,3 +1,4 @@
+import time
 import pandas as pd
 import numpy as np
 from typing import Tuple, Dict
@@ -6,6 +7,9 @@ from sklearn.metrics import mean_squared_error
 from joblib import dump
 
 from .utils import wape
+from .profiling import maybe_stage
+from .intermittent import LGBM, route_series, tail_rates
+from .sampling import TrainingBudget, plan_sample, probe_rows_per_s, target_rows
 
 FEATURE_COLS = [
     "item_id","dept_id","cat_id","store_id","state_id",
@@ -13,19 +17,17 @@ FEATURE_COLS = [
     "sell_price_filled","price_change_pct","price_isna",
     "lag_7","lag_28","roll_mean_7","roll_std_7","roll_mean_28","roll_std_28",
 ]
+CATEGORICAL_COLS = ["item_id","dept_id","cat_id","store_id","state_id"]
 
 def _prep_xy(df: pd.DataFrame) -> Tuple[pd.DataFrame, np.ndarray]:
     X = df[FEATURE_COLS].copy()
-    for c in ["item_id","dept_id","cat_id","store_id","state_id"]:
+    for c in CATEGORICAL_COLS:
         X[c] = X[c].astype("category")
     y = df["units"].values.astype(np.float32)
     return X, y
 
-def train_forecast_model(train_df: pd.DataFrame, valid_df: pd.DataFrame):
-    X_train, y_train = _prep_xy(train_df.dropna(subset=["lag_28","lag_7"]))
-    X_valid, y_valid = _prep_xy(valid_df.dropna(subset=["lag_28","lag_7"]))
-
-    model = LGBMRegressor(
+def _make_model(**overrides) -> LGBMRegressor:
+    params = dict(
         n_estimators=1200,
         learning_rate=0.05,
         num_leaves=64,
@@ -34,20 +36,96 @@ def train_forecast_model(train_df: pd.DataFrame, valid_df: pd.DataFrame):
         random_state=42,
         n_jobs=-1,
     )
-    model.fit(X_train, y_train)
+    params.update(overrides)
+    return LGBMRegressor(**params)
+
+def train_forecast_model(train_df: pd.DataFrame, valid_df: pd.DataFrame, profiler=None, tiers: pd.DataFrame = None,
+                         budget: TrainingBudget = None):
+    '''
+    Fits LightGBM and scores valid_df. With `tiers` (intermittent.route_series), LightGBM only
+    sees the series routed to it; the others are forecast by their intermittent estimator.
+    With an active `budget` it fits on a weighted row sample (pipeline/sampling.py) sized to
+    budget.max_rows and/or what fits in budget.max_seconds; metrics["train_sample"] is the plan.
+    '''
+    t0 = time.perf_counter()
+    head = train_df if tiers is None else train_df[train_df["id"].isin(tiers.loc[tiers["method"] == LGBM, "id"])]
+    head = head.dropna(subset=["lag_28","lag_7"])
+    weights, plan = None, None
+    if budget is not None and budget.active:
+        with maybe_stage(profiler, "sample", rows_in=len(head)) as st:
+            rate = None
+            if budget.max_seconds is not None:
+                rate = probe_rows_per_s(_make_model, _prep_xy, head, _make_model().n_estimators, seed=budget.seed)
+            target = target_rows(len(head), budget, rate, spent_s=time.perf_counter() - t0)
+            if target < len(head):
+                keep, weights, plan = plan_sample(head, target, budget)
+                head = head[keep]
+            else:
+                plan = {"rows": int(len(head)), "target_rows": int(target), "sampled_rows": int(len(head))}
+            if rate is not None:
+                plan["rows_per_s"] = round(rate, 1)
+            st.rows_out = len(head)
+    X_train, y_train = _prep_xy(head)
+
+    model = _make_model()
+    with maybe_stage(profiler, "train", rows_in=len(X_train)):
+        model.fit(X_train, y_train, sample_weight=weights)
+
+    metrics, out = score_forecast(model, valid_df, profiler=profiler, tiers=tiers, history=train_df)
+    if plan is not None:
+        plan["fit_s"] = round(time.perf_counter() - t0, 1)
+        metrics["train_sample"] = plan
+    return model, metrics, out
+
+def score_forecast(model, valid_df: pd.DataFrame, profiler=None, tiers: pd.DataFrame = None, history: pd.DataFrame = None):
+    '''
+    Predicts the rows of valid_df that have their lags; returns (metrics, those rows + pred_units
+    and the `method` that predicted them). `model` is a fitted LGBMRegressor or a
+    registry.RegisteredModel. With `tiers`, series routed away from LightGBM get the flat rate
+    their estimator fits on `history` (series missing from tiers are routed on it first).
+    '''
+    valid = valid_df.dropna(subset=["lag_28","lag_7"])
+    out = valid.copy()
+    out["method"] = LGBM
+    if tiers is not None:
+        tiers = route_series(history, known=tiers)
+        rates = tail_rates(history, tiers)
+        tail = out["id"].isin(rates.index).to_numpy()
+        out.loc[tail, "method"] = out.loc[tail, "id"].map(tiers.set_index("id")["method"])
+    else:
+        tail = np.zeros(len(out), dtype=bool)
 
-    pred = model.predict(X_valid).astype(np.float32)
-    pred = np.clip(pred, 0.0, None)
+    X_valid, _ = _prep_xy(valid[~tail])
+    pred = np.empty(len(out), dtype=np.float32)
+    with maybe_stage(profiler, "predict", rows_in=len(X_valid)) as st:
+        pred[~tail] = np.clip(model.predict(X_valid).astype(np.float32), 0.0, None) if len(X_valid) else []
+        if tail.any():
+            pred[tail] = out.loc[tail, "id"].map(rates).to_numpy(np.float32)
+        st.rows_out = len(pred)
 
-    metrics = {
+    out["pred_units"] = pred
+    metrics = forecast_metrics(out["units"].to_numpy(np.float32), pred)
+    metrics.update(method_metrics(out))
+    return metrics, out
+
+def forecast_metrics(y_valid: np.ndarray, pred: np.ndarray) -> Dict[str, float]:
+    return {
         "valid_rmse": float(mean_squared_error(y_valid, pred, squared=False)),
         "valid_wape": float(wape(y_valid, pred)),
         "valid_sum_y": float(np.sum(y_valid)),
     }
 
-    out = valid_df.dropna(subset=["lag_28","lag_7"]).copy()
-    out["pred_units"] = pred
-    return model, metrics, out
+def method_metrics(valid_pred: pd.DataFrame) -> Dict[str, Dict[str, float]]:
+    '''valid_wape_by_method / valid_series_by_method of a scored frame with a `method` column.'''
+    if "method" not in valid_pred.columns:
+        return {}
+    groups = valid_pred.groupby("method", sort=True)
+    by_method = {m: wape(g["units"].to_numpy(), g["pred_units"].to_numpy()) for m, g in groups}
+    return {
+        # wape is NaN for a group without sales; None keeps the metrics valid JSON
+        "valid_wape_by_method": {m: None if np.isnan(w) else w for m, w in by_method.items()},
+        "valid_series_by_method": {m: int(g["id"].nunique()) for m, g in groups},
+    }
 
 def save_model(model, path: str) -> None:
     dump(model, path)
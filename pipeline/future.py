@@ -2,6 +2,8 @@ import pandas as pd
 import numpy as np
 
 from .forecast import FEATURE_COLS
+from .intermittent import LGBM, route_series, tail_rates
+from .prices import PriceCube
 
 CAT_COLS = ["item_id", "dept_id", "cat_id", "store_id", "state_id"]
 
@@ -11,7 +13,11 @@ def _cast_cats(X: pd.DataFrame) -> pd.DataFrame:
             X[c] = X[c].astype("category")
     return X
 
-def build_future_frame(history_feat: pd.DataFrame, calendar: pd.DataFrame, sell_prices: pd.DataFrame, horizon: int = 28) -> pd.DataFrame:
+def build_future_frame(history_feat: pd.DataFrame, calendar: pd.DataFrame, sell_prices: "pd.DataFrame | PriceCube", horizon: int = 28) -> pd.DataFrame:
+    '''
+    Feature rows of the `horizon` days after history_feat. Pass a PriceCube.with_prices copy as
+    sell_prices to build the frame of a what-if repricing.
+    '''
     hist = history_feat.sort_values(["id", "date"]).copy()
     last_date = hist["date"].max()
 
@@ -33,21 +39,9 @@ def build_future_frame(history_feat: pd.DataFrame, calendar: pd.DataFrame, sell_
 
     future["snap"] = future.apply(_snap, axis=1).astype(np.int8)
 
-    future = future.merge(
-        sell_prices[["store_id", "item_id", "wm_yr_wk", "sell_price"]],
-        on=["store_id", "item_id", "wm_yr_wk"],
-        how="left",
-    )
-    future["sell_price"] = future["sell_price"].astype(np.float32)
-    future["sell_price_filled"] = future.groupby("id")["sell_price"].transform(lambda s: s.ffill().bfill())
-    future["price_isna"] = future["sell_price"].isna().astype(np.int8)
-    future["price_change_pct"] = (
-        future.groupby("id")["sell_price_filled"]
-        .pct_change()
-        .replace([np.inf, -np.inf], np.nan)
-        .fillna(0.0)
-        .astype(np.float32)
-    )
+    prices = PriceCube.of(sell_prices, weeks=cal["wm_yr_wk"]).frame_columns(future)
+    for c in ("sell_price", "sell_price_filled", "price_isna", "price_change_pct"):
+        future[c] = prices[c]
 
     future["weekday"] = future["wday"].astype(np.int8)
     future["month"] = future["month"].astype(np.int8)
@@ -107,3 +101,19 @@ def recursive_forecast(model, history_feat: pd.DataFrame, future_base: pd.DataFr
             units_list.append(np.float32(yhat))
 
     return pd.DataFrame(out_rows)
+
+def tiered_forecast(model, history_feat: pd.DataFrame, future_base: pd.DataFrame, tiers: pd.DataFrame) -> pd.DataFrame:
+    '''
+    recursive_forecast for the series `tiers` routes to LightGBM; the others get their
+    intermittent estimator's flat rate for every future day. Rows carry the `method` used.
+    '''
+    tiers = route_series(history_feat, known=tiers)
+    rates = tail_rates(history_feat, tiers)
+    tail = future_base["id"].isin(rates.index)
+    head_ids = future_base.loc[~tail, "id"].unique()
+    head = recursive_forecast(model, history_feat[history_feat["id"].isin(head_ids)], future_base[~tail])
+    head["method"] = LGBM
+    flat = future_base[tail].copy()
+    flat["pred_units"] = flat["id"].map(rates).astype(np.float32)
+    flat["method"] = flat["id"].map(tiers.set_index("id")["method"])
+    return pd.concat([head, flat], ignore_index=True).sort_values(["id", "date"], kind="stable", ignore_index=True)
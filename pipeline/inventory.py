@@ -1,6 +1,6 @@
 import numpy as np
 import pandas as pd
-from typing import Dict
+from typing import Dict, Sequence, Tuple
 from scipy.stats import norm
 
 def compute_inventory_policy(forecast_df: pd.DataFrame, service_level: float = 0.95, lead_time_days: int = 7) -> pd.DataFrame:
@@ -72,3 +72,12 @@ def simulate_replenishment(
         "stockout_cost": float(stockout_cost),
         "total_cost": float(holding_cost + stockout_cost),
     }
+
+def merge_simulation_metrics(parts: Sequence[Tuple[Dict[str, float], int]]) -> Dict[str, float]:
+    '''Combines simulate_replenishment results of disjoint series sets, each given with its row count.'''
+    rows = sum(n for _, n in parts)
+    out = {"stockout_units": float(sum(m["stockout_units"] for m, _ in parts)),
+           "avg_holding_units": float(sum(m["avg_holding_units"] * n for m, n in parts) / max(1, rows))}
+    for k in ("holding_cost", "stockout_cost", "total_cost"):
+        out[k] = float(sum(m[k] for m, _ in parts))
+    return out
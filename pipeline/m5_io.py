@@ -1,3 +1,4 @@
+import os
 import zipfile
 import pandas as pd
 from typing import Dict
@@ -22,3 +23,43 @@ def read_m5_from_zip(zip_path: str) -> Dict[str, pd.DataFrame]:
         "sales_train_evaluation": out["sales_train_evaluation"],
         "sample_submission": out["sample_submission"],
     }
+
+M5_TABLES = ["calendar", "sell_prices", "sales_train_validation", "sales_train_evaluation", "sample_submission"]
+
+def cache_m5_parquet(zip_path: str, cache_dir: str) -> Dict[str, str]:
+    '''
+    Converts each CSV in the Kaggle zip to Parquet once (re-done only when the zip changes).
+    Returns {table_name: parquet_path}; DuckDB and pandas can both scan these without the zip.
+    '''
+    import json
+    import shutil
+    import tempfile
+    import duckdb
+
+    os.makedirs(cache_dir, exist_ok=True)
+    st = os.stat(zip_path)
+    source = {"zip_path": os.path.abspath(zip_path), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+    manifest = os.path.join(cache_dir, "_source.json")
+    paths = {name: os.path.join(cache_dir, f"{name}.parquet") for name in M5_TABLES}
+    cached = {}
+    if os.path.exists(manifest):
+        with open(manifest, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+    stale = [n for n, p in paths.items() if cached != source or not os.path.exists(p)]
+    if not stale:
+        return paths
+
+    con = duckdb.connect()
+    with zipfile.ZipFile(zip_path) as zf, tempfile.TemporaryDirectory(dir=cache_dir) as tmp:
+        members = {os.path.basename(n).replace(".csv", ""): n for n in zf.namelist() if n.endswith(".csv")}
+        for name in stale:
+            csv_path = os.path.join(tmp, f"{name}.csv")
+            with zf.open(members[name]) as src, open(csv_path, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            tmp_out = paths[name] + ".tmp"
+            con.execute(f"COPY (SELECT * FROM read_csv_auto('{csv_path}')) TO '{tmp_out}' (FORMAT PARQUET)")
+            os.replace(tmp_out, paths[name])
+    con.close()
+    with open(manifest, "w", encoding="utf-8") as f:
+        json.dump(source, f)
+    return paths
@@ -0,0 +1,160 @@
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List, Optional
+
+# The copilot's deterministic answer: key metrics, decisions, the actionable inventory fields,
+# the top-10 rankings and the markdown memo. run-all precomputes it per store (briefs.py) and the
+# backend builds it at request time (app/agent/orchestrator.py, app/services/reports.py) from
+# this one module, so a brief and a live answer cannot disagree.
+INVENTORY_COLS = ["item_id", "store_id", "avg_pred", "inventory_on_hand", "days_of_supply", "reorder_point", "safety_stock", "order_qty"]
+METRIC_KEYS = (
+    "forecast_valid_wape", "forecast_valid_rmse",
+    "stockout_units_before", "stockout_units_after", "stockout_units_pct_change",
+    "total_cost_before", "total_cost_after", "total_cost_pct_change",
+)
+TRADEOFFS = [
+    "Lower stockouts usually increases average inventory on hand (holding cost rises while stockout cost falls).",
+    "Pricing recommendations depend on elasticity assumptions; validate with A/B or historical promo outcomes.",
+    "Forecast error (WAPE/RMSE) compounds into inventory decisions; monitor drift and retrain regularly.",
+]
+ASSUMPTIONS = [
+    "This is a demo using the M5 dataset; item/store IDs are from the dataset, not Nordstrom production catalogs.",
+    "Lead time and service level are simplified; reorder_point is based on forecast mean + safety_stock.",
+    "Profit and cost are proxies; real systems need unit cost, margin, and markdown constraints.",
+]
+CONFIDENCE = 0.7
+
+
+def round_or_none(v, nd: int = 3) -> Optional[float]:
+    '''v as a rounded float; None for None, NaN and anything that is not a number.'''
+    if v is None:
+        return None
+    try:
+        v = float(v)
+    except (TypeError, ValueError):
+        return None
+    return None if np.isnan(v) else round(v, nd)
+
+
+def _pct_change(before, after) -> Optional[float]:
+    if before is None or after is None or before == 0:
+        return None
+    return (after - before) / before
+
+
+def key_metrics(summary: Dict[str, Any]) -> Dict[str, Any]:
+    inv_before = summary.get("inventory_before") or {}
+    inv_after = summary.get("inventory_after") or {}
+    sb, sa = inv_before.get("stockout_units"), inv_after.get("stockout_units")
+    cb, ca = inv_before.get("total_cost"), inv_after.get("total_cost")
+    return {
+        "forecast_valid_wape": round_or_none(summary.get("forecast_valid_wape")),
+        "forecast_valid_rmse": round_or_none(summary.get("forecast_valid_rmse")),
+        "stockout_units_before": round_or_none(sb),
+        "stockout_units_after": round_or_none(sa),
+        "stockout_units_pct_change": round_or_none(_pct_change(sb, sa)),
+        "total_cost_before": round_or_none(cb),
+        "total_cost_after": round_or_none(ca),
+        "total_cost_pct_change": round_or_none(_pct_change(cb, ca)),
+    }
+
+
+def decisions(summary: Dict[str, Any], store_id: Optional[str]) -> List[str]:
+    inv_before = summary.get("inventory_before") or {}
+    inv_after = summary.get("inventory_after") or {}
+    sb, sa = inv_before.get("stockout_units"), inv_after.get("stockout_units")
+    cb, ca = inv_before.get("total_cost"), inv_after.get("total_cost")
+    out = []
+    if store_id:
+        out.append(f"Prioritize replenishment for {store_id}: execute reorder_point + safety_stock for the top 10 SKUs below.")
+    else:
+        out.append("Select a store_id (e.g., CA_1) and execute reorder_point + safety_stock for the top 10 SKUs below.")
+    if sb is not None and sa is not None:
+        out.append(f"This policy reduces projected stockout units from {int(sb):,} to {int(sa):,} (simulated).")
+    if cb is not None and ca is not None:
+        out.append(
+            f"Total cost proxy changes from {int(cb):,} to {int(ca):,}; validate holding vs. stockout tradeoff for your service-level target."
+        )
+    return out
+
+
+def inventory_actions(inv_rec: pd.DataFrame) -> pd.DataFrame:
+    '''
+    Adds the actionable fields the API shows (demo on-hand = ~7 days of forecast), each only when
+    its inputs exist, and puts INVENTORY_COLS first. The backend's DuckDB query for Parquet
+    datasets (reports._recs_query) computes the same fields in SQL.
+    '''
+    df = inv_rec.copy()
+    if "inventory_on_hand" not in df.columns and "avg_pred" in df.columns:
+        df["inventory_on_hand"] = (df["avg_pred"].astype(float).fillna(0.0) * 7.0).round(3)
+    if "reorder_point" in df.columns and "inventory_on_hand" in df.columns:
+        df["order_qty"] = (df["reorder_point"].astype(float) - df["inventory_on_hand"].astype(float)).clip(lower=0).round(3)
+    if "avg_pred" in df.columns and "inventory_on_hand" in df.columns:
+        denom = df["avg_pred"].astype(float).replace(0, np.nan)
+        df["days_of_supply"] = (df["inventory_on_hand"].astype(float) / denom).replace([np.inf, -np.inf], np.nan).fillna(0.0).round(3)
+    cols = [c for c in INVENTORY_COLS if c in df.columns] + [c for c in df.columns if c not in INVENTORY_COLS]
+    return df[cols]
+
+
+def records(df: pd.DataFrame, round_cols=()) -> List[Dict[str, Any]]:
+    '''JSON-ready rows: round_cols rounded to 3 places, NaN as None.'''
+    df = df.copy()
+    for c in round_cols:
+        if c in df.columns:
+            df[c] = pd.to_numeric(df[c], errors="coerce").astype(np.float64).round(3)
+    df = df.astype(object).where(df.notna(), None)
+    return df.to_dict(orient="records")
+
+
+def _ranked(pool: pd.DataFrame, keys: List[str], n: int, round_cols) -> List[Dict[str, Any]]:
+    if pool.empty:
+        return []
+    # missing sort values count as 0
+    order = pool.assign(**{f"_k{i}": pd.to_numeric(pool[k], errors="coerce").fillna(0.0) if k in pool.columns else 0.0
+                           for i, k in enumerate(keys)})
+    order = order.sort_values([f"_k{i}" for i in range(len(keys))], ascending=False, kind="stable")
+    rows = records(order.head(n).drop(columns=[f"_k{i}" for i in range(len(keys))]), round_cols=round_cols)
+    for i, r in enumerate(rows, 1):
+        r["rank"] = i
+    return rows
+
+
+def top_inventory(pool: pd.DataFrame, n: int = 10) -> List[Dict[str, Any]]:
+    '''Highest reorder_point first (more urgent / high volume), then avg_pred.'''
+    return _ranked(pool, ["reorder_point", "avg_pred"], n, ("avg_pred", "reorder_point", "safety_stock"))
+
+
+def top_pricing(pool: pd.DataFrame, n: int = 10) -> List[Dict[str, Any]]:
+    '''Rows with a markdown first, then highest profit.'''
+    return _ranked(pool, ["markdown", "profit"], n, ("base_price", "opt_price", "markdown", "elasticity", "profit"))
+
+
+def compose_memo(
+    metrics: Dict[str, Any],
+    decisions: List[str],
+    inv_top: List[Dict[str, Any]],
+    prc_top: List[Dict[str, Any]],
+) -> str:
+    lines: List[str] = ["KEY METRICS"]
+    for k in METRIC_KEYS:
+        if metrics.get(k) is not None:
+            lines.append(f"- {k}: {metrics[k]}")
+
+    lines += ["", "DECISION (what to do now)"] + [f"- {d}" for d in decisions]
+
+    def md_table(rows: List[Dict[str, Any]], cols: List[str]) -> List[str]:
+        if not rows:
+            return ["(no rows)"]
+        out = ["| " + " | ".join(cols) + " |", "|" + "|".join(["---"] * len(cols)) + "|"]
+        for r in rows:
+            out.append("| " + " | ".join(str(r.get(c, "")) for c in cols) + " |")
+        return out
+
+    lines += ["", "TOP 10 INVENTORY ACTIONS"]
+    lines += md_table(inv_top, ["rank", "item_id", "avg_pred", "reorder_point", "safety_stock"])
+    lines += ["", "TOP 10 PRICING ACTIONS"]
+    lines += md_table(prc_top, ["rank", "item_id", "base_price", "opt_price", "markdown", "elasticity", "profit"])
+    lines += ["", "TRADEOFFS"] + [f"- {t}" for t in TRADEOFFS]
+    lines += ["", "ASSUMPTIONS"] + [f"- {a}" for a in ASSUMPTIONS]
+    lines += ["", f"CONFIDENCE: {round(CONFIDENCE, 2)}"]
+    return "\n".join(lines)
@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional, Sequence, Tuple
+
+from .artifacts import publish_table
+from .intermittent import wide_tail_rates
+from .sql_features import _scan
+
+# Per-series feature state for online forecasts (the backend's /forecast/predict): everything
+# add_time_series_features needs from a series' history, as of its last observed day.
+ID_COLS = ["id", "item_id", "dept_id", "cat_id", "store_id", "state_id"]
+# lag_28 and roll_*_28 reach back 28 days
+STATE_DAYS = 28
+WINDOWS = (7, 28)
+CALENDAR_COLS = ["date", "wm_yr_wk", "wday", "month", "year", "snap_CA", "snap_TX", "snap_WI", "is_event"]
+
+
+def build_series_state(sales_wide: pd.DataFrame, calendar: pd.DataFrame, sell_prices: pd.DataFrame,
+                       windows: Sequence[int] = WINDOWS, tiers: Optional[pd.DataFrame] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    '''
+    Returns (series_state, calendar_state).
+    series_state: one row per series with its ids, last_date, `history` (the last STATE_DAYS
+    units, most recent first), roll_mean/std_<w> over the window ending at last_date (same
+    min_periods/ddof as add_time_series_features) and last_price (price on or before last_date).
+    With a tiered model's `tiers`, also tail_rate: the flat intermittent-estimator forecast of the
+    series routed away from LightGBM (NaN for the others).
+    calendar_state: the calendar rows after last_date, with is_event.
+    '''
+    d_cols = [c for c in sales_wide.columns if c.startswith("d_")][-STATE_DAYS:]
+    cal = calendar.copy()
+    cal["date"] = pd.to_datetime(cal["date"])
+    cal_by_d = cal.set_index("d")
+    last_date = cal_by_d.loc[d_cols[-1], "date"]
+    last_wk = cal_by_d.loc[d_cols[-1], "wm_yr_wk"]
+
+    hist = sales_wide[d_cols].to_numpy(np.float32)[:, ::-1]
+    state = sales_wide[ID_COLS].reset_index(drop=True)
+    state["last_date"] = last_date.date()
+    state["history"] = list(np.ascontiguousarray(hist))
+    for w in windows:
+        win = hist[:, :w]
+        n = np.isfinite(win).sum(axis=1)
+        enough = n >= max(2, w // 3)
+        with np.errstate(all="ignore"):
+            mean = np.nanmean(win, axis=1)
+            std = np.nanstd(win, axis=1, ddof=1)
+        state[f"roll_mean_{w}"] = np.where(enough, mean, np.nan).astype(np.float32)
+        state[f"roll_std_{w}"] = np.where(enough, np.nan_to_num(std), 0.0).astype(np.float32)
+
+    last_price = (
+        sell_prices[sell_prices["wm_yr_wk"] <= last_wk]
+        .sort_values("wm_yr_wk")
+        .groupby(["item_id", "store_id"], as_index=False)["sell_price"].last()
+        .rename(columns={"sell_price": "last_price"})
+    )
+    state = state.merge(last_price, on=["item_id", "store_id"], how="left")
+    state["last_price"] = state["last_price"].astype(np.float32)
+    if tiers is not None:
+        state["tail_rate"] = state["id"].map(wide_tail_rates(sales_wide, tiers)).astype(np.float32)
+
+    future = cal[cal["date"] > last_date].sort_values("date").copy()
+    future["is_event"] = (future["event_name_1"].notna() | future["event_name_2"].notna()).astype(np.int8)
+    return state, future[CALENDAR_COLS].reset_index(drop=True)
+
+
+def state_inputs_duckdb(sources: Dict[str, str], sales_table: str = "sales_train_validation", days: int = STATE_DAYS):
+    '''
+    (sales_wide, calendar, sell_prices) for build_series_state read from the M5 Parquet/CSV
+    sources: only the id and last `days` (>= STATE_DAYS) day columns, and one price per series.
+    '''
+    import duckdb
+
+    con = duckdb.connect()
+    try:
+        sales_src = _scan(sources[sales_table])
+        cols = [r[0] for r in con.execute(f"DESCRIBE SELECT * FROM {sales_src}").fetchall()]
+        d_cols = [c for c in cols if c.startswith("d_")][-max(days, STATE_DAYS):]
+        sales = con.execute(f"SELECT {', '.join(ID_COLS + d_cols)} FROM {sales_src}").df()
+        calendar = con.execute(f"SELECT * FROM {_scan(sources['calendar'])}").df()
+        last_wk = calendar.loc[calendar["d"] == d_cols[-1], "wm_yr_wk"].iloc[0]
+        prices = con.execute(f"""
+            SELECT store_id, item_id, max(wm_yr_wk) AS wm_yr_wk, arg_max(sell_price, wm_yr_wk) AS sell_price
+            FROM {_scan(sources['sell_prices'])} WHERE wm_yr_wk <= {int(last_wk)}
+            GROUP BY store_id, item_id
+        """).df()
+    finally:
+        con.close()
+    return sales, calendar, prices
+
+
+def publish_series_state(out_dir: str, sales_wide: pd.DataFrame, calendar: pd.DataFrame,
+                         sell_prices: pd.DataFrame, tiers: Optional[pd.DataFrame] = None) -> int:
+    '''Publishes the series_state and calendar_state artifacts; returns the number of series.'''
+    state, future = build_series_state(sales_wide, calendar, sell_prices, tiers=tiers)
+    publish_table(out_dir, "series_state", state)
+    publish_table(out_dir, "calendar_state", future)
+    return len(state)
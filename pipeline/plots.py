@@ -25,11 +25,13 @@ def plot_forecast_example(pred_df: pd.DataFrame, out_path: str, n_series: int =
 
 def plot_wape_by_store(pred_df: pd.DataFrame, out_path: str):
     ensure_dir(os.path.dirname(out_path))
-    store = pred_df.groupby("store_id").apply(
-        lambda g: np.sum(np.abs(g["units"] - g["pred_units"])) / max(1e-6, np.sum(np.abs(g["units"])))
-    ).reset_index()
-    store.columns = ["store_id","wape"]
-    store = store.sort_values("wape")
+    err = pd.DataFrame({
+        "store_id": pred_df["store_id"].to_numpy(),
+        "abs_err": np.abs(pred_df["units"].to_numpy() - pred_df["pred_units"].to_numpy()),
+        "abs_y": np.abs(pred_df["units"].to_numpy()),
+    }).groupby("store_id", as_index=False).sum()
+    err["wape"] = err["abs_err"] / err["abs_y"].clip(lower=1e-6)
+    store = err[["store_id","wape"]].sort_values("wape")
 
     fig = plt.figure()
     plt.bar(store["store_id"].astype(str), store["wape"].values)
@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional, Sequence
+
+# Dense price cube: sell_price of every (store, item, week) in one float32 array, one row per
+# store x item and one column per week (NaN: not on sale). Frames get their price columns by
+# an array gather on (series, week) codes instead of a three-key merge against sell_prices,
+# and ffill/bfill runs over the weeks a frame spans, all series at once. A what-if repricing
+# is a copy of the cube with some cells overwritten (with_prices), gathered the same way.
+PRICE_COLS = ("sell_price", "price_isna", "sell_price_filled", "price_change_pct")
+
+
+def _ffill(a: np.ndarray) -> np.ndarray:
+    idx = np.where(np.isnan(a), 0, np.arange(a.shape[1]))
+    np.maximum.accumulate(idx, axis=1, out=idx)
+    return np.take_along_axis(a, idx, axis=1)
+
+
+def fill_weeks(a: np.ndarray) -> np.ndarray:
+    '''Forward- then back-filled rows of a series x week matrix (rows without a price stay NaN).'''
+    return _ffill(_ffill(a)[:, ::-1])[:, ::-1]
+
+
+class PriceCube:
+    def __init__(self, stores: pd.Index, items: pd.Index, weeks: np.ndarray, prices: np.ndarray):
+        self.stores = stores
+        self.items = items
+        self.weeks = weeks
+        self.prices = prices  # (len(stores) * len(items), len(weeks)) float32
+
+    @classmethod
+    def from_sell_prices(cls, sell_prices: pd.DataFrame, weeks: Optional[Sequence[int]] = None) -> "PriceCube":
+        '''Cube of an M5 sell_prices frame; `weeks` (e.g. calendar["wm_yr_wk"]) adds weeks without any price.'''
+        store_code, stores = pd.factorize(sell_prices["store_id"], sort=True)
+        item_code, items = pd.factorize(sell_prices["item_id"], sort=True)
+        wk = sell_prices["wm_yr_wk"].to_numpy(np.int64)
+        axis = np.unique(wk if weeks is None else np.concatenate([wk, np.asarray(weeks, dtype=np.int64)]))
+        prices = np.full((len(stores) * len(items), len(axis)), np.nan, dtype=np.float32)
+        prices[store_code * len(items) + item_code, np.searchsorted(axis, wk)] = sell_prices["sell_price"].to_numpy(np.float32)
+        return cls(pd.Index(stores), pd.Index(items), axis, prices)
+
+    @classmethod
+    def of(cls, prices: "pd.DataFrame | PriceCube", weeks: Optional[Sequence[int]] = None) -> "PriceCube":
+        return prices if isinstance(prices, PriceCube) else cls.from_sell_prices(prices, weeks)
+
+    def series_codes(self, store_ids, item_ids) -> np.ndarray:
+        '''Row of each (store, item) pair; -1 when the cube has no price for it.'''
+        s = self.stores.get_indexer(store_ids)
+        i = self.items.get_indexer(item_ids)
+        return np.where((s >= 0) & (i >= 0), s * len(self.items) + i, -1)
+
+    def week_codes(self, wm_yr_wk) -> np.ndarray:
+        '''Column of each week; -1 for a missing or unknown week.'''
+        wk = np.asarray(wm_yr_wk, dtype=np.float64)
+        ok = np.isfinite(wk)
+        code = np.searchsorted(self.weeks, np.where(ok, wk, 0).astype(np.int64))
+        code = np.minimum(code, len(self.weeks) - 1)
+        return np.where(ok & (self.weeks[code] == np.where(ok, wk, -1)), code, -1)
+
+    def rows(self, series: np.ndarray, first: int = 0, last: Optional[int] = None) -> np.ndarray:
+        '''Prices of the given series over weeks first..last (axis positions; NaN rows for series -1).'''
+        last = len(self.weeks) - 1 if last is None else last
+        out = self.prices[np.maximum(series, 0), first:last + 1]
+        out[series < 0] = np.nan
+        return out
+
+    def with_prices(self, store_ids, item_ids, wm_yr_wk, sell_price) -> "PriceCube":
+        '''A copy with the given (store, item, week) cells set to sell_price (NaN: off sale); unknown keys are ignored.'''
+        series = self.series_codes(store_ids, item_ids)
+        week = self.week_codes(wm_yr_wk)
+        ok = (series >= 0) & (week >= 0)
+        prices = self.prices.copy()
+        prices[series[ok], week[ok]] = np.broadcast_to(np.asarray(sell_price, dtype=np.float32), ok.shape)[ok]
+        return PriceCube(self.stores, self.items, self.weeks, prices)
+
+    def frame_columns(self, df: pd.DataFrame) -> Dict[str, np.ndarray]:
+        '''
+        PRICE_COLS for a long frame with id, store_id, item_id, wm_yr_wk and date, in which every
+        series covers the same run of days: the raw weekly price, whether it is missing, the price
+        forward/back-filled within the frame's weeks, and its change from the previous day.
+        '''
+        id_code, _ = pd.factorize(df["id"])
+        first_row = np.unique(id_code, return_index=True)[1]
+        series = self.series_codes(df["store_id"].to_numpy()[first_row], df["item_id"].to_numpy()[first_row])
+        week = self.week_codes(df["wm_yr_wk"])
+        known = week >= 0
+
+        raw = np.full(len(df), np.nan, dtype=np.float32)
+        filled = np.full(len(df), np.nan, dtype=np.float32)
+        change = np.zeros(len(df), dtype=np.float32)
+        if known.any():
+            lo, hi = int(week[known].min()), int(week[known].max())
+            span = self.rows(series, lo, hi)
+            raw[known] = span[id_code[known], week[known] - lo]
+            filled_span = fill_weeks(span)
+            filled[known] = filled_span[id_code[known], week[known] - lo]
+
+            # the previous day's week; the frame's first day has none (change 0, like pct_change)
+            day = df["date"].to_numpy("datetime64[D]").astype(np.int64)
+            day0 = int(day[known].min())
+            week_of_day = np.full(int(day[known].max()) - day0 + 2, -1, dtype=np.int64)
+            week_of_day[day[known] - day0 + 1] = week[known]
+            prev = np.full(len(df), -1, dtype=np.int64)
+            prev[known] = week_of_day[day[known] - day0]
+            moved = known & (prev >= 0) & (prev != week)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                pct = filled[moved] / filled_span[id_code[moved], prev[moved] - lo] - np.float32(1.0)
+            change[moved] = np.where(np.isfinite(pct), pct, np.float32(0.0))
+
+        return {
+            "sell_price": raw,
+            "price_isna": np.isnan(raw).astype(np.int8),
+            "sell_price_filled": filled,
+            "price_change_pct": change,
+        }
@@ -2,6 +2,14 @@ import numpy as np
 import pandas as pd
 from typing import Tuple
 
+# elasticity of series without a log-log estimate
+DEFAULT_ELASTICITY = -1.2
+
+
+def price_response(demand, base_price, price, elasticity):
+    '''Demand at `price`, given `demand` at `base_price`, under constant elasticity.'''
+    return demand * (price / base_price) ** elasticity
+
 def estimate_elasticity_loglog(df: pd.DataFrame) -> pd.DataFrame:
     gcols = ["item_id","store_id"]
     rows = []
@@ -44,7 +52,7 @@ def optimize_markdown(
         elasticity_df = pd.DataFrame(columns=["item_id","store_id","elasticity"])
 
     base = base.merge(elasticity_df[["item_id","store_id","elasticity"]], on=["item_id","store_id"], how="left")
-    base["elasticity"] = base["elasticity"].fillna(-1.2)
+    base["elasticity"] = base["elasticity"].fillna(DEFAULT_ELASTICITY)
 
     recs = []
     for _, r in base.iterrows():
@@ -64,7 +72,7 @@ def optimize_markdown(
             P = P0 * (1.0 - md)
             if P <= cost:
                 continue
-            D = D0 * (P / P0) ** e
+            D = price_response(D0, P0, P, e)
             expected_units = min(D * horizon_days, inventory_on_hand)
             profit = (P - cost) * expected_units
 
@@ -0,0 +1,193 @@
+import os
+import json
+import time
+import uuid
+import cProfile
+import pstats
+import resource
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from .utils import ensure_dir
+
+HISTORY_LEN = 20
+
+
+def _reset_peak_rss() -> bool:
+    # Linux only: writing "5" to clear_refs resets VmHWM so each stage gets its own peak.
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb() -> float:
+    try:
+        with open("/proc/self/status", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return float(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    # ru_maxrss is bytes on macOS, KB on Linux and the BSDs; either way it is the process lifetime peak
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return float(peak) / (1024.0 * 1024.0 if sys.platform == "darwin" else 1024.0)
+
+
+class Stage:
+    def __init__(self, name: str, rows_in: Optional[int] = None):
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out: Optional[int] = None
+
+
+class StageProfiler:
+    '''
+    Records wall/CPU time, peak RSS and row throughput per named pipeline stage.
+    Stages entered more than once (e.g. "plots") are accumulated under one name.
+    '''
+
+    def __init__(self, cprofile_stages: Iterable[str] = (), profile_dir: Optional[str] = None):
+        self.cprofile_stages = set(cprofile_stages)
+        self.profile_dir = profile_dir
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self._t0 = time.perf_counter()
+        self._c0 = time.process_time()
+
+    @contextmanager
+    def stage(self, name: str, rows_in: Optional[int] = None):
+        st = Stage(name, rows_in)
+        exact_peak = _reset_peak_rss()
+        prof = cProfile.Profile() if name in self.cprofile_stages else None
+        w0, c0 = time.perf_counter(), time.process_time()
+        if prof is not None:
+            prof.enable()
+        try:
+            yield st
+        finally:
+            if prof is not None:
+                prof.disable()
+            wall = time.perf_counter() - w0
+            cpu = time.process_time() - c0
+            self._record(st, wall, cpu, _peak_rss_mb(), exact_peak, prof)
+
+    def _record(self, st: Stage, wall: float, cpu: float, peak_mb: float, exact_peak: bool, prof) -> None:
+        rec = self.stages.setdefault(st.name, {
+            "name": st.name, "calls": 0, "wall_s": 0.0, "cpu_s": 0.0,
+            "peak_rss_mb": 0.0, "peak_rss_exact": exact_peak, "rows_in": None, "rows_out": None,
+        })
+        rec["calls"] += 1
+        rec["wall_s"] += wall
+        rec["cpu_s"] += cpu
+        rec["peak_rss_mb"] = max(rec["peak_rss_mb"], peak_mb)
+        if st.rows_in is not None:
+            rec["rows_in"] = (rec["rows_in"] or 0) + int(st.rows_in)
+        if st.rows_out is not None:
+            rec["rows_out"] = (rec["rows_out"] or 0) + int(st.rows_out)
+        rows = rec["rows_in"] if rec["rows_in"] is not None else rec["rows_out"]
+        rec["rows_per_s"] = round(rows / rec["wall_s"], 1) if rows and rec["wall_s"] > 0 else None
+
+        if prof is not None and self.profile_dir:
+            ensure_dir(self.profile_dir)
+            path = os.path.join(self.profile_dir, f"{st.name}.prof")
+            prof.dump_stats(path)
+            rec["cprofile_path"] = path
+            rec["cprofile_top"] = _top_functions(prof, 15)
+
+    def summary(self) -> Dict[str, Any]:
+        stages = [dict(s, wall_s=round(s["wall_s"], 4), cpu_s=round(s["cpu_s"], 4),
+                       peak_rss_mb=round(s["peak_rss_mb"], 1)) for s in self.stages.values()]
+        return {
+            "total": {
+                "wall_s": round(time.perf_counter() - self._t0, 4),
+                "cpu_s": round(time.process_time() - self._c0, 4),
+                "peak_rss_mb": round(_peak_rss_mb(), 1),
+            },
+            "stages": stages,
+        }
+
+    def write(self, path: str, meta: Optional[Dict[str, Any]] = None, regression_pct: float = 0.20,
+              min_regression_s: float = 0.5) -> Dict[str, Any]:
+        '''
+        Writes the profile JSON, carrying a short history of earlier runs so that
+        stage-level regressions against the previous run are visible.
+        '''
+        prev = _read_json(path)
+        history: List[Dict[str, Any]] = list(prev.get("history", []))
+
+        payload: Dict[str, Any] = {
+            "run_id": uuid.uuid4().hex[:12],
+            "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            **(meta or {}),
+            **self.summary(),
+        }
+        prev_walls = history[-1]["stages"] if history else {}
+        payload["regressions"] = find_regressions(payload["stages"], prev_walls, regression_pct, min_regression_s)
+
+        history.append({
+            "run_id": payload["run_id"],
+            "generated_at": payload["generated_at"],
+            "total_wall_s": payload["total"]["wall_s"],
+            "stages": {s["name"]: s["wall_s"] for s in payload["stages"]},
+        })
+        payload["history"] = history[-HISTORY_LEN:]
+
+        ensure_dir(os.path.dirname(path) or ".")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=2)
+        return payload
+
+
+def find_regressions(stages: List[Dict[str, Any]], previous: Dict[str, float], pct: float = 0.20,
+                     min_s: float = 0.5) -> List[Dict[str, Any]]:
+    out = []
+    for s in stages:
+        before = previous.get(s["name"])
+        if before is None or before <= 0:
+            continue
+        delta = s["wall_s"] - before
+        if delta > min_s and delta / before > pct:
+            out.append({
+                "stage": s["name"],
+                "wall_s": s["wall_s"],
+                "previous_wall_s": before,
+                "change_pct": round(delta / before, 4),
+            })
+    return out
+
+
+@contextmanager
+def maybe_stage(profiler: Optional[StageProfiler], name: str, rows_in: Optional[int] = None):
+    if profiler is None:
+        yield Stage(name, rows_in)
+    else:
+        with profiler.stage(name, rows_in=rows_in) as st:
+            yield st
+
+
+def _top_functions(prof, n: int) -> List[Dict[str, Any]]:
+    stats = pstats.Stats(prof)
+    rows = []
+    for (fname, line, func), (_cc, ncalls, tottime, cumtime, _callers) in stats.stats.items():
+        rows.append({
+            "function": f"{os.path.basename(fname)}:{line}({func})",
+            "ncalls": int(ncalls),
+            "tottime_s": round(tottime, 4),
+            "cumtime_s": round(cumtime, 4),
+        })
+    rows.sort(key=lambda r: r["cumtime_s"], reverse=True)
+    return rows[:n]
+
+
+def _read_json(path: str) -> Dict[str, Any]:
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
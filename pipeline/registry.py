@@ -0,0 +1,221 @@
+import os
+import json
+import hashlib
+import shutil
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+# <out_dir>/models/vNNNN/{model.txt, meta.json}; models/CURRENT names the version that
+# forecasting and serving use unless they pin one. The backend reads the registry through this
+# module, so its top level imports nothing heavier than NumPy/pandas (lightgbm loads in load()).
+MODELS_DIR = "models"
+MODEL_FILE = "model.txt"
+META_FILE = "meta.json"
+# per-series routing between the booster and the intermittent estimators (pipeline/intermittent.py)
+TIERS_FILE = "tiers.parquet"
+
+
+class SchemaMismatch(ValueError):
+    pass
+
+
+def models_dir(out_dir: str) -> str:
+    return os.path.join(out_dir, MODELS_DIR)
+
+
+def data_key(zip_path: str, max_series: Optional[int], horizon: int) -> Dict[str, Any]:
+    '''
+    Identifies the training data: the source file (name, size, mtime) and the parameters that
+    select from it. `hash` compares two keys. Every command builds it from exactly these
+    arguments; how the features were built (e.g. the feature engine) goes in register()'s params.
+    '''
+    st = os.stat(zip_path)
+    key = {"source": os.path.basename(zip_path), "size": st.st_size, "mtime": int(st.st_mtime),
+           "max_series": max_series, "horizon": horizon}
+    key["hash"] = hashlib.sha1(json.dumps(key, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+    return key
+
+
+def versions(out_dir: str) -> List[str]:
+    d = models_dir(out_dir)
+    if not os.path.isdir(d):
+        return []
+    return sorted(v for v in os.listdir(d) if v.startswith("v") and v[1:].isdigit())
+
+
+def current_version(out_dir: str) -> Optional[str]:
+    try:
+        with open(os.path.join(models_dir(out_dir), "CURRENT"), "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def set_current(out_dir: str, version: str) -> None:
+    if version not in versions(out_dir):
+        raise KeyError(f"model version {version} is not registered")
+    d = models_dir(out_dir)
+    with open(os.path.join(d, "CURRENT.tmp"), "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(os.path.join(d, "CURRENT.tmp"), os.path.join(d, "CURRENT"))
+
+
+def register(
+    out_dir: str,
+    model,
+    feature_cols: Sequence[str],
+    data_key: Dict[str, Any],
+    metrics: Dict[str, Any],
+    params: Optional[Dict[str, Any]] = None,
+    promote: bool = True,
+    tiers: Optional[pd.DataFrame] = None,
+) -> str:
+    '''
+    Stores `model` (LGBMRegressor or Booster) in LightGBM's text format with its feature list,
+    the category list of every categorical feature, the training data key and metrics, plus, for a
+    tiered model, its series routing (`tiers`).
+    Returns the new version; promote=True also makes it CURRENT.
+    '''
+    from .forecast import CATEGORICAL_COLS
+
+    booster = getattr(model, "booster_", model)
+    if list(booster.feature_name()) != list(feature_cols):
+        raise SchemaMismatch(f"model features {booster.feature_name()} != {list(feature_cols)}")
+    # pandas_categorical: the training categories of the category-dtype columns, in column order
+    cat_cols = [c for c in feature_cols if c in CATEGORICAL_COLS]
+    categorical = {c: list(cats) for c, cats in zip(cat_cols, booster.pandas_categorical or [])}
+
+    d = models_dir(out_dir)
+    os.makedirs(d, exist_ok=True)
+    tmp = os.path.join(d, f".tmp-{os.getpid()}")
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    booster.save_model(os.path.join(tmp, MODEL_FILE))
+    if tiers is not None:
+        tiers[["id", "demand_class", "method"]].to_parquet(os.path.join(tmp, TIERS_FILE), index=False)
+    meta = {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "feature_cols": list(feature_cols),
+        "categorical": categorical,
+        "num_trees": booster.num_trees(),
+        "data_key": data_key,
+        "metrics": metrics,
+        "params": params or {},
+    }
+    if tiers is not None:
+        meta["tiers"] = {k: int(v) for k, v in tiers["method"].value_counts().sort_index().items()}
+    # claim the next free vNNNN: renaming onto an existing version fails, so concurrent registers don't collide
+    n = int(versions(out_dir)[-1][1:]) + 1 if versions(out_dir) else 1
+    while True:
+        version = f"v{n:04d}"
+        meta["version"] = version
+        with open(os.path.join(tmp, META_FILE), "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2, default=str)
+        try:
+            os.rename(tmp, os.path.join(d, version))
+            break
+        except OSError:
+            n += 1
+    if promote:
+        set_current(out_dir, version)
+    return version
+
+
+class RegisteredModel:
+    def __init__(self, version: str, booster, meta: Dict[str, Any], path: Optional[str] = None):
+        self.version = version
+        self.booster = booster
+        self.meta = meta
+        self.path = path
+        self.feature_cols: List[str] = meta["feature_cols"]
+        self.categorical: Dict[str, List[Any]] = meta.get("categorical", {})
+        self._cat_index = {c: pd.Index(cats) for c, cats in self.categorical.items()}
+        self._tiers: Optional[pd.DataFrame] = None
+
+    def check_schema(self, feature_cols: Sequence[str]) -> None:
+        check_schema(self.version, self.feature_cols, feature_cols)
+
+    def frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        '''Feature matrix with categoricals cast to the training categories (unseen values -> NaN).'''
+        missing = [c for c in self.feature_cols if c not in df.columns]
+        if missing:
+            raise SchemaMismatch(f"model {self.version} needs columns {missing}")
+        X = df[self.feature_cols].copy()
+        for c, cats in self.categorical.items():
+            X[c] = pd.Categorical(X[c].astype(object), categories=cats)
+        return X
+
+    def encode(self, df: pd.DataFrame) -> np.ndarray:
+        '''
+        float32 matrix in feature order with categoricals as training category codes (unseen -> NaN):
+        what LightGBM builds from a categorical DataFrame, without pandas' per-call validation.
+        '''
+        missing = [c for c in self.feature_cols if c not in df.columns]
+        if missing:
+            raise SchemaMismatch(f"model {self.version} needs columns {missing}")
+        X = np.empty((len(df), len(self.feature_cols)), dtype=np.float32)
+        for j, c in enumerate(self.feature_cols):
+            if c in self._cat_index:
+                codes = self._cat_index[c].get_indexer(np.asarray(df[c], dtype=object))
+                X[:, j] = np.where(codes >= 0, codes, np.nan)
+            else:
+                X[:, j] = df[c].to_numpy(dtype=np.float32, na_value=np.nan)
+        return X
+
+    @property
+    def tiers(self) -> Optional[pd.DataFrame]:
+        '''id, demand_class, method of every training series, or None for a model that scores all series.'''
+        if self._tiers is None and "tiers" in self.meta and self.path:
+            self._tiers = pd.read_parquet(os.path.join(self.path, TIERS_FILE))
+        return self._tiers
+
+    def predict(self, X: pd.DataFrame) -> np.ndarray:
+        return self.booster.predict(self.encode(X))
+
+
+def check_schema(version: str, trained: Sequence[str], feature_cols: Sequence[str]) -> None:
+    '''Refuses a caller whose feature list (names or order) differs from the training one.'''
+    if list(feature_cols) != list(trained):
+        missing = [c for c in trained if c not in feature_cols]
+        extra = [c for c in feature_cols if c not in trained]
+        raise SchemaMismatch(
+            f"model {version} was trained on a different feature schema "
+            f"(missing: {missing}, unexpected: {extra}, order differs: {not missing and not extra})"
+        )
+
+
+def version_path(out_dir: str, version: str, *parts: str) -> str:
+    return os.path.join(models_dir(out_dir), version, *parts)
+
+
+def read_meta(out_dir: str, version: str) -> Optional[Dict[str, Any]]:
+    '''meta.json of `version`, or None when it is not registered.'''
+    try:
+        with open(version_path(out_dir, version, META_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def load(out_dir: str, version: Optional[str] = None, feature_cols: Optional[Sequence[str]] = None) -> RegisteredModel:
+    '''
+    Loads `version` (default: CURRENT) from the registry. With `feature_cols`, raises SchemaMismatch
+    unless the model was trained on exactly that feature list.
+    '''
+    import lightgbm as lgb
+
+    version = version or current_version(out_dir)
+    if version is None:
+        raise FileNotFoundError(f"no model registered under {models_dir(out_dir)}")
+    meta = read_meta(out_dir, version)
+    if meta is None:
+        raise KeyError(f"model version {version} is not registered")
+    d = version_path(out_dir, version)
+    m = RegisteredModel(version, lgb.Booster(model_file=os.path.join(d, MODEL_FILE)), meta, path=d)
+    if feature_cols is not None:
+        m.check_schema(feature_cols)
+    return m
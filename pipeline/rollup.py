@@ -0,0 +1,99 @@
+import duckdb
+import pandas as pd
+from typing import Dict, Sequence
+
+from .artifacts import publish_table
+
+# M5 hierarchy, coarse to fine; a level keeps its ancestors' columns (a store row has its state_id)
+GEO_DIMS = ["state_id", "store_id"]
+PRODUCT_DIMS = ["cat_id", "dept_id", "item_id"]
+GEO_LEVELS = ["total", "state", "store"]
+PRODUCT_LEVELS = ["total", "cat", "dept", "item"]
+DIMS = GEO_DIMS + PRODUCT_DIMS
+
+# hierarchy columns missing from a frame are derived from the M5 ids (FOODS_3_090, CA_1)
+DERIVED = {
+    "state_id": "split_part(store_id, '_', 1)",
+    "cat_id": "split_part(item_id, '_', 1)",
+    "dept_id": "regexp_extract(item_id, '^(.*)_[^_]+$', 1)",
+}
+
+SERIES = "COUNT(DISTINCT item_id || '@' || store_id)"
+
+FORECAST_MEASURES = {
+    "series": SERIES,
+    "days": "COUNT(DISTINCT date)",
+    "pred_units": "SUM(pred_units)",
+    "revenue_proxy": "SUM(pred_units * sell_price_filled)",
+}
+
+PRICING_MEASURES = {
+    "series": SERIES,
+    "profit": "SUM(profit)",
+    "base_demand_per_day": "SUM(base_demand_per_day)",
+    "opt_demand_per_day": "SUM(opt_demand_per_day)",
+    "avg_markdown": "AVG(markdown)",
+}
+
+
+def inventory_measures(lead_time_days: int) -> Dict[str, str]:
+    return {
+        "series": SERIES,
+        "days": "COUNT(DISTINCT date)",
+        "pred_units": "SUM(pred_units)",
+        "units": "SUM(units)",
+        "safety_stock": "SUM(safety_stock)",
+        "reorder_point": "SUM(reorder_point)",
+        # demand above the policy's daily cover (forecast + safety stock spread over the lead time)
+        "stockout_exposure": f"SUM(GREATEST(units - reorder_point / {int(lead_time_days)}, 0))",
+    }
+
+
+def _level(dims: Sequence[str], names: Sequence[str]) -> str:
+    # the finest dim that is not rolled up names the level
+    case = " ".join(f"WHEN GROUPING({d}) = 0 THEN '{n}'" for d, n in reversed(list(zip(dims, names[1:]))))
+    return f"CASE {case} ELSE '{names[0]}' END"
+
+
+def rollup_sql(columns: Sequence[str], measures: Dict[str, str], periods: Sequence[str] = ("day", "week")) -> str:
+    '''
+    One GROUPING SETS query over `_src`: every geo level x product level x period.
+    periods: "day", "week" (ISO weeks, Monday start) and/or "horizon" (no date: the whole table).
+    '''
+    derived = [f"{DERIVED[d]} AS {d}" for d in DIMS if d not in columns]
+    base = "SELECT *" + "".join(", " + d for d in derived) + " FROM _src"
+    by_period = {
+        "day": "SELECT 'day' AS period, CAST(date AS DATE) AS period_start, * FROM base",
+        "week": "SELECT 'week' AS period, CAST(date_trunc('week', date) AS DATE) AS period_start, * FROM base",
+        "horizon": "SELECT 'horizon' AS period, CAST(NULL AS DATE) AS period_start, * FROM base",
+    }
+    sets = ", ".join(
+        "(" + ", ".join(["period", "period_start"] + GEO_DIMS[:g] + PRODUCT_DIMS[:p]) + ")"
+        for g in range(len(GEO_LEVELS)) for p in range(len(PRODUCT_LEVELS))
+    )
+    aggs = ", ".join(f"{expr} AS {name}" for name, expr in measures.items())
+    return f"""
+WITH base AS ({base}),
+p AS ({" UNION ALL ".join(by_period[x] for x in periods)})
+SELECT period, {_level(GEO_DIMS, GEO_LEVELS)} AS geo_level, {_level(PRODUCT_DIMS, PRODUCT_LEVELS)} AS product_level,
+       {", ".join(DIMS)}, period_start, {aggs}
+FROM p
+GROUP BY GROUPING SETS ({sets})
+ORDER BY period, geo_level, product_level, {", ".join(DIMS)}, period_start
+"""
+
+
+def publish_rollup(out_dir: str, source: str, df: pd.DataFrame, measures: Dict[str, str],
+                   periods: Sequence[str] = ("day", "week")) -> int:
+    '''
+    Materializes the rollup cube of `df` (rows at item x store grain, with a `date` column unless
+    periods == ("horizon",)) and publishes it as the Arrow artifact rollup_<source>; returns its
+    row count. Rows are sorted so each (period, geo_level, product_level) block is contiguous and
+    every slice of it is a date-ordered series.
+    '''
+    con = duckdb.connect()
+    con.register("_src", df)
+    cube = con.execute(rollup_sql(list(df.columns), measures, periods)).fetch_arrow_table()
+    con.close()
+    publish_table(out_dir, f"rollup_{source}", cube)
+    return cube.num_rows
@@ -0,0 +1,128 @@
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .sharding import id_digests
+
+# Budget mode for train_forecast_model: fit on a row sample instead of the whole training frame.
+# Each row is kept with probability pi = min(1, c * b), where b is 1 for a sale and zero_weight
+# for a zero-sales day, times a time decay halving every half_life_days of age (floored at
+# min_decay), and c is solved so the expected sample size is the target. Kept rows carry weight
+# 1/pi (Horvitz-Thompson), so the weighted training loss is an unbiased estimate of the full one.
+# The keep/drop draw is a hash of (md5(id), day) and the seed: the same rows are picked whatever
+# the row order, engine or shard.
+PROBE_ROWS = 100_000
+PROBE_TREES = 100
+# the wall-clock target leaves this share of the budget for what the row-rate estimate misses
+SAFETY = 0.85
+
+
+@dataclass(frozen=True)
+class TrainingBudget:
+    max_rows: Optional[int] = None
+    max_seconds: Optional[float] = None
+    zero_weight: float = 0.5
+    half_life_days: float = 730.0
+    min_decay: float = 0.05
+    seed: int = 0
+
+    @property
+    def active(self) -> bool:
+        return self.max_rows is not None or self.max_seconds is not None
+
+
+def _splitmix64(x: np.ndarray) -> np.ndarray:
+    x = x + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def row_uniforms(ids: pd.Series, dates: pd.Series, seed: int = 0) -> np.ndarray:
+    '''A uniform [0, 1) draw per row, fixed by (id, date, seed).'''
+    codes, uniques = pd.factorize(ids, sort=False)
+    id_hash = np.array([int(d[:16], 16) for d in id_digests(uniques)], dtype=np.uint64)
+    day = dates.to_numpy("datetime64[D]").astype(np.int64).astype(np.uint64)
+    with np.errstate(over="ignore"):
+        x = _splitmix64(id_hash[codes] ^ _splitmix64(day + np.uint64(seed)))
+    return (x >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+
+
+def _solve_scale(b: np.ndarray, counts: np.ndarray, target: float) -> float:
+    '''c with sum(counts * min(1, c * b)) == target (bisection over the distinct b values).'''
+    lo, hi = 0.0, 1.0 / b[b > 0].min()
+    for _ in range(100):
+        c = (lo + hi) / 2
+        if (counts * np.minimum(1.0, c * b)).sum() < target:
+            lo = c
+        else:
+            hi = c
+    return hi
+
+
+def target_rows(n_rows: int, budget: TrainingBudget, rows_per_s: Optional[float] = None,
+                spent_s: float = 0.0) -> Optional[int]:
+    '''Row count the budget allows: max_rows, and what fits in max_seconds (minus spent_s) at rows_per_s.'''
+    limits = []
+    if budget.max_rows is not None:
+        limits.append(budget.max_rows)
+    if budget.max_seconds is not None and rows_per_s:
+        limits.append(int(max(budget.max_seconds - spent_s, 0.0) * SAFETY * rows_per_s))
+    return max(min(limits), 1) if limits else None
+
+
+def plan_sample(df: pd.DataFrame, target: int, budget: TrainingBudget) -> Tuple[np.ndarray, np.ndarray, Dict[str, Any]]:
+    '''
+    (keep mask, weights of the kept rows, plan) for sampling about `target` rows of a training
+    frame with id, date and units.
+    '''
+    units = df["units"].to_numpy()
+    day = df["date"].to_numpy("datetime64[D]").astype(np.int64)
+    first, last = int(day.min()), int(day.max())
+    age = last - np.arange(first, last + 1)
+    decay = np.maximum(0.5 ** (age / budget.half_life_days), budget.min_decay)
+    # inclusion base per (day, sold?) cell: a few thousand cells, whatever the row count
+    cell = (day - first) * 2 + (units > 0)
+    counts = np.bincount(cell, minlength=2 * len(decay)).astype(np.float64)
+    b = np.repeat(decay, 2) * np.tile([budget.zero_weight, 1.0], len(decay))
+    c = _solve_scale(b, counts, target)
+    pi = np.minimum(1.0, c * b)[cell]
+
+    keep = row_uniforms(df["id"], df["date"], budget.seed) < pi
+    weights = (1.0 / pi[keep]).astype(np.float32)
+    sold = units > 0
+    plan = {
+        **{k: v for k, v in asdict(budget).items() if v is not None},
+        "rows": int(len(df)),
+        "target_rows": int(target),
+        "sampled_rows": int(keep.sum()),
+        "sale_rows_kept": float(keep[sold].mean()) if sold.any() else None,
+        "zero_rows_kept": float(keep[~sold].mean()) if (~sold).any() else None,
+        "max_weight": float(weights.max()) if len(weights) else None,
+    }
+    return keep, weights, plan
+
+
+def describe(plan: Dict[str, Any]) -> str:
+    if plan["sampled_rows"] == plan["rows"]:
+        return f"all {plan['rows']:,} rows fit the budget"
+    return (f"{plan['sampled_rows']:,} of {plan['rows']:,} rows (target {plan['target_rows']:,}; "
+            f"kept {plan['sale_rows_kept']:.1%} of sale days, {plan['zero_rows_kept']:.1%} of zero days; "
+            f"max weight {plan['max_weight']:.1f}; seed {plan['seed']})")
+
+
+def probe_rows_per_s(make_model, prep_xy, df: pd.DataFrame, n_estimators: int, seed: int = 0) -> float:
+    '''
+    Training throughput (rows/s at n_estimators trees) measured by fitting PROBE_TREES trees on
+    PROBE_ROWS rows of df; per-tree overhead is counted as per-row cost, so it errs low.
+    '''
+    rng = np.random.default_rng(seed)
+    X, y = prep_xy(df.iloc[np.sort(rng.choice(len(df), size=min(PROBE_ROWS, len(df)), replace=False))])
+    model = make_model(n_estimators=PROBE_TREES)
+    t0 = time.perf_counter()
+    model.fit(X, y)
+    elapsed = time.perf_counter() - t0
+    return len(X) / (elapsed * n_estimators / PROBE_TREES)
@@ -0,0 +1,84 @@
+import os
+import json
+import hashlib
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .utils import ensure_dir
+
+# Series are sampled and sharded by the md5 of their id, so every script, engine and machine
+# picks the same series: the `max_series` sample is the first ids in md5 order (DuckDB's
+# `ORDER BY md5(id)`; smaller samples nest in larger ones) and shard k of n holds the sampled
+# ids whose md5 is k mod n. Shard k of a run-all writes <out_dir>/shards/<n>/<k>/, and
+# `python -m pipeline merge` combines the n slices into the global reports.
+SHARDS_DIR = "shards"
+SHARD_META = "shard.json"
+
+
+def id_digests(ids: Sequence[str]) -> np.ndarray:
+    return np.array([hashlib.md5(str(i).encode("utf-8")).hexdigest() for i in ids], dtype=object)
+
+
+def select_series(ids: Sequence[str], max_series: Optional[int] = None,
+                  shard: Optional[int] = None, num_shards: int = 1) -> np.ndarray:
+    '''Boolean mask over `ids`: the max_series sample (all ids when None), then shard `shard` of num_shards.'''
+    digests = id_digests(ids)
+    keep = np.ones(len(digests), dtype=bool)
+    if max_series is not None and max_series < len(digests):
+        keep[:] = False
+        keep[np.argsort(digests, kind="stable")[:max_series]] = True
+    if shard is not None:
+        keep &= shard_of(digests, num_shards) == shard
+    return keep
+
+
+def shard_of(digests: np.ndarray, num_shards: int) -> np.ndarray:
+    return np.array([int(d[:16], 16) % num_shards for d in digests], dtype=np.int64)
+
+
+def check_shard(shard: Optional[int], num_shards: int) -> None:
+    if num_shards < 1:
+        raise ValueError("num_shards must be >= 1")
+    if shard is None and num_shards > 1:
+        raise ValueError("--num_shards needs --shard (which slice this process runs)")
+    if shard is not None and not 0 <= shard < num_shards:
+        raise ValueError(f"--shard must be in [0, {num_shards})")
+
+
+def shard_dir(out_dir: str, shard: int, num_shards: int) -> str:
+    return os.path.join(out_dir, SHARDS_DIR, str(num_shards), f"{shard:04d}")
+
+
+def write_shard(path: str, meta: Dict[str, Any], frames: Dict[str, pd.DataFrame],
+                arrays: Optional[Dict[str, np.ndarray]] = None) -> None:
+    '''Writes a shard's frames (Parquet) and arrays (.npy); shard.json goes last and marks it complete.'''
+    ensure_dir(path)
+    meta_path = os.path.join(path, SHARD_META)
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+    for name, df in frames.items():
+        df.to_parquet(os.path.join(path, f"{name}.parquet"), index=False)
+    for name, arr in (arrays or {}).items():
+        np.save(os.path.join(path, f"{name}.npy"), arr)
+    meta = {**meta, "frames": sorted(frames), "arrays": sorted(arrays or {})}
+    with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2, default=str)
+    os.replace(meta_path + ".tmp", meta_path)
+
+
+def read_shards(out_dir: str, num_shards: int) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    '''[(meta, {name: DataFrame or array})] of all num_shards shards; raises if any is missing.'''
+    paths = [shard_dir(out_dir, k, num_shards) for k in range(num_shards)]
+    missing = [k for k, p in enumerate(paths) if not os.path.exists(os.path.join(p, SHARD_META))]
+    if missing:
+        raise FileNotFoundError(f"shards {missing} of {num_shards} have not finished under {os.path.join(out_dir, SHARDS_DIR, str(num_shards))}")
+    out = []
+    for p in paths:
+        with open(os.path.join(p, SHARD_META), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        data: Dict[str, Any] = {name: pd.read_parquet(os.path.join(p, f"{name}.parquet")) for name in meta["frames"]}
+        data.update({name: np.load(os.path.join(p, f"{name}.npy")) for name in meta["arrays"]})
+        out.append((meta, data))
+    return out
@@ -0,0 +1,204 @@
+import os
+import numpy as np
+import pandas as pd
+import duckdb
+from typing import Dict, List, Optional, Sequence
+
+from .sharding import select_series
+
+# output column order/dtypes of features.add_time_series_features(join_calendar_prices(...))
+_INT_DTYPES = {
+    "wm_yr_wk": np.int64, "wday": np.int64, "month": np.int8, "year": np.int16, "snap": np.int8,
+    "weekday": np.int8, "price_isna": np.int8, "has_event_1": np.int8, "has_event_2": np.int8, "is_event": np.int8,
+}
+
+
+def m5_sources(path: str, cache_dir: Optional[str] = None) -> Dict[str, str]:
+    '''
+    Resolves the M5 tables to scannable files: a Kaggle zip (converted to a Parquet cache),
+    or a directory holding either <name>.parquet or the raw <name>.csv files.
+    '''
+    if path.endswith(".zip"):
+        from .m5_io import cache_m5_parquet
+        stem = os.path.splitext(os.path.basename(path))[0]
+        return cache_m5_parquet(path, cache_dir or os.path.join(os.path.dirname(path) or ".", f"{stem}_parquet"))
+    out = {}
+    for name in ("calendar", "sell_prices", "sales_train_validation", "sales_train_evaluation"):
+        for ext in (".parquet", ".csv"):
+            p = os.path.join(path, name + ext)
+            if os.path.exists(p):
+                out[name] = p
+                break
+    return out
+
+
+def _scan(path: str) -> str:
+    p = path.replace("'", "''")
+    return f"read_parquet('{p}')" if path.endswith(".parquet") else f"read_csv_auto('{p}')"
+
+
+def features_sql(
+    sources: Dict[str, str],
+    sales_table: str = "sales_train_validation",
+    lags: Sequence[int] = (7, 28),
+    windows: Sequence[int] = (7, 28),
+    max_series: Optional[int] = None,
+    series_table: Optional[str] = None,
+) -> str:
+    '''
+    One DuckDB query doing melt -> calendar/price joins -> SNAP -> price fill -> lags/rolling stats.
+    Mirrors to_long_sales + join_calendar_prices + add_time_series_features.
+    series_table, if given, names a registered relation with an `id` column restricting the series.
+    '''
+    sales = f"SELECT * FROM {_scan(sources[sales_table])}"
+    if series_table is not None:
+        sales += f" WHERE id IN (SELECT id FROM {series_table})"
+    elif max_series is not None:
+        # rank by a content hash of the id: the same ids on every run, and smaller samples nest in larger ones
+        sales += f" ORDER BY md5(id) LIMIT {int(max_series)}"
+
+    w_order = "PARTITION BY id ORDER BY date"
+    feats = []
+    for lag in lags:
+        feats.append(f"CAST(LAG(units, {lag}) OVER (w) AS FLOAT) AS lag_{lag}")
+    for w in windows:
+        # pandas: groupby(id).shift(1).rolling(w, min_periods=max(2, w//3))
+        frame = f"({w_order} ROWS BETWEEN {w} PRECEDING AND 1 PRECEDING)"
+        enough = f"COUNT(units) OVER {frame} >= {max(2, w // 3)}"
+        feats.append(f"CAST(CASE WHEN {enough} THEN AVG(units) OVER {frame} END AS FLOAT) AS roll_mean_{w}")
+        feats.append(f"CAST(COALESCE(CASE WHEN {enough} THEN STDDEV_SAMP(units) OVER {frame} END, 0) AS FLOAT) AS roll_std_{w}")
+
+    return f"""
+WITH sales AS ({sales}),
+long AS (
+  UNPIVOT sales ON COLUMNS('^d_[0-9]+$') INTO NAME d VALUE units
+),
+cal AS (
+  SELECT d, CAST(date AS DATE) AS date, wm_yr_wk, wday, month, year,
+         CAST(event_name_1 AS VARCHAR) AS event_name_1, CAST(event_type_1 AS VARCHAR) AS event_type_1,
+         CAST(event_name_2 AS VARCHAR) AS event_name_2, CAST(event_type_2 AS VARCHAR) AS event_type_2,
+         snap_CA, snap_TX, snap_WI
+  FROM {_scan(sources["calendar"])}
+),
+joined AS (
+  SELECT l.id, l.item_id, l.dept_id, l.cat_id, l.store_id, l.state_id, l.d,
+         CAST(l.units AS FLOAT) AS units,
+         c.date, c.wm_yr_wk, c.wday, c.month, c.year,
+         c.event_name_1, c.event_type_1, c.event_name_2, c.event_type_2,
+         CASE l.state_id WHEN 'CA' THEN c.snap_CA WHEN 'TX' THEN c.snap_TX ELSE c.snap_WI END AS snap,
+         CAST(p.sell_price AS FLOAT) AS sell_price
+  FROM long l
+  LEFT JOIN cal c ON c.d = l.d
+  LEFT JOIN {_scan(sources["sell_prices"])} p
+         ON p.store_id = l.store_id AND p.item_id = l.item_id AND p.wm_yr_wk = c.wm_yr_wk
+),
+filled AS (
+  SELECT *,
+         CAST(COALESCE(
+           LAST_VALUE(sell_price IGNORE NULLS) OVER ({w_order} ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW),
+           FIRST_VALUE(sell_price IGNORE NULLS) OVER ({w_order} ROWS BETWEEN CURRENT ROW AND UNBOUNDED FOLLOWING)
+         ) AS FLOAT) AS sell_price_filled
+  FROM joined
+)
+SELECT id, item_id, dept_id, cat_id, store_id, state_id, d, units,
+       date, wm_yr_wk, wday, month, year, event_name_1, event_type_1, event_name_2, event_type_2,
+       snap, sell_price,
+       wday AS weekday,
+       CAST(sell_price IS NULL AS TINYINT) AS price_isna,
+       sell_price_filled,
+       CAST(CASE WHEN LAG(sell_price_filled) OVER (w) IS NULL OR LAG(sell_price_filled) OVER (w) = 0 THEN 0
+                 ELSE sell_price_filled / LAG(sell_price_filled) OVER (w) - 1 END AS FLOAT) AS price_change_pct,
+       CAST(event_name_1 IS NOT NULL AS TINYINT) AS has_event_1,
+       CAST(event_name_2 IS NOT NULL AS TINYINT) AS has_event_2,
+       CAST(event_name_1 IS NOT NULL OR event_name_2 IS NOT NULL AS TINYINT) AS is_event
+       {"".join(", " + f for f in feats)}
+FROM filled
+WINDOW w AS ({w_order})
+ORDER BY id, date
+"""
+
+
+def build_features_duckdb(
+    sources: Dict[str, str],
+    lags: List[int] = [7, 28],
+    windows: List[int] = [7, 28],
+    max_series: Optional[int] = None,
+    series_ids: Optional[Sequence[str]] = None,
+    shard: Optional[int] = None,
+    num_shards: int = 1,
+    con: Optional[duckdb.DuckDBPyConnection] = None,
+    table: Optional[str] = None,
+    threads: Optional[int] = None,
+    memory_limit: Optional[str] = None,
+) -> Optional[pd.DataFrame]:
+    '''
+    DuckDB engine for the feature table. Returns a pandas frame shaped like add_time_series_features,
+    or, when `table` is given, materializes it inside `con` and returns None (nothing goes through pandas).
+    shard/num_shards restrict it to one slice of the max_series sample (sharding.select_series).
+    '''
+    if table is not None and con is None:
+        raise ValueError("materializing a feature table needs an explicit DuckDB connection")
+    own = con is None
+    con = con or duckdb.connect()
+    if threads:
+        con.execute(f"SET threads = {int(threads)}")
+    if memory_limit:
+        con.execute(f"SET memory_limit = '{memory_limit}'")
+
+    if shard is not None and series_ids is None:
+        ids = con.execute(f"SELECT id FROM {_scan(sources['sales_train_validation'])}").df()["id"]
+        series_ids = ids[select_series(ids, max_series, shard, num_shards)]
+
+    series_table = None
+    if series_ids is not None:
+        con.register("_feature_series", pd.DataFrame({"id": list(series_ids)}))
+        series_table = "_feature_series"
+
+    sql = features_sql(sources, lags=lags, windows=windows, max_series=max_series, series_table=series_table)
+    try:
+        if table is not None:
+            con.execute(f"CREATE OR REPLACE TABLE {table} AS {sql}")
+            return None
+        df = con.execute(sql).df()
+    finally:
+        if series_table is not None:
+            con.unregister(series_table)
+        if own:
+            con.close()
+
+    for c, dt in _INT_DTYPES.items():
+        if c in df.columns:
+            df[c] = df[c].astype(dt)
+    df["date"] = pd.to_datetime(df["date"])
+    return df
+
+
+def compare_feature_frames(a: pd.DataFrame, b: pd.DataFrame, atol: float = 1e-4, rtol: float = 1e-4) -> Dict[str, float]:
+    '''
+    Row-aligned comparison of two feature frames (sorted by id, date).
+    Returns {column: max_abs_diff} for numeric columns that disagree; string columns must match exactly.
+    '''
+    a = a.sort_values(["id", "date"]).reset_index(drop=True)
+    b = b.sort_values(["id", "date"]).reset_index(drop=True)
+    if len(a) != len(b):
+        return {"__rows__": float(abs(len(a) - len(b)))}
+
+    bad = {}
+    for c in a.columns:
+        if c not in b.columns:
+            bad[c] = float("inf")
+            continue
+        x, y = a[c], b[c]
+        if pd.api.types.is_numeric_dtype(x) and not pd.api.types.is_bool_dtype(x):
+            xv, yv = x.to_numpy(np.float64), y.to_numpy(np.float64)
+            same_nan = np.isnan(xv) == np.isnan(yv)
+            close = np.isclose(xv, yv, atol=atol, rtol=rtol, equal_nan=True)
+            if not (same_nan.all() and close.all()):
+                bad[c] = float(np.nanmax(np.abs(xv - yv))) if (~close).any() else float("nan")
+        elif pd.api.types.is_datetime64_any_dtype(x):
+            if not (x.values == pd.to_datetime(y).values).all():
+                bad[c] = float("inf")
+        else:
+            if not (x.fillna("<NA>").astype(str) == y.fillna("<NA>").astype(str)).all():
+                bad[c] = float("inf")
+    return bad
@@ -0,0 +1,159 @@
+import io
+import zipfile
+import numpy as np
+import pandas as pd
+from typing import Dict
+
+STORES = ["CA_1", "CA_2", "CA_3", "CA_4", "TX_1", "TX_2", "TX_3", "WI_1", "WI_2", "WI_3"]
+DEPTS = {
+    "FOODS": ["FOODS_1", "FOODS_2", "FOODS_3"],
+    "HOBBIES": ["HOBBIES_1", "HOBBIES_2"],
+    "HOUSEHOLD": ["HOUSEHOLD_1", "HOUSEHOLD_2"],
+}
+FIXED_EVENTS = {
+    (1, 1): ("NewYear", "National"),
+    (2, 14): ("ValentinesDay", "Cultural"),
+    (7, 4): ("IndependenceDay", "National"),
+    (10, 31): ("Halloween", "Cultural"),
+    (11, 11): ("VeteransDay", "National"),
+    (12, 25): ("Christmas", "National"),
+}
+SNAP_DAYS = {
+    "CA": set(range(1, 11)),
+    "TX": {1, 3, 5, 6, 7, 9, 11, 12, 13, 15},
+    "WI": {2, 3, 5, 6, 8, 9, 11, 12, 14, 15},
+}
+START_DATE = "2011-01-29"
+
+
+def make_calendar(n_days: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(START_DATE, periods=n_days, freq="D")
+    week_idx = np.arange(n_days) // 7
+    cal = pd.DataFrame({
+        "date": dates.strftime("%Y-%m-%d"),
+        # Walmart weeks start on Saturday, like the real calendar.csv (11101, 11102, ...)
+        "wm_yr_wk": 11100 + (week_idx // 52) * 100 + (week_idx % 52) + 1,
+        "weekday": dates.day_name(),
+        "wday": ((dates.dayofweek + 2) % 7) + 1,
+        "month": dates.month,
+        "year": dates.year,
+        "d": [f"d_{i}" for i in range(1, n_days + 1)],
+    })
+
+    name1 = np.full(n_days, None, dtype=object)
+    type1 = np.full(n_days, None, dtype=object)
+    for i, dt in enumerate(dates):
+        ev = FIXED_EVENTS.get((dt.month, dt.day))
+        if ev:
+            name1[i], type1[i] = ev
+    # a sprinkling of sporting events, some colliding with a fixed event -> event_name_2
+    name2 = np.full(n_days, None, dtype=object)
+    type2 = np.full(n_days, None, dtype=object)
+    for i in rng.choice(n_days, size=max(1, n_days // 120), replace=False):
+        if name1[i] is None:
+            name1[i], type1[i] = "SportsFinal", "Sporting"
+        else:
+            name2[i], type2[i] = "SportsFinal", "Sporting"
+    cal["event_name_1"], cal["event_type_1"] = name1, type1
+    cal["event_name_2"], cal["event_type_2"] = name2, type2
+
+    for state, days in SNAP_DAYS.items():
+        cal[f"snap_{state}"] = np.isin(dates.day, list(days)).astype(np.int8)
+    return cal
+
+
+def _series_frame(n_series: int) -> pd.DataFrame:
+    depts = [(cat, dept) for cat, ds in DEPTS.items() for dept in ds]
+    n_items = int(np.ceil(n_series / len(STORES)))
+    items = []
+    for k in range(n_items):
+        cat, dept = depts[k % len(depts)]
+        items.append((f"{dept}_{k // len(depts) + 1:03d}", dept, cat))
+    rows = [
+        (f"{item}_{store}_validation", item, dept, cat, store, store.split("_")[0])
+        for item, dept, cat in items for store in STORES
+    ][:n_series]
+    return pd.DataFrame(rows, columns=["id", "item_id", "dept_id", "cat_id", "store_id", "state_id"])
+
+
+def make_m5_like(n_series: int = 1000, n_days: int = 1913, horizon: int = 28, seed: int = 0) -> Dict[str, pd.DataFrame]:
+    '''
+    Generates M5-shaped frames (same keys as read_m5_from_zip) with intermittent
+    demand, item release dates, weekly price changes/markdowns, SNAP and event lift.
+    n_days is the length of sales_train_validation; the evaluation set and calendar
+    extend it by one and two horizons like the Kaggle files.
+    '''
+    rng = np.random.default_rng(seed)
+    n_eval = n_days + horizon
+    cal = make_calendar(n_eval + horizon, seed=seed)
+    ids = _series_frame(n_series)
+    n = len(ids)
+
+    # --- prices: one base price per item, store-level jitter, occasional markdown weeks
+    weeks = cal["wm_yr_wk"].drop_duplicates().to_numpy()
+    item_codes, items = pd.factorize(ids["item_id"])
+    item_base = np.round(rng.lognormal(mean=1.2, sigma=0.7, size=len(items)), 2) + 0.5
+    base_price = item_base[item_codes] * rng.uniform(0.95, 1.05, size=n)
+    markdown = np.where(rng.random((n, len(weeks))) < 0.06, rng.choice([0.8, 0.9], size=(n, len(weeks))), 1.0)
+    drift = np.cumprod(np.where(rng.random((n, len(weeks))) < 0.01, 1.05, 1.0), axis=1)
+    price_wk = np.round(base_price[:, None] * markdown * drift, 2).astype(np.float32)
+
+    # items are released at different weeks; before release there is no sell price and no sales
+    release_wk = np.where(rng.random(n) < 0.25, rng.integers(0, max(1, len(weeks) // 2), size=n), 0)
+    sold = np.arange(len(weeks))[None, :] >= release_wk[:, None]
+
+    sp = pd.DataFrame({
+        "store_id": np.repeat(ids["store_id"].to_numpy(), len(weeks)),
+        "item_id": np.repeat(ids["item_id"].to_numpy(), len(weeks)),
+        "wm_yr_wk": np.tile(weeks, n),
+        "sell_price": price_wk.ravel(),
+    })[sold.ravel()].reset_index(drop=True)
+
+    # --- demand: intermittent Poisson with weekday, SNAP, event and price effects
+    day_wk = np.searchsorted(weeks, cal["wm_yr_wk"].to_numpy()[:n_eval])
+    rate = rng.lognormal(mean=-0.3, sigma=1.1, size=n)
+    p_sale = rng.beta(1.2, 1.5, size=n)
+    elasticity = rng.uniform(-2.5, -0.5, size=n)
+
+    wday_mult = np.array([1.25, 1.2, 0.9, 0.85, 0.85, 0.9, 1.05])[cal["wday"].to_numpy()[:n_eval] - 1]
+    is_event = (cal["event_name_1"].notna() | cal["event_name_2"].notna()).to_numpy()[:n_eval]
+    state_idx = ids["state_id"].map({"CA": 0, "TX": 1, "WI": 2}).to_numpy()
+    snap = cal[["snap_CA", "snap_TX", "snap_WI"]].to_numpy()[:n_eval].T[state_idx]
+    snap_lift = np.where((ids["cat_id"] == "FOODS").to_numpy()[:, None] & (snap == 1), 1.3, 1.0)
+
+    day_mult = (wday_mult * np.where(is_event, 1.2, 1.0)).astype(np.float32)
+
+    # chunked over series so a full-catalog (30k x 1941) draw stays within a few hundred MB
+    units = np.zeros((n, n_eval), dtype=np.int32)
+    for lo in range(0, n, 4096):
+        s = slice(lo, min(n, lo + 4096))
+        rel_price = price_wk[s][:, day_wk] / base_price[s, None].astype(np.float32)
+        lam = rate[s, None] * day_mult[None, :] * snap_lift[s] * rel_price ** elasticity[s, None]
+        u = rng.poisson(lam) * (rng.random(lam.shape, dtype=np.float32) < p_sale[s, None])
+        units[s] = np.where(sold[s][:, day_wk], u, 0)
+
+    d_cols = cal["d"].iloc[:n_eval].tolist()
+    sales_eval = pd.concat([ids, pd.DataFrame(units, columns=d_cols)], axis=1)
+    sales_eval["id"] = sales_eval["id"].str.replace("_validation", "_evaluation", regex=False)
+    sales_valid = pd.concat([ids, pd.DataFrame(units[:, :n_days], columns=d_cols[:n_days])], axis=1)
+
+    f_cols = [f"F{i}" for i in range(1, horizon + 1)]
+    sub_ids = pd.concat([sales_valid["id"], sales_eval["id"]], ignore_index=True)
+    sample_submission = pd.concat([sub_ids.rename("id"), pd.DataFrame(0, index=sub_ids.index, columns=f_cols)], axis=1)
+
+    return {
+        "calendar": cal,
+        "sell_prices": sp,
+        "sales_train_validation": sales_valid,
+        "sales_train_evaluation": sales_eval,
+        "sample_submission": sample_submission,
+    }
+
+
+def write_m5_zip(m5: Dict[str, pd.DataFrame], zip_path: str) -> None:
+    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, df in m5.items():
+            buf = io.StringIO()
+            df.to_csv(buf, index=False)
+            zf.writestr(f"{name}.csv", buf.getvalue())
@@ -15,3 +15,37 @@ def wape(y_true: np.ndarray, y_pred: np.ndarray) -> float:
 def save_json(path: str, payload: Dict[str, Any]) -> None:
     with open(path, "w", encoding="utf-8") as f:
         json.dump(payload, f, indent=2)
+
+def save_parquet_dataset(df, path: str, partition_by: str = "store_id", sort_by=None, row_group_size: int = 16384) -> None:
+    '''
+    Writes `df` as a hive-partitioned Parquet dataset (path/<partition_by>=<value>/*.parquet),
+    sorted within each partition so row-group min/max stats prune point lookups.
+    The new dataset is built next to the old one and swapped in with renames.
+    '''
+    import shutil
+    import duckdb
+
+    ensure_dir(os.path.dirname(path) or ".")
+    tmp, old = path + ".tmp", path + ".old"
+    shutil.rmtree(tmp, ignore_errors=True)
+    shutil.rmtree(old, ignore_errors=True)
+
+    con = duckdb.connect()
+    con.register("_frame", df)
+    cols = con.execute("DESCRIBE _frame").fetchall()
+    # timestamps at day resolution are written as DATE so readers get "YYYY-MM-DD" back
+    select = ", ".join(
+        f'CAST("{c}" AS DATE) AS "{c}"' if c == "date" and t.startswith("TIMESTAMP") else f'"{c}"'
+        for c, t, *_ in cols
+    )
+    order = f" ORDER BY {', '.join(sort_by)}" if sort_by else ""
+    con.execute(
+        f"COPY (SELECT {select} FROM _frame{order}) TO '{tmp}' "
+        f"(FORMAT PARQUET, PARTITION_BY ({partition_by}), ROW_GROUP_SIZE {int(row_group_size)})"
+    )
+    con.close()
+
+    if os.path.exists(path):
+        os.replace(path, old)
+    os.replace(tmp, path)
+    shutil.rmtree(old, ignore_errors=True)
@@ -0,0 +1,137 @@
+import duckdb
+from typing import Dict, List, Optional, Tuple
+
+FACT_COLS = ["date", "store_id", "item_id", "dept_id", "cat_id", "state_id", "units", "sell_price_filled"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fact_sales (
+  date DATE, store_id VARCHAR, item_id VARCHAR, dept_id VARCHAR, cat_id VARCHAR, state_id VARCHAR,
+  units FLOAT, sell_price_filled FLOAT
+);
+-- one row per loaded (date, store_id) partition of fact_sales
+CREATE TABLE IF NOT EXISTS fact_partitions (
+  date DATE, store_id VARCHAR, n_rows BIGINT, loaded_at TIMESTAMP DEFAULT current_timestamp,
+  PRIMARY KEY (date, store_id)
+);
+-- last loaded date of every (store_id, item_id) series
+CREATE TABLE IF NOT EXISTS series_watermarks (
+  store_id VARCHAR, item_id VARCHAR, wm DATE,
+  PRIMARY KEY (store_id, item_id)
+);
+-- materialized summary behind scripts/sql/examples.sql (revenue proxy per store/item)
+CREATE TABLE IF NOT EXISTS agg_item_revenue (
+  store_id VARCHAR, item_id VARCHAR, units DOUBLE, revenue_proxy DOUBLE,
+  PRIMARY KEY (store_id, item_id)
+);
+CREATE TABLE IF NOT EXISTS mv_top_items (
+  store_id VARCHAR, item_id VARCHAR, revenue_proxy DOUBLE, rn BIGINT
+);
+"""
+
+
+def ensure_schema(con: duckdb.DuckDBPyConnection, full_refresh: bool = False) -> None:
+    if full_refresh:
+        for t in ("fact_sales", "fact_partitions", "series_watermarks", "agg_item_revenue", "mv_top_items"):
+            con.execute(f"DROP TABLE IF EXISTS {t}")
+    con.execute(SCHEMA)
+    # databases loaded before series_watermarks existed: derive it once from the facts
+    if con.execute("SELECT COUNT(*) FROM series_watermarks").fetchone()[0] == 0:
+        con.execute("INSERT INTO series_watermarks SELECT store_id, item_id, MAX(date) FROM fact_sales GROUP BY 1, 2")
+
+
+def watermarks(con: duckdb.DuckDBPyConnection) -> Dict[Tuple[str, str], object]:
+    return {(s, i): wm for s, i, wm in con.execute("SELECT store_id, item_id, wm FROM series_watermarks").fetchall()}
+
+
+def upsert_fact_sales(
+    con: duckdb.DuckDBPyConnection,
+    staging: str,
+    restate_days: int = 0,
+    top_n: int = 20,
+) -> List[Tuple[object, str]]:
+    '''
+    Loads the rows of the `staging` relation that are newer than their series' watermark (or
+    within the last `restate_days` of it), replacing any existing rows for the same (date,
+    store_id, item_id). A series that shows up late, after its store has loaded later days, is
+    loaded from its first day. agg_item_revenue is adjusted by the delta of the replaced rows,
+    fact_partitions is recounted and mv_top_items is re-ranked only for the stores that changed.
+    Returns the list of (date, store_id) partitions written.
+    '''
+    con.execute(f"""
+        CREATE OR REPLACE TEMP VIEW _stage AS
+        SELECT CAST(date AS DATE) AS date, store_id, item_id, dept_id, cat_id, state_id,
+               CAST(units AS FLOAT) AS units, CAST(sell_price_filled AS FLOAT) AS sell_price_filled
+        FROM {staging}
+    """)
+    con.execute(f"""
+        CREATE OR REPLACE TEMP TABLE _new AS
+        SELECT s.*
+        FROM _stage s
+        LEFT JOIN series_watermarks w USING (store_id, item_id)
+        WHERE w.wm IS NULL OR s.date > w.wm - {int(restate_days)}
+    """)
+    changed = con.execute("SELECT DISTINCT date, store_id FROM _new ORDER BY 1, 2").fetchall()
+    if not changed:
+        return []
+
+    in_new = "(date, store_id, item_id) IN (SELECT date, store_id, item_id FROM _new)"
+    con.execute("BEGIN TRANSACTION")
+    try:
+        # delta = new contribution - old contribution of the replaced rows
+        con.execute(f"""
+            CREATE OR REPLACE TEMP TABLE _delta AS
+            SELECT store_id, item_id, -SUM(units) AS units, -SUM(units * sell_price_filled) AS revenue_proxy
+            FROM fact_sales WHERE {in_new} GROUP BY 1, 2
+        """)
+        con.execute(f"DELETE FROM fact_sales WHERE {in_new}")
+        con.execute(f"""
+            INSERT INTO fact_sales
+            SELECT {", ".join(FACT_COLS)} FROM _new
+            ORDER BY date, store_id, item_id
+        """)
+        con.execute("""
+            INSERT INTO _delta
+            SELECT store_id, item_id, SUM(units), SUM(units * sell_price_filled)
+            FROM _new GROUP BY 1, 2
+        """)
+        con.execute("""
+            INSERT INTO agg_item_revenue
+            SELECT store_id, item_id, SUM(units), COALESCE(SUM(revenue_proxy), 0) FROM _delta GROUP BY 1, 2
+            ON CONFLICT (store_id, item_id) DO UPDATE SET
+              units = agg_item_revenue.units + excluded.units,
+              revenue_proxy = agg_item_revenue.revenue_proxy + excluded.revenue_proxy
+        """)
+        con.execute("""
+            INSERT OR REPLACE INTO fact_partitions (date, store_id, n_rows, loaded_at)
+            SELECT date, store_id, COUNT(*), current_timestamp FROM fact_sales
+            WHERE (date, store_id) IN (SELECT DISTINCT date, store_id FROM _new)
+            GROUP BY 1, 2
+        """)
+        con.execute("""
+            INSERT INTO series_watermarks
+            SELECT store_id, item_id, MAX(date) FROM _new GROUP BY 1, 2
+            ON CONFLICT (store_id, item_id) DO UPDATE SET wm = GREATEST(series_watermarks.wm, excluded.wm)
+        """)
+        refresh_top_items(con, stores=sorted({s for _, s in changed}), top_n=top_n)
+        con.execute("COMMIT")
+    except Exception:
+        con.execute("ROLLBACK")
+        raise
+    return changed
+
+
+def refresh_top_items(con: duckdb.DuckDBPyConnection, stores: Optional[List[str]] = None, top_n: int = 20) -> None:
+    where = ""
+    params: list = []
+    if stores is not None:
+        where = f"WHERE store_id IN ({', '.join('?' for _ in stores)})"
+        params = list(stores)
+    con.execute(f"DELETE FROM mv_top_items {where}", params)
+    con.execute(f"""
+        INSERT INTO mv_top_items
+        SELECT store_id, item_id, revenue_proxy, rn FROM (
+          SELECT store_id, item_id, revenue_proxy,
+                 ROW_NUMBER() OVER (PARTITION BY store_id ORDER BY revenue_proxy DESC) AS rn
+          FROM agg_item_revenue {where}
+        ) WHERE rn <= {int(top_n)}
+    """, params)
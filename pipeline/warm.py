@@ -0,0 +1,77 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import pandas as pd
+
+from .profiling import maybe_stage
+
+# Process-wide caches of command inputs. A one-off run loads each input once; under
+# `python -m pipeline daemon` they outlive the command, so repeated runs on the same zip
+# skip reading it and building features. Cached frames are shared: callers must not
+# modify them in place.
+MAX_ENTRIES = 6
+
+_entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def file_key(path: str) -> Tuple[str, int, int]:
+    st = os.stat(path)
+    return (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+
+
+def cached(key: Hashable, loader: Callable[[], Any]) -> Any:
+    with _lock:
+        if key in _entries:
+            _entries.move_to_end(key)
+            return _entries[key]
+    value = loader()
+    with _lock:
+        _entries[key] = value
+        while len(_entries) > MAX_ENTRIES:
+            _entries.popitem(last=False)
+    return value
+
+
+def clear() -> None:
+    with _lock:
+        _entries.clear()
+
+
+def m5_tables(zip_path: str) -> Dict[str, pd.DataFrame]:
+    from .m5_io import read_m5_from_zip
+    return cached(("m5", file_key(zip_path)), lambda: read_m5_from_zip(zip_path))
+
+
+def price_cube(zip_path: str):
+    '''The PriceCube of a zip's sell_prices, over every calendar week.'''
+    from .prices import PriceCube
+
+    def build():
+        m5 = m5_tables(zip_path)
+        return PriceCube.from_sell_prices(m5["sell_prices"], weeks=m5["calendar"]["wm_yr_wk"])
+
+    return cached(("prices", file_key(zip_path)), build)
+
+
+def features(zip_path: str, max_series: int, profiler=None, shard: Optional[int] = None, num_shards: int = 1) -> pd.DataFrame:
+    '''The pandas feature table (melt -> calendar/price joins -> lags/rolling stats) of a zip sample or one shard of it.'''
+    from .features import to_long_sales, join_calendar_prices, add_time_series_features
+
+    def build() -> pd.DataFrame:
+        m5 = m5_tables(zip_path)
+        with maybe_stage(profiler, "melt", rows_in=len(m5["sales_train_validation"])) as st:
+            sales_long = to_long_sales(m5["sales_train_validation"], max_series=max_series,
+                                      shard=shard, num_shards=num_shards)
+            st.rows_out = len(sales_long)
+        with maybe_stage(profiler, "join", rows_in=len(sales_long)) as st:
+            joined = join_calendar_prices(sales_long, m5["calendar"], price_cube(zip_path))
+            st.rows_out = len(joined)
+        with maybe_stage(profiler, "features", rows_in=len(joined)) as st:
+            feat = add_time_series_features(joined).dropna(subset=["date"])
+            st.rows_out = len(feat)
+        return feat
+
+    return cached(("features", file_key(zip_path), max_series, shard, num_shards), build)
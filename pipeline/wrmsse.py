@@ -0,0 +1,141 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# The 12 M5 aggregation levels (42,840 nodes on the full data set), total -> item x store
+LEVELS: List[Tuple[str, ...]] = [
+    (),
+    ("state_id",),
+    ("store_id",),
+    ("cat_id",),
+    ("dept_id",),
+    ("state_id", "cat_id"),
+    ("state_id", "dept_id"),
+    ("store_id", "cat_id"),
+    ("store_id", "dept_id"),
+    ("item_id",),
+    ("item_id", "state_id"),
+    ("item_id", "store_id"),
+]
+HIERARCHY_COLS = ["item_id", "dept_id", "cat_id", "store_id", "state_id"]
+# weights are dollar sales over the last 28 training days
+WEIGHT_DAYS = 28
+SCALE_CHUNK = 4096
+
+
+def level_name(level: Sequence[str]) -> str:
+    return " x ".join(level) if level else "total"
+
+
+def summing_matrix(ids: pd.DataFrame, levels: Sequence[Tuple[str, ...]] = LEVELS) -> Tuple[sp.csr_matrix, np.ndarray]:
+    '''
+    S (nodes x series, 0/1) with S @ series = every node's aggregate, and the level index of each
+    node. ids holds one row per series (in matrix row order) with the HIERARCHY_COLS.
+    '''
+    n = len(ids)
+    blocks, level_of = [], []
+    for i, level in enumerate(levels):
+        if level:
+            codes, uniques = pd.MultiIndex.from_frame(ids[list(level)]).factorize()
+            k = len(uniques)
+        else:
+            codes, k = np.zeros(n, dtype=np.int64), 1
+        blocks.append(sp.csr_matrix((np.ones(n, dtype=np.float32), (codes, np.arange(n))), shape=(k, n)))
+        level_of.append(np.full(k, i, dtype=np.int16))
+    return sp.vstack(blocks, format="csr"), np.concatenate(level_of)
+
+
+def _scales(S: sp.csr_matrix, train: np.ndarray) -> np.ndarray:
+    # mean squared one-step difference of each node's history, from its first non-zero day on
+    out = np.empty(S.shape[0], dtype=np.float64)
+    for lo in range(0, S.shape[0], SCALE_CHUNK):
+        agg = np.asarray(S[lo:lo + SCALE_CHUNK] @ train, dtype=np.float64)
+        started = np.maximum.accumulate(agg != 0, axis=1)[:, :-1]
+        sq = np.square(np.diff(agg, axis=1))
+        n = started.sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out[lo:lo + SCALE_CHUNK] = np.where(started, sq, 0.0).sum(axis=1) / n
+    return out
+
+
+def evaluator_inputs(train_df: pd.DataFrame) -> Tuple[pd.DataFrame, np.ndarray, np.ndarray]:
+    '''
+    (ids, train, train_revenue) of a long (id, date, units, sell_price + hierarchy) training frame,
+    series sorted by id. Disjoint series sets (shards) can be stacked and re-sorted into one evaluator.
+    '''
+    ids = train_df[["id"] + HIERARCHY_COLS].drop_duplicates("id").sort_values("id")
+    units = train_df.pivot(index="id", columns="date", values="units").reindex(ids["id"]).fillna(0.0)
+    last = units.columns.sort_values()[-WEIGHT_DAYS:]
+    tail = train_df[train_df["date"].isin(last)]
+    revenue = (tail["units"] * tail["sell_price"].fillna(0.0)).groupby(tail["id"]).sum().reindex(ids["id"]).fillna(0.0)
+    return ids, units.to_numpy(np.float32), revenue.to_numpy()
+
+
+class WRMSSEEvaluator:
+    '''
+    M5 WRMSSE for one training window. Builds the summing matrix, per-node scales and level
+    weights once; score() is then one sparse mat-mul of the error matrix.
+    ids: one row per series (matrix row order) with HIERARCHY_COLS and optionally `id`;
+    train: series x days units; train_revenue: per-series dollar sales of the weighting window.
+    Nodes with no sales in training (scale 0 or undefined) get no weight.
+    '''
+
+    def __init__(self, ids: pd.DataFrame, train: np.ndarray, train_revenue: np.ndarray,
+                 levels: Sequence[Tuple[str, ...]] = LEVELS):
+        self.ids = ids.reset_index(drop=True)
+        self.series = self.ids["id"].to_numpy() if "id" in self.ids.columns else None
+        self.levels = list(levels)
+        self.S, self.level_of = summing_matrix(self.ids, self.levels)
+        self.scale = _scales(self.S, np.asarray(train, dtype=np.float32))
+
+        revenue = self.S @ np.asarray(train_revenue, dtype=np.float64)
+        usable = np.isfinite(self.scale) & (self.scale > 0)
+        revenue = np.where(usable, revenue, 0.0)
+        level_total = np.bincount(self.level_of, weights=revenue, minlength=len(self.levels))
+        # each level sums to 1/len(levels) (levels without any weight drop out)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            self.weight = np.nan_to_num(revenue / level_total[self.level_of]) / len(self.levels)
+        self.scale = np.where(usable, self.scale, 1.0)
+
+    @property
+    def num_nodes(self) -> int:
+        return self.S.shape[0]
+
+    def score(self, actual: np.ndarray, pred: np.ndarray) -> Dict[str, object]:
+        '''
+        actual, pred: series x horizon arrays in the evaluator's series order.
+        Returns {"wrmsse": total, "levels": {level name: that level's WRMSSE (weights summing to 1)}}.
+        '''
+        err = self.S @ (np.asarray(actual, dtype=np.float64) - np.asarray(pred, dtype=np.float64))
+        rmsse = np.sqrt(np.mean(np.square(err), axis=1) / self.scale)
+        contrib = np.bincount(self.level_of, weights=self.weight * rmsse, minlength=len(self.levels))
+        n = len(self.levels)
+        return {
+            "wrmsse": float(contrib.sum()),
+            "levels": {level_name(lv): float(c * n) for lv, c in zip(self.levels, contrib)},
+        }
+
+    @classmethod
+    def from_long(cls, train_df: pd.DataFrame, levels: Sequence[Tuple[str, ...]] = LEVELS) -> "WRMSSEEvaluator":
+        '''From a long (id, date, units, sell_price + hierarchy) training frame, series sorted by id.'''
+        return cls(*evaluator_inputs(train_df), levels)
+
+    def score_long(self, pred_df: pd.DataFrame, pred_col: str = "pred_units") -> Dict[str, object]:
+        '''Scores a long (id, date, units, pred_col) frame; series/days without a prediction count as 0.'''
+        actual = pred_df.pivot(index="id", columns="date", values="units").reindex(self.series).fillna(0.0)
+        pred = pred_df.pivot(index="id", columns="date", values=pred_col).reindex(index=self.series, columns=actual.columns)
+        return self.score(actual.to_numpy(), pred.fillna(0.0).to_numpy())
+
+
+def wrmsse(train_df: Optional[pd.DataFrame], pred_df: pd.DataFrame, pred_col: str = "pred_units",
+           evaluator: Optional[WRMSSEEvaluator] = None) -> Dict[str, object]:
+    '''One-shot WRMSSE of pred_df against the training window train_df (pass `evaluator` to reuse one).'''
+    return (evaluator or WRMSSEEvaluator.from_long(train_df)).score_long(pred_df, pred_col)
+
+
+def wrmsse_metrics(train_df: Optional[pd.DataFrame], valid_pred: pd.DataFrame,
+                   evaluator: Optional[WRMSSEEvaluator] = None) -> Dict[str, object]:
+    '''valid_wrmsse + valid_wrmsse_by_level, for the metrics train_forecast_model returns.'''
+    r = wrmsse(train_df, valid_pred, evaluator=evaluator)
+    return {"valid_wrmsse": r["wrmsse"], "valid_wrmsse_by_level": r["levels"]}
@@ -0,0 +1,136 @@
+import os, sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import json
+import platform
+from datetime import datetime, timezone
+
+from pipeline.config import PipelineConfig
+from pipeline.synthetic import make_m5_like
+from pipeline.features import to_long_sales, join_calendar_prices, add_time_series_features, make_train_valid_split
+from pipeline.forecast import train_forecast_model
+from pipeline.future import build_future_frame, recursive_forecast
+from pipeline.inventory import compute_inventory_policy, simulate_replenishment
+from pipeline.pricing import estimate_elasticity_loglog, optimize_markdown
+from pipeline.assortment import recommend_assortment
+from pipeline.profiling import StageProfiler, find_regressions
+
+FUNCTIONS = [
+    "to_long_sales", "join_calendar_prices", "add_time_series_features", "train_forecast_model",
+    "recursive_forecast", "simulate_replenishment", "estimate_elasticity_loglog", "optimize_markdown",
+    "recommend_assortment",
+]
+
+def bench_size(n_series: int, n_days: int, selected: set, seed: int = 0, recursive_max_series: int = 100):
+    cfg = PipelineConfig()
+    prof = StageProfiler()
+    m5 = make_m5_like(n_series=n_series, n_days=n_days, horizon=cfg.horizon, seed=seed)
+
+    # every step runs (later functions need earlier outputs); only the selected ones are timed
+    def stage(name, rows_in):
+        return prof.stage(name, rows_in=rows_in) if name in selected else _Untimed()
+
+    with stage("to_long_sales", len(m5["sales_train_validation"])) as st:
+        sales_long = to_long_sales(m5["sales_train_validation"])
+        st.rows_out = len(sales_long)
+    with stage("join_calendar_prices", len(sales_long)) as st:
+        joined = join_calendar_prices(sales_long, m5["calendar"], m5["sell_prices"])
+        st.rows_out = len(joined)
+    with stage("add_time_series_features", len(joined)) as st:
+        feat = add_time_series_features(joined).dropna(subset=["date"])
+        st.rows_out = len(feat)
+
+    train_df, valid_df = make_train_valid_split(feat, horizon=cfg.horizon)
+    with stage("train_forecast_model", len(train_df)) as st:
+        model, _metrics, valid_pred = train_forecast_model(train_df, valid_df)
+        st.rows_out = len(valid_pred)
+
+    # recursive_forecast rebuilds features day by day (~0.3s per series): at 1000 series it alone takes minutes
+    if "recursive_forecast" in selected and n_series <= recursive_max_series:
+        future_base = build_future_frame(feat, m5["calendar"], m5["sell_prices"], horizon=cfg.horizon)
+        with stage("recursive_forecast", len(future_base)) as st:
+            st.rows_out = len(recursive_forecast(model, feat, future_base))
+
+    inv_df = compute_inventory_policy(valid_pred, service_level=cfg.service_level, lead_time_days=cfg.lead_time_days)
+    with stage("simulate_replenishment", len(inv_df)) as st:
+        simulate_replenishment(inv_df, lead_time_days=cfg.lead_time_days)
+        st.rows_out = len(inv_df)
+
+    with stage("estimate_elasticity_loglog", len(valid_pred)) as st:
+        elast = estimate_elasticity_loglog(valid_pred)
+        st.rows_out = len(elast)
+    with stage("optimize_markdown", len(valid_pred)) as st:
+        pricing_rec = optimize_markdown(valid_pred, elast, cost_fraction=cfg.cost_fraction_of_base_price,
+                                        horizon_days=cfg.horizon, inventory_days_of_supply=90)
+        st.rows_out = len(pricing_rec)
+    with stage("recommend_assortment", len(pricing_rec)) as st:
+        st.rows_out = len(recommend_assortment(pricing_rec, valid_pred))
+
+    return [dict(s, n_series=n_series, function=s["name"]) for s in prof.summary()["stages"]]
+
+class _Untimed:
+    rows_out = None
+    def __enter__(self):
+        return self
+    def __exit__(self, *exc):
+        return False
+
+def main():
+    ap = argparse.ArgumentParser(description="Time each pipeline function on synthetic M5-shaped data.")
+    ap.add_argument("--sizes", default="100,1000", help="comma-separated series counts")
+    ap.add_argument("--n_days", type=int, default=400)
+    ap.add_argument("--functions", default=",".join(FUNCTIONS), help="comma-separated subset of functions to time")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--recursive_max_series", type=int, default=100,
+                    help="skip recursive_forecast at sizes above this many series")
+    ap.add_argument("--out_dir", default=os.path.join("reports", "benchmarks"))
+    ap.add_argument("--baseline", default=None, help="earlier benchmark JSON to compare against")
+    ap.add_argument("--regression_pct", type=float, default=0.20)
+    ap.add_argument("--fail_on_regression", action="store_true")
+    args = ap.parse_args()
+
+    selected = {f.strip() for f in args.functions.split(",") if f.strip()}
+    unknown = selected - set(FUNCTIONS)
+    if unknown:
+        ap.error(f"unknown functions: {sorted(unknown)}")
+
+    results = []
+    for n_series in [int(s) for s in args.sizes.split(",")]:
+        print(f"-- {n_series} series x {args.n_days} days")
+        if "recursive_forecast" in selected and n_series > args.recursive_max_series:
+            print(f"   {'recursive_forecast':<28} skipped (> --recursive_max_series {args.recursive_max_series})")
+        for r in bench_size(n_series, args.n_days, selected, seed=args.seed, recursive_max_series=args.recursive_max_series):
+            results.append(r)
+            print(f"   {r['function']:<28} {r['wall_s']:>9.3f}s  {r['peak_rss_mb']:>8.1f} MB  {r['rows_per_s'] or 0:>12,.0f} rows/s")
+
+    payload = {
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "params": {"sizes": args.sizes, "n_days": args.n_days, "seed": args.seed, "recursive_max_series": args.recursive_max_series},
+        "platform": {"python": platform.python_version(), "machine": platform.machine(), "cpu_count": os.cpu_count()},
+        "results": results,
+        "regressions": [],
+    }
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            base = json.load(f)
+        key = lambda r: f"{r['n_series']}:{r['function']}"
+        previous = {key(r): r["wall_s"] for r in base.get("results", [])}
+        current = [dict(r, name=key(r)) for r in results]
+        payload["regressions"] = find_regressions(current, previous, pct=args.regression_pct, min_s=0.05)
+        for r in payload["regressions"]:
+            print(f"  ⚠ regression {r['stage']}: {r['previous_wall_s']:.3f}s -> {r['wall_s']:.3f}s (+{r['change_pct']:.0%})")
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    for name in (f"bench_{stamp}.json", "latest.json"):
+        with open(os.path.join(args.out_dir, name), "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=2)
+
+    print("DONE ✅ benchmark saved:", os.path.join(args.out_dir, f"bench_{stamp}.json"))
+    if args.fail_on_regression and payload["regressions"]:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
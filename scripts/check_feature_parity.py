@@ -0,0 +1,46 @@
+import os, sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import tempfile
+
+from pipeline.m5_io import read_m5_from_zip
+from pipeline.synthetic import make_m5_like
+from pipeline.features import to_long_sales, join_calendar_prices, add_time_series_features
+from pipeline.sql_features import m5_sources, build_features_duckdb, compare_feature_frames
+
+def main():
+    ap = argparse.ArgumentParser(description="Parity test: pandas vs DuckDB feature engines must build the same table.")
+    ap.add_argument("--zip_path", default=None, help="M5 zip; synthetic data is generated when omitted")
+    ap.add_argument("--max_series", type=int, default=300)
+    ap.add_argument("--n_days", type=int, default=200, help="synthetic data only")
+    ap.add_argument("--source", choices=["csv", "parquet"], default="csv", help="synthetic data only")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.zip_path:
+            m5 = read_m5_from_zip(args.zip_path)
+            sources = m5_sources(args.zip_path, cache_dir=os.path.join(tmp, "m5_parquet"))
+        else:
+            m5 = make_m5_like(n_series=args.max_series, n_days=args.n_days)
+            for name, df in m5.items():
+                if args.source == "csv":
+                    df.to_csv(os.path.join(tmp, f"{name}.csv"), index=False)
+                else:
+                    df.to_parquet(os.path.join(tmp, f"{name}.parquet"), index=False)
+            sources = m5_sources(tmp)
+
+        sales_long = to_long_sales(m5["sales_train_validation"], max_series=args.max_series)
+        ids = sales_long["id"].unique().tolist()
+        pdf = add_time_series_features(join_calendar_prices(sales_long, m5["calendar"], m5["sell_prices"]))
+        ddf = build_features_duckdb(sources, series_ids=ids)
+
+    bad = compare_feature_frames(pdf, ddf)
+    print(f"rows pandas={len(pdf):,} duckdb={len(ddf):,} series={len(ids):,}")
+    if bad:
+        print("PARITY FAILED ❌", bad)
+        sys.exit(1)
+    print("PARITY OK ✅")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import os, sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import time
+
+import numpy as np
+
+from pipeline.m5_io import read_m5_from_zip
+from pipeline.synthetic import make_m5_like
+from pipeline.features import to_long_sales, join_calendar_prices, add_time_series_features
+from pipeline import registry
+
+
+def _ms(fn, repeat: int) -> float:
+    fn()
+    t = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t) / repeat * 1e3
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Parity + timing: a registered model scored on its encoded matrix vs a categorical DataFrame.")
+    ap.add_argument("--out_dir", default="reports")
+    ap.add_argument("--model_version", default=None, help="default: models/CURRENT")
+    ap.add_argument("--zip_path", default=None, help="M5 zip to draw feature rows from; synthetic data when omitted")
+    ap.add_argument("--max_series", type=int, default=200)
+    ap.add_argument("--rows", type=int, default=5000, help="feature rows compared")
+    ap.add_argument("--batch_sizes", default="1,10,100,1000")
+    ap.add_argument("--atol", type=float, default=1e-9)
+    args = ap.parse_args()
+
+    model = registry.load(args.out_dir, args.model_version)
+    m5 = read_m5_from_zip(args.zip_path) if args.zip_path else make_m5_like(n_series=args.max_series, n_days=200)
+    sales_long = to_long_sales(m5["sales_train_validation"], max_series=min(args.max_series, len(m5["sales_train_validation"])))
+    feat = add_time_series_features(join_calendar_prices(sales_long, m5["calendar"], m5["sell_prices"]))
+    feat = feat.sample(n=min(args.rows, len(feat)), random_state=0).reset_index(drop=True)
+
+    X = model.encode(feat)
+    diff = float(np.abs(model.booster.predict(model.frame(feat)) - model.booster.predict(X)).max())
+    print(f"rows={len(X):,} max |encoded matrix - categorical DataFrame| = {diff:.3g}")
+
+    print(f"\nmodel {model.version}: {model.booster.num_trees()} trees; ms per call")
+    print(f"{'rows':>6} {'DataFrame':>10} {'encode':>8} {'predict':>8}")
+    for n in [int(s) for s in args.batch_sizes.split(",")]:
+        df, M = feat.head(n), X[:n]
+        repeat = max(3, 200 // max(n, 1))
+        print(f"{len(M):>6} {_ms(lambda: model.booster.predict(model.frame(df)), repeat):>10.2f} "
+              f"{_ms(lambda: model.encode(df), repeat):>8.2f} {_ms(lambda: model.booster.predict(M), repeat):>8.2f}")
+
+    if diff > args.atol:
+        print("EXPORT PARITY FAILED ❌")
+        sys.exit(1)
+    print("EXPORT PARITY OK ✅")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import os, sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from pipeline.m5_io import read_m5_from_zip
+from pipeline.synthetic import make_m5_like
+from pipeline.features import to_long_sales, join_calendar_prices
+from pipeline.wrmsse import LEVELS, WEIGHT_DAYS, WRMSSEEvaluator, level_name
+
+# Reference WRMSSE the way the M5 notebooks compute it: one pandas groupby per level over the wide
+# series x day frame. The sparse evaluator in pipeline/wrmsse.py must agree with it.
+
+
+def _level_sums(wide: pd.DataFrame, value_cols, level) -> pd.DataFrame:
+    if not level:
+        return wide[value_cols].sum().to_frame().T
+    return wide.groupby(list(level), sort=True)[value_cols].sum()
+
+
+def _scale(row: np.ndarray) -> float:
+    nz = np.flatnonzero(row)
+    if len(nz) == 0 or nz[0] >= len(row) - 1:
+        return np.nan
+    return float(np.mean(np.diff(row[nz[0]:]) ** 2))
+
+
+def reference_wrmsse(train_df: pd.DataFrame, actual: pd.DataFrame, pred: pd.DataFrame):
+    ids = train_df[["id", "item_id", "dept_id", "cat_id", "store_id", "state_id"]].drop_duplicates("id").set_index("id")
+    units = train_df.pivot(index="id", columns="date", values="units").fillna(0.0)
+    days = list(units.columns)
+    last = sorted(days)[-WEIGHT_DAYS:]
+    tail = train_df[train_df["date"].isin(last)]
+    revenue = (tail["units"] * tail["sell_price"].fillna(0.0)).groupby(tail["id"]).sum()
+    err = actual - pred
+    wide = ids.join(units).join(revenue.rename("revenue")).join(err.add_prefix("e_"))
+    wide["revenue"] = wide["revenue"].fillna(0.0)
+    err_cols = [f"e_{c}" for c in err.columns]
+
+    levels = {}
+    for level in LEVELS:
+        agg = _level_sums(wide, days + ["revenue"] + err_cols, level)
+        scale = np.array([_scale(r) for r in agg[days].to_numpy(np.float64)])
+        usable = np.isfinite(scale) & (scale > 0)
+        rev = np.where(usable, agg["revenue"].to_numpy(), 0.0)
+        if rev.sum() == 0:
+            levels[level_name(level)] = 0.0
+            continue
+        e = agg[err_cols].to_numpy(np.float64)
+        rmsse = np.sqrt(np.mean(e ** 2, axis=1) / np.where(usable, scale, 1.0))
+        levels[level_name(level)] = float(np.sum(rev / rev.sum() * rmsse))
+    return float(np.mean(list(levels.values()))), levels
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Parity test: sparse WRMSSE evaluator vs per-level pandas groupby.")
+    ap.add_argument("--zip_path", default=None, help="M5 zip; synthetic data is generated when omitted")
+    ap.add_argument("--max_series", type=int, default=300)
+    ap.add_argument("--n_days", type=int, default=200, help="synthetic data only")
+    ap.add_argument("--horizon", type=int, default=28)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--rtol", type=float, default=1e-6)
+    args = ap.parse_args()
+
+    m5 = read_m5_from_zip(args.zip_path) if args.zip_path else make_m5_like(n_series=args.max_series, n_days=args.n_days, seed=args.seed)
+    long = join_calendar_prices(to_long_sales(m5["sales_train_validation"], max_series=args.max_series),
+                                m5["calendar"], m5["sell_prices"]).dropna(subset=["date"])
+    cutoff = long["date"].max() - pd.Timedelta(days=args.horizon)
+    train_df, valid_df = long[long["date"] <= cutoff], long[long["date"] > cutoff].copy()
+    rng = np.random.default_rng(args.seed)
+    valid_df["pred_units"] = np.maximum(valid_df["units"] * rng.lognormal(0.0, 0.3, len(valid_df)) + rng.normal(0.0, 0.5, len(valid_df)), 0.0)
+
+    ev = WRMSSEEvaluator.from_long(train_df)
+    bad = []
+
+    # 1) every node of S @ series equals the groupby sum of its level (same node order: sorted keys)
+    units = train_df.pivot(index="id", columns="date", values="units").reindex(ev.series).fillna(0.0)
+    nodes = ev.S @ units.to_numpy(np.float64)
+    wide = ev.ids.set_index("id").join(units)
+    for i, level in enumerate(LEVELS):
+        expect = _level_sums(wide, list(units.columns), level).to_numpy(np.float64)
+        got = nodes[ev.level_of == i]
+        # summing_matrix numbers nodes in order of first appearance; compare as sorted row sets
+        got, expect = got[np.lexsort(got.T[::-1])], expect[np.lexsort(expect.T[::-1])]
+        if got.shape != expect.shape or not np.allclose(got, expect, rtol=args.rtol, atol=1e-6):
+            bad.append(f"S @ series, level {level_name(level)}")
+
+    # 2) the score
+    actual = valid_df.pivot(index="id", columns="date", values="units").reindex(ev.series).fillna(0.0)
+    pred = valid_df.pivot(index="id", columns="date", values="pred_units").reindex(index=ev.series, columns=actual.columns).fillna(0.0)
+    got = ev.score_long(valid_df)
+    total, levels = reference_wrmsse(train_df, actual, pred)
+    for name, v in levels.items():
+        if not np.isclose(got["levels"][name], v, rtol=args.rtol, atol=1e-9):
+            bad.append(f"level {name}: evaluator={got['levels'][name]:.9f} pandas={v:.9f}")
+    if not np.isclose(got["wrmsse"], total, rtol=args.rtol, atol=1e-9):
+        bad.append(f"wrmsse: evaluator={got['wrmsse']:.9f} pandas={total:.9f}")
+
+    print(f"series={len(ev.series):,} nodes={ev.num_nodes:,} wrmsse evaluator={got['wrmsse']:.6f} pandas={total:.6f}")
+    if bad:
+        print("PARITY FAILED ❌", bad)
+        sys.exit(1)
+    print("PARITY OK ✅")
+
+if __name__ == "__main__":
+    main()
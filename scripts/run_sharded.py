@@ -0,0 +1,46 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+# Stand-in for N nodes: N local `run-all --shard k` processes sharing --out_dir, then `merge`.
+REPO = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Run run-all as N hash shards in parallel processes, then merge them.")
+    ap.add_argument("--zip_path", required=True)
+    ap.add_argument("--num_shards", type=int, default=4)
+    ap.add_argument("--max_series", type=int, default=3000)
+    ap.add_argument("--out_dir", default="reports")
+    ap.add_argument("--feature_engine", choices=["pandas", "duckdb"], default="pandas")
+    ap.add_argument("--model_version", default=None, help="default: models/CURRENT (train one first with run-all or retrain)")
+    args = ap.parse_args()
+
+    base = [sys.executable, "-m", "pipeline", "run-all", "--zip_path", args.zip_path, "--max_series", str(args.max_series),
+            "--out_dir", args.out_dir, "--feature_engine", args.feature_engine, "--num_shards", str(args.num_shards)]
+    if args.model_version:
+        base += ["--model_version", args.model_version]
+
+    env = {**os.environ, "PYTHONPATH": REPO + os.pathsep + os.environ.get("PYTHONPATH", "")}
+    log_dir = os.path.join(args.out_dir, "shards", str(args.num_shards))
+    os.makedirs(log_dir, exist_ok=True)
+    t0 = time.perf_counter()
+    procs = []
+    for k in range(args.num_shards):
+        with open(os.path.join(log_dir, f"{k:04d}.log"), "w", encoding="utf-8") as log:
+            procs.append(subprocess.Popen(base + ["--shard", str(k)], stdout=log, stderr=subprocess.STDOUT, env=env))
+    failed = [k for k, p in enumerate(procs) if p.wait() != 0]
+    print(f"{args.num_shards} shards finished in {time.perf_counter() - t0:.1f}s")
+    if failed:
+        print(f"shards {failed} failed ❌ (logs in {log_dir}/)")
+        sys.exit(1)
+
+    merge = [sys.executable, "-m", "pipeline", "merge", "--out_dir", args.out_dir, "--num_shards", str(args.num_shards)]
+    rc = subprocess.call(merge, env=env)
+    print(f"total {time.perf_counter() - t0:.1f}s")
+    sys.exit(rc)
+
+if __name__ == "__main__":
+    main()
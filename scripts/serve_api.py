@@ -1,36 +1,71 @@
-from fastapi import FastAPI
+import os
+from functools import lru_cache
+from typing import Optional
+
+from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 import pandas as pd
 
-from src.m5_io import read_m5_from_zip
-from src.features import to_long_sales, join_calendar_prices, add_time_series_features
-from src.forecast import train_forecast_model
-from src.inventory import compute_inventory_policy
-from src.pricing import estimate_elasticity_loglog, optimize_markdown
-from src.assortment import recommend_assortment
-from src.config import PipelineConfig
+from pipeline.m5_io import read_m5_from_zip
+from pipeline.features import to_long_sales, join_calendar_prices, add_time_series_features
+from pipeline.forecast import FEATURE_COLS, score_forecast, train_forecast_model
+from pipeline.inventory import compute_inventory_policy
+from pipeline.pricing import estimate_elasticity_loglog, optimize_markdown
+from pipeline.assortment import recommend_assortment
+from pipeline.config import PipelineConfig
+from pipeline import registry
+
+REPORTS_DIR = os.getenv("REPORTS_DIR", "reports")
 
 app = FastAPI(title="Merch & Inventory ML API")
 
 class RunRequest(BaseModel):
     zip_path: str
     max_series: int = 1000
+    model_version: Optional[str] = None  # default: the registry's CURRENT
+    retrain: bool = False                # train + register a new model instead
+
+@lru_cache(maxsize=2)
+def _features(zip_path: str, max_series: int, mtime_ns: int) -> pd.DataFrame:
+    # keyed on the zip's mtime: a replaced file is read again
+    m5 = read_m5_from_zip(zip_path)
+    sales_long = to_long_sales(m5["sales_train_validation"], max_series=max_series)
+    joined = join_calendar_prices(sales_long, m5["calendar"], m5["sell_prices"])
+    return add_time_series_features(joined).dropna(subset=["date"])
+
+@lru_cache(maxsize=4)
+def _model(version: str) -> registry.RegisteredModel:
+    return registry.load(REPORTS_DIR, version, feature_cols=FEATURE_COLS)
 
 @app.get("/health")
 def health():
-    return {"status": "ok"}
+    return {"status": "ok", "model_version": registry.current_version(REPORTS_DIR)}
 
 @app.post("/run")
 def run(req: RunRequest):
     cfg = PipelineConfig()
-    m5 = read_m5_from_zip(req.zip_path)
-    sales_long = to_long_sales(m5["sales_train_validation"], max_series=req.max_series)
-    joined = join_calendar_prices(sales_long, m5["calendar"], m5["sell_prices"])
-    feat = add_time_series_features(joined).dropna(subset=["date"])
+    if not os.path.exists(req.zip_path):
+        raise HTTPException(404, f"{req.zip_path} not found")
+    if not req.retrain:
+        version = req.model_version or registry.current_version(REPORTS_DIR)
+        if version is None:
+            raise HTTPException(404, "no model registered: run run_all.py / retrain.py or pass retrain=true")
+        try:
+            model = _model(version)
+        except KeyError as e:
+            raise HTTPException(404, e.args[0])
+        except registry.SchemaMismatch as e:
+            raise HTTPException(409, str(e))
 
+    feat = _features(req.zip_path, req.max_series, os.stat(req.zip_path).st_mtime_ns)
     train_df = feat[feat["date"] <= feat["date"].max() - pd.Timedelta(days=cfg.horizon)].copy()
     valid_df = feat[feat["date"] >  feat["date"].max() - pd.Timedelta(days=cfg.horizon)].copy()
-    model, metrics, valid_pred = train_forecast_model(train_df, valid_df)
+    if req.retrain:
+        model, metrics, valid_pred = train_forecast_model(train_df, valid_df)
+        key = registry.data_key(req.zip_path, req.max_series, cfg.horizon)
+        version = registry.register(REPORTS_DIR, model, FEATURE_COLS, key, metrics, params={"script": "serve_api"})
+    else:
+        metrics, valid_pred = score_forecast(model, valid_df)
 
     inv = compute_inventory_policy(valid_pred, service_level=cfg.service_level, lead_time_days=cfg.lead_time_days)
     elast = estimate_elasticity_loglog(valid_pred)
@@ -38,6 +73,7 @@ def run(req: RunRequest):
     assort = recommend_assortment(pricing, valid_pred, max_items_per_store=200, min_items_per_cat=10)
 
     return {
+        "model_version": version,
         "forecast_metrics": metrics,
         "inventory_rows": int(len(inv)),
         "pricing_rows": int(len(pricing)),